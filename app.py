@@ -1,5 +1,6 @@
 """ Main Application File for BadgeBot."""
 import asyncio
+import gc
 import sys
 import time
 from math import sin, cos, pi
@@ -29,7 +30,7 @@ except ImportError:
     # on MicroPython; replicate that so module-level const() calls work.
     const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
 
-from .bluetooth_mgr import bluetooth, RobotBLE, ble_process_command, enable_ble_logging, disable_ble_logging, get_ble_motor_override
+from .bluetooth_mgr import bluetooth, RobotBLE, ble_process_command, enable_ble_logging, disable_ble_logging, get_ble_motor_override, ble_stop_held
 
 # If you could use hard=True in setting up a Pin IRQ hander, which you can't as of BadgeOS V1.10, then it is recommended to
 # allocate the emergency exception buffer to prevent crashes due to OSError: Out of memory when an interrupt occurs and
@@ -38,6 +39,9 @@ from .bluetooth_mgr import bluetooth, RobotBLE, ble_process_command, enable_ble_
 #micropython.alloc_emergency_exception_buf(100)
 
 from .utils import draw_logo_animated, parse_version
+from .hexdrive_proxy import HexDriveProxy
+from .output_arbiter import OutputArbiter, SOURCE_SAFETY, SOURCE_BLE, SOURCE_MANAGER
+from .loop_timing import LoopScheduler, LoopProfiler, FrameGovernor, POLICY_SKIP, SECTION_BACKGROUND, SECTION_UPDATE, SECTION_DRAW
 
 HEXDRIVE_APP_VERSION = 6
 HEXDRIVE2_APP_VERSION = 2
@@ -90,6 +94,7 @@ _AUTO_REPEAT_COUNT_THRES = const(10) # Number of auto-repeats before increasing
 _AUTO_REPEAT_SPEED_LEVEL_MAX = const(4)  # Maximum level of auto-repeat speed increases
 _AUTO_REPEAT_LEVEL_MAX = const(3)  # Maximum level of auto-repeat digit increases
 DEFAULT_BACKGROUND_UPDATE_PERIOD = const(100)    # mS when not moving
+_BACKGROUND_LOOP_POLICY = POLICY_SKIP             # how the background loop handles overruns (see loop_timing.py)
 
 # App states
 STATE_MENU = const(0)
@@ -104,6 +109,10 @@ STATE_AUTOTUNE = const(8)        # PID Auto Tune
 STATE_SENSOR = const(9)          # Sensor Test
 STATE_AUTODRIVE = const(10)      # Autonomous Drive
 STATE_HEXPANSION = const(11)     # Hexpansion Management (sub-states managed by HexpansionMgr)
+STATE_TIMING = const(12)         # Loop Timing diagnostics
+
+# Short state names used by the loop timing page and its BLE telemetry, indexed by state
+STATE_NAMES = ("Menu", "Message", "Logo", "Countdown", "Settings", "Moves", "Servo", "Follower", "AutoTune", "Sensor", "AutoDrive", "Hexpansion", "Timing")
 
 # App states where user can minimise app (Menu, Message, Logo)
 MINIMISE_VALID_STATES = [STATE_MENU, STATE_MESSAGE, STATE_LOGO]
@@ -111,6 +120,15 @@ MINIMISE_VALID_STATES = [STATE_MENU, STATE_MESSAGE, STATE_LOGO]
 # App states where BadgeBot directly controls the badge LEDs (Motor Moves, Countdown, Message, Logo, Line Follower, AutoTune)
 _LED_CONTROL_STATES    = [STATE_MOTOR_MOVES, STATE_COUNTDOWN, STATE_MESSAGE, STATE_LOGO, STATE_FOLLOWER, STATE_AUTOTUNE, STATE_AUTODRIVE, STATE_SENSOR]
 
+# Minimum time between display frames in ms (see FrameGovernor in loop_timing.py).  Refresh requests arriving
+# faster than this are coalesced into the next allowed frame.  States not listed redraw whenever a refresh is requested.
+_STATE_MIN_FRAME_MS = {
+    STATE_MENU:     40,     # 25fps is plenty for the menu animations
+    STATE_FOLLOWER: 250,    # leave the CPU to the control loop
+    STATE_AUTOTUNE: 250,
+    STATE_SENSOR:   100,    # sensor samples request a redraw every reading
+}
+
 #Misceallaneous Settings
 _LOGGING = False
 _BLE_LOGGING = False
@@ -120,7 +138,7 @@ _FRONT_FACE_DEFAULT = const(0)
 
 
 # Main Menu Items
-MAIN_MENU_ITEMS = ["Line Follower","Motor Moves", "Servo Test", "PID Auto Tune", "Sensor Test", "Auto Drive", "Hexpansions", "Settings", "About","Exit"]
+MAIN_MENU_ITEMS = ["Line Follower","Motor Moves", "Servo Test", "PID Auto Tune", "Sensor Test", "Auto Drive", "Hexpansions", "Loop Timing", "Settings", "About","Exit"]
 MENU_ITEM_LINE_FOLLOWER = const(0)
 MENU_ITEM_MOTOR_MOVES = const(1)
 MENU_ITEM_SERVO_TEST = const(2)
@@ -128,9 +146,10 @@ MENU_ITEM_PID_AUTOTUNE = const(3)
 MENU_ITEM_SENSOR_TEST = const(4)
 MENU_ITEM_AUTO_DRIVE = const(5)
 MENU_ITEM_HEXPANSION = const(6)
-MENU_ITEM_SETTINGS = const(7)
-MENU_ITEM_ABOUT = const(8)
-MENU_ITEM_EXIT = const(9)
+MENU_ITEM_LOOP_TIMING = const(7)
+MENU_ITEM_SETTINGS = const(8)
+MENU_ITEM_ABOUT = const(9)
+MENU_ITEM_EXIT = const(10)
 
 # Front face direction labels (0=BtnA corner between slots 6 & 1, each step = 30° CW)
 _FRONT_FACE_LABELS = (
@@ -167,15 +186,39 @@ def _try_import(module_name, *attr_names):
     return nones
 
 HexpansionMgr, HexpansionType, _hexpansion_init_settings = _try_import('hexpansion_mgr', 'HexpansionMgr', 'HexpansionType', 'init_settings')
-SettingsMgr, MySetting                                    = _try_import('settings_mgr',  'SettingsMgr', 'MySetting')
-MotorMovesMgr, _motor_moves_init_settings                 = _try_import('motor_moves',   'MotorMovesMgr', 'init_settings')
-ServoTestMgr, _servo_test_init_settings                   = _try_import('servo_test',    'ServoTestMgr', 'init_settings')
-LineFollowMgr, _line_follow_init_settings                 = _try_import('line_follow',   'LineFollowMgr', 'init_settings')
-(AutotuneMgr,)                                            = _try_import('autotune_mgr',  'AutotuneMgr')
-SensorTestMgr, _sensor_test_init_settings                 = _try_import('sensor_test',   'SensorTestMgr', 'init_settings')
-AutoDriveMgr, _autodrive_init_settings                    = _try_import('autodrive',     'AutoDriveMgr', 'init_settings')
+SettingsMgr, MySetting, _load_settings, _commit_settings = _try_import('settings_mgr',  'SettingsMgr', 'MySetting', 'load_settings', 'commit_settings')
 emit_diagnostics_output, set_diagnostics_output           = _try_import('diagnostics',   'output', 'set_output')
 
+
+def _release_module(module_name):
+    """Drop a sibling submodule from sys.modules (and the package namespace) so it can be garbage collected.
+    It will simply be imported again by _try_import the next time it is needed."""
+    pkg_name = __name__.rsplit('.', 1)[0]
+    sys.modules.pop(pkg_name + '.' + module_name, None)
+    pkg = sys.modules.get(pkg_name)
+    if pkg is not None and hasattr(pkg, module_name):
+        try:
+            delattr(pkg, module_name)
+        except Exception:                           # pylint: disable=broad-except
+            pass
+
+
+# Functional area managers are only imported and constructed when first entered from the main menu,
+# and are released again (with a gc pass) on return to the menu, to keep start-up time and resident heap down.
+# The Hexpansion and Settings managers are needed all the time so are created up front.
+_MGR_DISPATCH = const(1)    # register the manager's update/draw/background_update for its state
+_MGR_RESIDENT = const(2)    # keep the manager (and its module) loaded after returning to the menu
+# state -> (module name, manager class name, settings initialiser name or None, flags)
+_LAZY_MANAGERS = {
+    STATE_MOTOR_MOVES: ('motor_moves',  'MotorMovesMgr', 'init_settings', _MGR_DISPATCH | _MGR_RESIDENT),  # holds the user's program between visits
+    STATE_SERVO:       ('servo_test',   'ServoTestMgr',  'init_settings', _MGR_DISPATCH),
+    STATE_FOLLOWER:    ('line_follow',  'LineFollowMgr', 'init_settings', _MGR_DISPATCH),
+    STATE_AUTOTUNE:    ('autotune_mgr', 'AutotuneMgr',   None,            0),
+    STATE_SENSOR:      ('sensor_test',  'SensorTestMgr', 'init_settings', _MGR_DISPATCH),
+    STATE_AUTODRIVE:   ('autodrive',    'AutoDriveMgr',  'init_settings', 0),
+    STATE_TIMING:      ('timing_mgr',   'TimingMgr',     None,            _MGR_DISPATCH),
+}
+
 class BadgeBotApp(app.App):         # pylint: disable=no-member
     """Main application class for BadgeBot.  Manages overall state, user input, and delegates to functional area managers for specific features."""
     def __init__(self):
@@ -183,7 +226,6 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
 
         print("B:BadgeBotApp: Initialising...")
         self._bluetooth_enabled: bool = True
-        self._ble_override_active: bool = False
 
         # UI Button Controls
         self.button_states = Buttons(self)
@@ -223,6 +265,7 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         # UI countdown
         self.run_countdown_elapsed_ms: int = 0
         self.countdown_next_state: int | None = None  # which state to go to after countdown
+        self.countdown_message: str | None = None     # extra line shown under the countdown (cleared when it ends)
 
         self._motor1_reversed: bool = False       # 0 or 1 to control direction of motor 1, set based on settings
         self._motor2_reversed: bool = False       # 0 or 1 to control direction of motor 2, set based on settings
@@ -231,6 +274,9 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         self.current_state = STATE_HEXPANSION
         self.previous_state = self.current_state
         self.update_period = DEFAULT_BACKGROUND_UPDATE_PERIOD   # mS
+        self.loop_scheduler = LoopScheduler(self.update_period, _BACKGROUND_LOOP_POLICY)  # deadline-based timing and per-state overrun/jitter counters for background_task
+        self.loop_profiler = LoopProfiler()     # per-state histograms of background_update / update / draw durations
+        self.frame_governor = FrameGovernor(_STATE_MIN_FRAME_MS)    # per-state display frame-rate caps and achieved draw rates
 
         # Settings - common settings first, then each module registers its own later
         self.settings: dict = {}
@@ -288,6 +334,8 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         # HexDrive hexpansion - has an app which we use to control the motors and servos
         self.hexdrive_ports = []
         self.hexdrive_apps = []
+        self._hexdrive_proxy: HexDriveProxy | None = None
+        self.output_arbiter = OutputArbiter()   # picks the one motor output sent each background tick
 
         # Motor Driver Hardware
         self.num_motors: int = 0        # initialised to 0 until we detect a HexDrive Hexpansion and can set this based on the actual number of motors it has
@@ -328,28 +376,19 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         self.motor_controller = None
 
         # Functional area managers
+        self._managers: dict = {}                   # state -> lazily constructed manager (see _LAZY_MANAGERS)
+        self._unavailable_managers: set = set()     # states whose manager module failed to import
         self._hexpansion_mgr   = HexpansionMgr(self, logging=self.logging)  if HexpansionMgr is not None else None
-        self._motor_moves_mgr  = MotorMovesMgr(self, logging=self.logging)  if MotorMovesMgr is not None else None
-        self._servo_test_mgr   = ServoTestMgr(self, logging=self.logging)   if ServoTestMgr is not None else None
         self._settings_mgr     = SettingsMgr(self, logging=self.logging)    if SettingsMgr is not None else None
-        self._line_follow_mgr  = LineFollowMgr(self, logging=self.logging)  if LineFollowMgr is not None else None
-        self._autotune_mgr     = AutotuneMgr(self, self._line_follow_mgr, logging=self.logging) if AutotuneMgr is not None else None
-        self._sensor_test_mgr  = SensorTestMgr(self, logging=self.logging)  if SensorTestMgr is not None else None
-        self._autodrive_mgr    = AutoDriveMgr(self, logging=self.logging)   if AutoDriveMgr is not None else None
 
         # State -> manager dispatch tables (only include managers that exist)
         self._state_update_dispatch = {}
         self._state_draw_dispatch = {}
         self._state_background_dispatch = {}
 
+        # Lazily constructed managers register themselves when they are created (see _get_manager)
         self._register_state_functions(STATE_HEXPANSION, self._hexpansion_mgr)
-        self._register_state_functions(STATE_MOTOR_MOVES, self._motor_moves_mgr)
-        self._register_state_functions(STATE_FOLLOWER, self._line_follow_mgr)
-        #self._register_state_functions(STATE_AUTOTUNE, self._autotune_mgr)
-        self._register_state_functions(STATE_SERVO, self._servo_test_mgr)
         self._register_state_functions(STATE_SETTINGS, self._settings_mgr)
-        self._register_state_functions(STATE_SENSOR, self._sensor_test_mgr)
-        #self._register_state_functions(STATE_AUTODRIVE, self._autodrive_mgr)
 
         # Countdown timer value
         self.countdown_value: int = 0
@@ -473,6 +512,62 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
             self._state_background_dispatch[state] = background_fn
 
 
+    def _unregister_state_functions(self, state: int):
+        """Remove the update, draw, and background update functions for a state from the dispatch tables."""
+        self._state_update_dispatch.pop(state, None)
+        self._state_draw_dispatch.pop(state, None)
+        self._state_background_dispatch.pop(state, None)
+
+
+    def _get_manager(self, state: int):
+        """Return the manager for *state*, importing and constructing it on first use.
+        Returns None if the manager's module is not available."""
+        mgr = self._managers.get(state)
+        if mgr is not None or state in self._unavailable_managers:
+            return mgr
+        spec = _LAZY_MANAGERS.get(state)
+        if spec is None:
+            return None
+        module_name, class_name, _, flags = spec
+        (mgr_class,) = _try_import(module_name, class_name)
+        if mgr_class is None:
+            self._unavailable_managers.add(state)
+            return None
+        if state == STATE_AUTOTUNE:
+            # AutoTune drives the robot using the line follower
+            follower = self._get_manager(STATE_FOLLOWER)
+            if follower is None:
+                return None
+            mgr = mgr_class(self, follower, logging=self.logging)
+        elif state == STATE_TIMING:
+            mgr = mgr_class(self, STATE_NAMES, logging=self.logging)
+        else:
+            mgr = mgr_class(self, logging=self.logging)
+        self._managers[state] = mgr
+        if flags & _MGR_DISPATCH:
+            self._register_state_functions(state, mgr)
+        if self.logging:
+            print(f"B:Loaded {class_name}")
+        return mgr
+
+
+    def _release_managers(self):
+        """Release all non-resident managers and their modules, then reclaim the heap."""
+        released = False
+        for state in list(self._managers):
+            module_name, class_name, _, flags = _LAZY_MANAGERS[state]
+            if flags & _MGR_RESIDENT:
+                continue
+            self._unregister_state_functions(state)
+            del self._managers[state]
+            _release_module(module_name)
+            released = True
+            if self.logging:
+                print(f"B:Released {class_name}")
+        if released:
+            gc.collect()
+
+
     @property
     def logging(self):
         """Convenience property to access logging setting."""
@@ -497,10 +592,29 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         return _FRONT_FACE_DEFAULT
 
 
+    @property
+    def ble_controller(self):
+        """Public access to the RobotBLE controller, or None if Bluetooth has not been set up."""
+        return getattr(self, '_ble_controller', None)
+
+
+    @property
+    def hexdrive(self) -> HexDriveProxy | None:
+        """The first HexDrive app, wrapped so that repeated power, frequency and
+        motor output calls are only sent to the driver when something changes."""
+        if len(self.hexdrive_apps) == 0:
+            return None
+        proxy = self._hexdrive_proxy
+        if proxy is None or proxy.app is not self.hexdrive_apps[0]:
+            proxy = HexDriveProxy(self.hexdrive_apps[0])
+            self._hexdrive_proxy = proxy
+        return proxy
+
+
     @property
     def sensor_test_mgr(self):
         """Public access to the SensorTestMgr, used by AutoDriveMgr to share the sensor manager."""
-        return self._sensor_test_mgr
+        return self._get_manager(STATE_SENSOR)
 
 
     ### ASYNC EVENT HANDLERS ###
@@ -537,16 +651,20 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
     async def background_task(self):
         """Background task loop for handling time-based updates. This runs independently of the main update/draw loop
            and is suitable for tasks that need to run at a consistent interval regardless of the current state or drawing performance."""
-        last_time = time.ticks_ms()
+        scheduler = self.loop_scheduler
+        scheduler.start(time.ticks_ms(), self.update_period)
 
         while True:
-            cur_time = time.ticks_ms()
-            delta_ticks = time.ticks_diff(cur_time, last_time)
+            # delta is the scheduled time since the previous tick, so it is a whole number of update periods
+            state = self.current_state
+            delta_ticks = scheduler.begin_tick(time.ticks_ms(), state)
             diagnostics_output(0, 1)
+            start_us = time.ticks_us()
             self.background_update(delta_ticks)
+            self.loop_profiler.record(state, SECTION_BACKGROUND, time.ticks_diff(time.ticks_us(), start_us))
             diagnostics_output(0, 0)
-            await asyncio.sleep_ms(max (1, self.update_period - (time.ticks_ms() - cur_time)))  # sleep for the remainder of the update period, accounting for time taken by background_update
-            last_time = cur_time
+            # sleep until the next absolute deadline, so any lateness is not carried forward into later ticks
+            await asyncio.sleep_ms(scheduler.end_tick(time.ticks_ms(), self.update_period))
 
 
     ### NON-ASYNC FUNCTIONS ###
@@ -558,20 +676,22 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         output = bg_fn(delta) if bg_fn is not None else None
 
         if len(self.hexdrive_apps) > 0:
-            # BLE direction buttons override the state's motor output while held,
-            # regardless of whether the current state produced any output.
+            # Every source of motor outputs goes through the arbiter, so exactly one
+            # output is sent per tick: BLE stop > BLE direction buttons > the state's
+            # output > MotorController.
+            arbiter = self.output_arbiter
+            if output is not None:
+                arbiter.submit(SOURCE_MANAGER, output)
             max_pwr = self.settings['max_power'].v * MOTOR_POWER_SCALE_FACTOR if 'max_power' in self.settings else 49152
             ble_override = get_ble_motor_override(max_pwr)
             if ble_override is not None:
-                self._ble_override_active = True
-                output = ble_override
-            elif self._ble_override_active and output is None:
-                output = (0, 0)
-                self._ble_override_active = False
-            else:
-                self._ble_override_active = False
+                arbiter.submit(SOURCE_SAFETY if ble_stop_held() else SOURCE_BLE, ble_override)
+            owner = arbiter.owner
+            output = arbiter.resolve()
+            if self.logging and arbiter.owner != owner:
+                print(f"B:Motor outputs from {arbiter.owner_name}: {arbiter.report()}")
             if output is not None:
-                if not self.hexdrive_apps[0].set_motors(self.apply_motor_directions(output)):
+                if not self.hexdrive.set_motors(self.apply_motor_directions(output)):
                     if self.logging:
                         print("Failed to set motor outputs to HexDrive app")
 
@@ -579,7 +699,7 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
     @property
     def enable_motor_moves(self):
         """Whether the Motor Moves feature is enabled, based on whether we have detected motor hardware and have the manager available."""
-        if self.num_motors > 1 and self._motor_moves_mgr is not None:
+        if self.num_motors > 1 and STATE_MOTOR_MOVES not in self._unavailable_managers:
             return True
         else:
             if self.logging:
@@ -589,26 +709,25 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
     @property
     def enable_servo_test(self):
         """Whether the Servo Test feature is enabled, based on whether we have detected servo hardware and have the manager available."""
-        return self.num_servos > 0 and self._servo_test_mgr is not None
+        return self.num_servos > 0 and STATE_SERVO not in self._unavailable_managers
 
 
     @property
     def enable_line_follow(self):
         """Whether the Line Follow feature is enabled, based on whether we have detected line sensors and have the manager available."""
-        return self.num_motors > 1 and self.num_line_sensors > 0 and self._line_follow_mgr is not None
+        return self.num_motors > 1 and self.num_line_sensors > 0 and STATE_FOLLOWER not in self._unavailable_managers
 
 
     @property
     def enable_sensor_test(self):
         """Whether the Sensor Test feature is enabled, based on whether we have detected sensor hardware and have the manager available."""
-        #print(f"Checking if Sensor Test is enabled: sensor_test_mgr={'present' if self._sensor_test_mgr is not None else 'absent'}")
-        return self.num_sensors > 0 and self._sensor_test_mgr is not None
+        return self.num_sensors > 0 and STATE_SENSOR not in self._unavailable_managers
 
 
     @property
     def enable_autodrive(self):
         """Whether the Autodrive feature is enabled, based on whether we have detected motor hardware and have the manager available."""
-        return self.num_motors > 1 and self._autodrive_mgr is not None
+        return self.num_motors > 1 and STATE_AUTODRIVE not in self._unavailable_managers
 
 
     @property
@@ -622,30 +741,54 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         if MySetting is None:
             return  # Settings system not available, skip initialisation
         # Module-specific settings
-        if self.enable_motor_moves and _motor_moves_init_settings is not None:
-            _motor_moves_init_settings(self.settings, MySetting)
-        if self.enable_servo_test and _servo_test_init_settings is not None:
-            _servo_test_init_settings(self.settings, MySetting)
-        if self.enable_line_follow and _line_follow_init_settings is not None:
-            _line_follow_init_settings(self.settings, MySetting)
-        if self.enable_sensor_test and _sensor_test_init_settings is not None:
-            _sensor_test_init_settings(self.settings, MySetting)
-        if self.enable_autodrive and _autodrive_init_settings is not None:
-            _autodrive_init_settings(self.settings, MySetting)
+        if self.enable_motor_moves:
+            self._init_manager_settings(STATE_MOTOR_MOVES)
+        if self.enable_servo_test:
+            self._init_manager_settings(STATE_SERVO)
+        if self.enable_line_follow:
+            self._init_manager_settings(STATE_FOLLOWER)
+        if self.enable_sensor_test:
+            self._init_manager_settings(STATE_SENSOR)
+        if self.enable_autodrive:
+            self._init_manager_settings(STATE_AUTODRIVE)
+        gc.collect()
         self.update_settings()  # Load settings from EEPROM after initialisation
         self.fast_settings_update()  # Update fast access settings
 
 
+    def _init_manager_settings(self, state: int):
+        """Register a lazily loaded manager's settings.  The module is only imported for the duration of the call
+        (unless the manager is already loaded), and a module which fails to import marks its feature unavailable."""
+        module_name, _, init_name, _ = _LAZY_MANAGERS[state]
+        if init_name is None:
+            return
+        (init_settings,) = _try_import(module_name, init_name)
+        if init_settings is None:
+            self._unavailable_managers.add(state)
+            return
+        init_settings(self.settings, MySetting)
+        if state not in self._managers:
+            _release_module(module_name)
+
+
     def update_settings(self):
         """Update settings from EEPROM."""
         if self.logging:
             print("B:Updating settings from EEPROM")
-        for s in self.settings:
-            self.settings[s].v = settings.get(f"{SETTINGS_NAME_PREFIX}.{s}", self.settings[s].d)
-            if self.logging:
+        if _load_settings is None:
+            return
+        _load_settings(self.settings)
+        if self.logging:
+            for s in self.settings:
                 print(f"B:Setting {s} = {self.settings[s].v}")
 
 
+    def commit_settings(self, save: bool = True):
+        """Write any changed settings to platform storage in one batch, and (if *save*) save them to flash once."""
+        if _commit_settings is not None:
+            _commit_settings(self.settings, save)
+
+
     def fast_settings_update(self):
         """Update fast access settings from the main settings dictionary."""
         if self.logging:
@@ -696,6 +839,8 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
     def update(self, delta: int):
         """Main update function called from the main loop. Handles state transitions, user input, and delegates to functional area managers."""
         diagnostics_output(1, 1)
+        start_us = time.ticks_us()
+        start_state = self.current_state
 
         if self.notification:
             self.notification.update(delta)
@@ -760,6 +905,7 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
                 except OSError as e:
                     if self.logging:
                         print(f"Error writing to LEDs: {e}")
+        self.loop_profiler.record(start_state, SECTION_UPDATE, time.ticks_diff(time.ticks_us(), start_us))
         diagnostics_output(1, 0)
 
 
@@ -872,18 +1018,21 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         self.clear_leds()
         self.run_countdown_elapsed_ms += delta
         if self.run_countdown_elapsed_ms >= _RUN_COUNTDOWN_MS:
+            self.countdown_message = None
             if self.countdown_next_state == STATE_MOTOR_MOVES:
                 # Motor Moves: delegate to begin_moves
                 self.current_state = self.countdown_next_state
-                if self._motor_moves_mgr is not None:
-                    self._motor_moves_mgr.begin_moves()
+                motor_moves_mgr = self._managers.get(STATE_MOTOR_MOVES)
+                if motor_moves_mgr is not None:
+                    motor_moves_mgr.begin_moves()
                 else:
                     self.return_to_menu()
             elif self.countdown_next_state == STATE_AUTOTUNE:
                 # PID AutoTune: start the tuner after countdown
                 self.current_state = self.countdown_next_state
-                if self._autotune_mgr is not None:
-                    self._autotune_mgr.begin_tuning()
+                autotune_mgr = self._managers.get(STATE_AUTOTUNE)
+                if autotune_mgr is not None:
+                    autotune_mgr.begin_tuning()
                 else:
                     self.return_to_menu()
             else:
@@ -922,7 +1071,13 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
 
     def draw(self, ctx):
         """Main draw function called from the main loop. Handles drawing the current state, including any notifications."""
+        state = self.current_state
+        if not ((state == STATE_MENU and self.menu is not None) or self.refresh or self.notification):
+            return      # nothing to draw
+        if not self.frame_governor.should_draw(time.ticks_ms(), state):
+            return      # too soon after the last frame - leave the request pending for the next allowed frame
         diagnostics_output(2, 1)
+        start_us = time.ticks_us()
 
         if self.current_state == STATE_MENU and self.menu is not None:
             # These need to be drawn every frame as they contain animations
@@ -961,6 +1116,10 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
                     button_labels(ctx, confirm_label="OK", cancel_label="Exit")
             elif self.current_state == STATE_COUNTDOWN:
                 self.draw_message(ctx, [str(self.countdown_value)], [(1,1,0)], twentyfour_pt)
+                if self.countdown_message is not None:
+                    ctx.font_size = label_font_size
+                    width = ctx.text_width(self.countdown_message)
+                    ctx.rgb(0,1,0).move_to(-width//2, 2 * label_font_size).text(self.countdown_message)
             else:
                 # Delegate to functional area managers via dispatch table
                 if self.current_state in self._state_draw_dispatch:
@@ -975,6 +1134,9 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         if self.notification:
             self.notification.draw(ctx)
 
+        # only frames that actually painted something are counted, so idle calls don't swamp the histogram
+        self.loop_profiler.record(state, SECTION_DRAW, time.ticks_diff(time.ticks_us(), start_us))
+        self.frame_governor.frame_drawn(time.ticks_ms(), state)
         diagnostics_output(2, 0)
 
 
@@ -1050,7 +1212,9 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
             self.set_menu(menu_name)
         self.update_period = DEFAULT_BACKGROUND_UPDATE_PERIOD
         self.current_state = STATE_MENU
+        self.countdown_message = None
         self.refresh = True
+        self._release_managers()
 
         self.update_settings()
         self.fast_settings_update()
@@ -1137,6 +1301,8 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
                 menu_items.remove(MAIN_MENU_ITEMS[MENU_ITEM_AUTO_DRIVE])
             if not self.enable_hexpansion_mgr and MAIN_MENU_ITEMS[MENU_ITEM_HEXPANSION] in menu_items:
                 menu_items.remove(MAIN_MENU_ITEMS[MENU_ITEM_HEXPANSION])
+            if STATE_TIMING in self._unavailable_managers and MAIN_MENU_ITEMS[MENU_ITEM_LOOP_TIMING] in menu_items:
+                menu_items.remove(MAIN_MENU_ITEMS[MENU_ITEM_LOOP_TIMING])
             if self._settings_mgr is None and MAIN_MENU_ITEMS[MENU_ITEM_SETTINGS] in menu_items:
                 menu_items.remove(MAIN_MENU_ITEMS[MENU_ITEM_SETTINGS])
             self.menu = Menu(
@@ -1172,9 +1338,10 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
             elif self.num_motors == 1:
                 self.notification = Notification(" 2 Motors  Required")
             else:
-                if self._line_follow_mgr is not None:
-                    self._line_follow_mgr.logging = self.logging # update logging setting in line follow manager based on current app setting, in case it was changed
-                    if self._line_follow_mgr.start():
+                line_follow_mgr = self._get_manager(STATE_FOLLOWER)
+                if line_follow_mgr is not None:
+                    line_follow_mgr.logging = self.logging # update logging setting in line follow manager based on current app setting, in case it was changed
+                    if line_follow_mgr.start():
                         self.current_state = STATE_FOLLOWER
         elif item == MAIN_MENU_ITEMS[MENU_ITEM_MOTOR_MOVES]: # Motor Moves
             # Check for required hardware and show message if not present, otherwise start the motor moves manager and switch to motor moves state
@@ -1183,9 +1350,10 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
             elif self.num_motors == 1:
                 self.notification = Notification(" 2 Motors  Required")
             else:
-                if self._motor_moves_mgr is not None:
-                    self._motor_moves_mgr.logging = self.logging # update logging setting in motor moves manager based on current app setting, in case it was changed
-                    if self._motor_moves_mgr.start():
+                motor_moves_mgr = self._get_manager(STATE_MOTOR_MOVES)
+                if motor_moves_mgr is not None:
+                    motor_moves_mgr.logging = self.logging # update logging setting in motor moves manager based on current app setting, in case it was changed
+                    if motor_moves_mgr.start():
                         self.current_state = STATE_MOTOR_MOVES
         elif item == MAIN_MENU_ITEMS[MENU_ITEM_PID_AUTOTUNE]: # PID Auto Tune
             # Check for required hardware and show message if not present, otherwise start the autotune manager and switch to autotune state
@@ -1194,34 +1362,44 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
             elif self.num_motors == 1:
                 self.notification = Notification(" 2 Motors  Required")
             else:
-                if self._autotune_mgr is not None:
-                    self._autotune_mgr.logging = self.logging # update logging setting in autotune manager based on current app setting, in case it was changed
-                    if self._autotune_mgr.start():
+                autotune_mgr = self._get_manager(STATE_AUTOTUNE)
+                if autotune_mgr is not None:
+                    autotune_mgr.logging = self.logging # update logging setting in autotune manager based on current app setting, in case it was changed
+                    if autotune_mgr.start():
                         self.current_state = STATE_AUTOTUNE
         elif item == MAIN_MENU_ITEMS[MENU_ITEM_SERVO_TEST]: # Servo Test
             # Check for required hardware and show message if not present, otherwise start the servo test manager and switch to servo test state
             if self.num_servos == 0:
                 self.notification = Notification("No Servos")
             else:
-                if self._servo_test_mgr is not None:
-                    self._servo_test_mgr.logging = self.logging # update logging setting in servo test manager based on current app setting, in case it was changed
-                    if self._servo_test_mgr.start():
+                servo_test_mgr = self._get_manager(STATE_SERVO)
+                if servo_test_mgr is not None:
+                    servo_test_mgr.logging = self.logging # update logging setting in servo test manager based on current app setting, in case it was changed
+                    if servo_test_mgr.start():
                         self.current_state = STATE_SERVO
         elif item == MAIN_MENU_ITEMS[MENU_ITEM_SENSOR_TEST]: # Sensor Test
-            if self._sensor_test_mgr is not None:
-                self._sensor_test_mgr.logging = self.logging # update logging setting in sensor test manager based on current app setting, in case it was changed
-                if self._sensor_test_mgr.start():
+            sensor_test_mgr = self._get_manager(STATE_SENSOR)
+            if sensor_test_mgr is not None:
+                sensor_test_mgr.logging = self.logging # update logging setting in sensor test manager based on current app setting, in case it was changed
+                if sensor_test_mgr.start():
                     self.current_state = STATE_SENSOR
         elif item == MAIN_MENU_ITEMS[MENU_ITEM_AUTO_DRIVE]: # Auto Drive
-            if self._autodrive_mgr is not None:
-                self._autodrive_mgr.logging = self.logging # update logging setting in autodrive manager based on current app setting, in case it was changed
-                if self._autodrive_mgr.start():
+            autodrive_mgr = self._get_manager(STATE_AUTODRIVE)
+            if autodrive_mgr is not None:
+                autodrive_mgr.logging = self.logging # update logging setting in autodrive manager based on current app setting, in case it was changed
+                if autodrive_mgr.start():
                     self.current_state = STATE_AUTODRIVE
         elif item == MAIN_MENU_ITEMS[MENU_ITEM_HEXPANSION]: # Hexpansion Management
             if self._hexpansion_mgr is not None:
                 self._hexpansion_mgr.logging = self.logging # update logging setting in hexpansion manager based on current app setting, in case it was changed
                 if self._hexpansion_mgr.start():
                     self.current_state = STATE_HEXPANSION
+        elif item == MAIN_MENU_ITEMS[MENU_ITEM_LOOP_TIMING]: # Loop Timing
+            timing_mgr = self._get_manager(STATE_TIMING)
+            if timing_mgr is not None:
+                timing_mgr.logging = self.logging
+                if timing_mgr.start():
+                    self.current_state = STATE_TIMING
         elif item == MAIN_MENU_ITEMS[MENU_ITEM_SETTINGS]:   # Settings
             self.set_menu(MAIN_MENU_ITEMS[MENU_ITEM_SETTINGS])
         elif item == MAIN_MENU_ITEMS[MENU_ITEM_ABOUT]:      # About
@@ -1244,6 +1422,8 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
         if idx == 0: #Save
             if self.logging:
                 print("B:Settings Save All")
+            if _commit_settings is not None:
+                _commit_settings(self.settings, save=False)
             settings.save()
             self.notification = Notification("  Settings  Saved")
             self.set_menu()
@@ -1252,7 +1432,8 @@ class BadgeBotApp(app.App):         # pylint: disable=no-member
                 print("B:Settings Default All")
             for s in self.settings:
                 self.settings[s].v = self.settings[s].d
-                self.settings[s].persist()
+            if _commit_settings is not None:
+                _commit_settings(self.settings, save=False)
             self.notification = Notification("  Settings Defaulted")
             self.set_menu()
         elif self._settings_mgr is not None and self._settings_mgr.start(item):
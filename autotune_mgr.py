@@ -27,7 +27,7 @@ from .autotune import PIDAutoTuner, METHOD_ZIEGLER_NICHOLS
 from .line_follow import create_line_sensors
 from .app import (STATE_AUTOTUNE, STATE_COUNTDOWN, MOTOR_PWM_FREQ)
 
-AUTOTUNER_UPDATE_PERIOD = 10  # ms between updates while tuning
+AUTOTUNER_UPDATE_PERIOD = 5   # ms between updates while tuning (a line sensor reading takes two)
 
 # ---- Settings initialisation -----------------------------------------------
 
@@ -89,9 +89,10 @@ class AutotuneMgr:
             app.notification = Notification("Line sensors not available")
             return False
         if len(app.hexdrive_apps) > 0:
-            app.hexdrive_apps[0].set_logging(False)
-            if app.hexdrive_apps[0].initialise() and app.hexdrive_apps[0].set_power(True) and app.hexdrive_apps[0].set_freq(MOTOR_PWM_FREQ):
-                #self.follower.line_sensors.enable() # using blocking_read which does not require enabling.
+            app.hexdrive.set_logging(False)
+            if app.hexdrive.initialise() and app.hexdrive.set_power(True) and app.hexdrive.set_freq(MOTOR_PWM_FREQ):
+                self.follower.line_sensors.blocking = app.settings['line_blocking'].v if 'line_blocking' in app.settings else False
+                self.follower.line_sensors.enable()
                 app.set_menu(None)
                 app.button_states.clear()
                 self.autotuner = None
@@ -143,8 +144,8 @@ class AutotuneMgr:
         if app.button_states.get(BUTTON_TYPES["CANCEL"]):
             app.button_states.clear()
             if len(app.hexdrive_apps) > 0:
-                app.hexdrive_apps[0].set_motors((0, 0))
-                app.hexdrive_apps[0].set_power(False)
+                app.hexdrive.set_motors((0, 0))
+                app.hexdrive.set_power(False)
             self.follower.line_sensors.disable()
             self.autotuner = None
             app.return_to_menu()
@@ -177,8 +178,7 @@ class AutotuneMgr:
         """PID auto-tune relay feedback control during STATE_AUTOTUNE.
         Returns motor output tuple, or None if not active."""
         if self.autotuner is not None and self.autotuner.is_running:
-            #self.follower.line_sensors.read()
-            self.follower.line_sensors.read_blocking()    # wait for sensor reading
+            self.follower.line_sensors.step()    # advance the reading; the values are the latest complete ones
             left_raw  = self.follower.line_sensors.raw_value(0)
             right_raw = self.follower.line_sensors.raw_value(1)
             error = self.follower.compute_error(left_raw, right_raw)
@@ -202,9 +202,8 @@ class AutotuneMgr:
                     app.settings['pid_kp'].v = int(1000 * gains[0])
                     app.settings['pid_ki'].v = int(1000 * gains[1])
                     app.settings['pid_kd'].v = int(1000 * gains[2])
-                    app.settings['pid_kp'].persist()
-                    app.settings['pid_ki'].persist()
-                    app.settings['pid_kd'].persist()
+                    # write all three gains and save them to flash in a single batch
+                    app.commit_settings()
                     if self._logging:
                         print(f"AUTOTUNE: Gains saved to settings: Kp={gains[0]:.4f} Ki={gains[1]:.6f} Kd={gains[2]:.4f}")
                 app.notification = Notification(" Tuning    Complete")
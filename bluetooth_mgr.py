@@ -142,6 +142,11 @@ def ble_process_command(data):
             print("BLE: Release")
 
 
+def ble_stop_held() -> bool:
+    """True while the BLE Stop button is held."""
+    return _ble_active_button == '4'
+
+
 def get_ble_motor_override(max_power: int):
     """Return a (left, right) motor override tuple if a BLE drive button is
     currently held, or None to let the current state control the motors.
@@ -0,0 +1,93 @@
+# Coast Model Module for BadgeBot
+#
+# Learns how far this particular robot keeps turning after MotorController
+# decides to stop a gyro turn, beyond what the fusion filter's ramp-down
+# prediction already allows for (motor and gearbox lag, wheel slip, the
+# robot's inertia).  The extra angle is modelled as
+#
+#     extra_deg = coast_ms * rate_dps / 1000 + offset_deg
+#
+# i.e. an effective extra coast time at the turn rate when stopping, plus a
+# constant.  After each completed turn the measured extra angle is fed to a
+# two-parameter recursive least squares (RLS) estimator with a forgetting
+# factor, so the model settles within a few turns and follows slow changes
+# (battery level, surface) without storing any history.  The controller adds
+# the prediction to its stop test so it cuts the power that much earlier.
+#
+# Only the two parameters are persisted (as settings); the estimator's
+# confidence restarts from its initial value each session.
+#
+# Public interface:
+#   CoastModel(coast_ms, offset_deg)
+#     reset(coast_ms, offset_deg) – set the parameters and restart the estimator
+#     predict(rate_dps)           – extra angle (°) expected when stopping at this rate
+#     update(rate_dps, extra_deg) – learn from one turn's measured extra angle
+#     coast_ms, offset_deg        – current parameters
+#     turns                       – number of turns learned from
+
+_FORGETTING = 0.9           # weight kept by older turns at each update (0-1)
+_P0_COAST = 2500.0          # initial variance of coast_ms (std 50 ms)
+_P0_OFFSET = 4.0            # initial variance of offset_deg (std 2°)
+_MIN_COAST_MS = -200.0
+_MAX_COAST_MS = 500.0
+_MAX_OFFSET_DEG = 10.0
+
+
+class CoastModel:
+    """Per-robot model of the extra angle turned after a turn is stopped.
+
+    Parameters
+    ----------
+    coast_ms : float
+        Initial effective coast time (ms).
+    offset_deg : float
+        Initial constant extra angle (°).
+    """
+    __slots__ = ("coast_ms", "offset_deg", "turns", "_p00", "_p01", "_p11")
+
+    def __init__(self, coast_ms: float = 0.0, offset_deg: float = 0.0):
+        self.coast_ms: float = 0.0
+        self.offset_deg: float = 0.0
+        self.turns: int = 0
+        self._p00: float = _P0_COAST        # estimator covariance (symmetric 2x2)
+        self._p01: float = 0.0
+        self._p11: float = _P0_OFFSET
+        self.reset(coast_ms, offset_deg)
+
+
+    def reset(self, coast_ms: float, offset_deg: float):
+        """Set the parameters and restart the estimator's confidence."""
+        self.coast_ms = float(coast_ms)
+        self.offset_deg = float(offset_deg)
+        self.turns = 0
+        self._p00 = _P0_COAST
+        self._p01 = 0.0
+        self._p11 = _P0_OFFSET
+
+
+    def predict(self, rate_dps: float) -> float:
+        """Extra angle (°) expected after stopping a turn at *rate_dps*."""
+        return self.coast_ms * abs(rate_dps) / 1000.0 + self.offset_deg
+
+
+    def update(self, rate_dps: float, extra_deg: float):
+        """Learn from a turn stopped at *rate_dps* which then turned *extra_deg* further than predicted."""
+        x0 = abs(rate_dps) / 1000.0
+        p00, p01, p11 = self._p00, self._p01, self._p11
+        # P x, with x = (x0, 1)
+        px0 = p00 * x0 + p01
+        px1 = p01 * x0 + p11
+        denom = _FORGETTING + x0 * px0 + px1
+        k0 = px0 / denom
+        k1 = px1 / denom
+        error = extra_deg - (self.coast_ms * x0 + self.offset_deg)
+        self.coast_ms = min(_MAX_COAST_MS, max(_MIN_COAST_MS, self.coast_ms + k0 * error))
+        self.offset_deg = min(_MAX_OFFSET_DEG, max(-_MAX_OFFSET_DEG, self.offset_deg + k1 * error))
+        # P = (P - K x' P) / lambda, capped so it cannot wind up while the turns are all alike
+        p00 = min(_P0_COAST, (p00 - k0 * px0) / _FORGETTING)
+        p11 = min(_P0_OFFSET, (p11 - k1 * px1) / _FORGETTING)
+        limit = (p00 * p11) ** 0.5
+        self._p00 = p00
+        self._p01 = min(limit, max(-limit, (p01 - k0 * px1) / _FORGETTING))
+        self._p11 = p11
+        self.turns += 1
@@ -20,13 +20,27 @@ RUNTIME_MODULES = {
     "autotune_mgr",
     "settings_mgr",
     "hexpansion_mgr",
+    "hexdrive_proxy",
     "bluetooth_mgr",
     "line_follow",
+    "line_kernel",
+    "pid",
     "motor_moves",
     "servo_test",
     "utils",
+    "loop_timing",
+    "timing_mgr",
     "diagnostics",
     "motor_controller",
+    "motion_profile",
+    "fusion",
+    "coast_model",
+    "imu_sampler",
+    "odometry",
+    "program_store",
+    "output_arbiter",
+    "trace_recorder",
+    "pcnt",
     "sensor_manager",
     "sensor_test",
 }
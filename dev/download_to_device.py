@@ -46,14 +46,28 @@ MODULES: tuple[ModuleSpec, ...] = (
     ModuleSpec(Path("autotune.py"), Path("autotune.mpy")),
     ModuleSpec(Path("autotune_mgr.py"), Path("autotune_mgr.mpy")),
     ModuleSpec(Path("utils.py"), Path("utils.mpy")),
+    ModuleSpec(Path("loop_timing.py"), Path("loop_timing.mpy")),
+    ModuleSpec(Path("timing_mgr.py"), Path("timing_mgr.mpy")),
     ModuleSpec(Path("diagnostics.py"), Path("diagnostics.mpy")),
     ModuleSpec(Path("settings_mgr.py"), Path("settings_mgr.mpy")),
     ModuleSpec(Path("hexpansion_mgr.py"), Path("hexpansion_mgr.mpy")),
+    ModuleSpec(Path("hexdrive_proxy.py"), Path("hexdrive_proxy.mpy")),
     ModuleSpec(Path("bluetooth_mgr.py"), Path("bluetooth_mgr.mpy")),
     ModuleSpec(Path("line_follow.py"), Path("line_follow.mpy")),
+    ModuleSpec(Path("line_kernel.py"), Path("line_kernel.mpy")),
+    ModuleSpec(Path("pid.py"), Path("pid.mpy")),
     ModuleSpec(Path("motor_moves.py"), Path("motor_moves.mpy")),
     ModuleSpec(Path("servo_test.py"), Path("servo_test.mpy")),
     ModuleSpec(Path("motor_controller.py"), Path("motor_controller.mpy")),
+    ModuleSpec(Path("motion_profile.py"), Path("motion_profile.mpy")),
+    ModuleSpec(Path("fusion.py"), Path("fusion.mpy")),
+    ModuleSpec(Path("coast_model.py"), Path("coast_model.mpy")),
+    ModuleSpec(Path("imu_sampler.py"), Path("imu_sampler.mpy")),
+    ModuleSpec(Path("odometry.py"), Path("odometry.mpy")),
+    ModuleSpec(Path("program_store.py"), Path("program_store.mpy")),
+    ModuleSpec(Path("output_arbiter.py"), Path("output_arbiter.mpy")),
+    ModuleSpec(Path("trace_recorder.py"), Path("trace_recorder.mpy")),
+    ModuleSpec(Path("pcnt.py"), Path("pcnt.mpy")),
     ModuleSpec(Path("sensor_manager.py"), Path("sensor_manager.mpy")),
     ModuleSpec(Path("sensor_test.py"), Path("sensor_test.mpy")),
     #ModuleSpec(Path("sensors/__init__.py"), Path("sensors/__init__.mpy")),
@@ -0,0 +1,540 @@
+"""Headless differential-drive simulator for BadgeBot motion code.
+
+Runs the motor outputs BadgeBot sends to the HexDrive through a simple
+kinematic model of a two-wheeled robot and reports the resulting path and
+timing, on a virtual clock so a run takes a fraction of real time and no
+badge is needed.
+
+The model has three parts:
+- each wheel's speed follows its PWM output (less a deadband) with a
+  first-order lag, and decays more slowly when the output is zero (coast);
+- the wheel speeds are turned into forward speed and yaw rate using the
+  wheel base (track);
+- a fake IMU reports the yaw rate (clockwise positive, as MotorController
+  expects) and forward acceleration, so the gyro and accelerometer loops
+  can be exercised too.
+
+Two ways of driving it:
+- ``run_background(update)`` calls a ``background_update(delta)`` style
+  function once per tick, as the app's background loop does, and sends any
+  output it returns to the fake HexDrive.  ``run_motor_moves(program)``
+  runs a Motor Moves program this way through the app's own
+  ``MotorMovesMgr.background_update``.
+- ``run(coro)`` runs an async MotorController command on an event loop whose
+  clock is the simulation's, with ``time.ticks_*`` and ``asyncio.sleep_ms``
+  patched to match.  Attach the fake IMU to the motor_controller module
+  (``attach_imu``) before constructing the controller, and pass
+  ``sim.hexdrive`` as its HexDrive.
+
+The app modules need the badge simulator (``sim.run``, from the badge
+software repository this app is checked out in).  Without it
+``simulate_program`` falls back to ``play_plans``, which holds each step of
+the program's power plans for exactly its duration.
+
+Run as a script to benchmark a Motor Moves program over a range of ramp and
+acceleration settings, e.g.::
+
+    python dev/kinematic_sim.py --program "U4 R2 U4" --acceleration 16,32,48
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import importlib.util
+import math
+import selectors
+import sys
+import time
+import types
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+BADGE_SIM_ROOT = REPO_ROOT.parent.parent.parent   # the app is checked out in <badge software>/sim/apps/BadgeBot
+
+# motion_profile is dependency free, so it is loaded by path for the standalone player
+_spec = importlib.util.spec_from_file_location("motion_profile", REPO_ROOT / "motion_profile.py")
+motion_profile = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(motion_profile)
+PowerPlan = motion_profile.PowerPlan
+
+PWM_FULL_SCALE = 65535
+GRAVITY_MPS2 = 9.81
+
+# MicroPython's ticks_* values wrap at 2**30
+_TICKS_PERIOD = 1 << 30
+_TICKS_MASK = _TICKS_PERIOD - 1
+_TICKS_HALF = _TICKS_PERIOD // 2
+
+# Motor Moves constants (see motor_moves.py and program_store.py)
+_MOVES_TICK_MS = 10
+_MOVES_SCALE_FACTOR = 512
+_MOVES_DIRECTIONS = {"U": (1, 1), "D": (-1, -1), "L": (-1, 1), "R": (1, -1)}
+_MOVES_CODES = "UDLR"               # program_store direction codes
+
+_STOPPED_MMPS = 1.0             # wheel speed treated as stopped
+
+
+@dataclass
+class RobotModel:
+    """Physical parameters of the simulated robot."""
+
+    max_speed_mmps: float = 400.0   # wheel speed at full PWM
+    track_mm: float = 80.0          # distance between the wheels
+    drive_tau_ms: float = 60.0      # time constant of the wheel speed while driven
+    coast_tau_ms: float = 120.0     # time constant of the wheel speed with no output
+    deadband: int = 4000            # PWM below which the wheels don't turn
+    gyro_bias_dps: float = 0.0      # constant error added to the gyro reading
+
+
+@dataclass
+class Summary:         # pylint: disable=too-many-instance-attributes
+    """Result of a simulated run."""
+
+    duration_ms: int            # until the robot came to rest
+    distance_mm: float          # length of the path travelled
+    x_mm: float                 # final position (x forwards at the start)
+    y_mm: float
+    heading_deg: float          # final heading, anti-clockwise positive
+    peak_speed_mmps: float
+    peak_rate_dps: float
+    outputs: int                # set_motors calls made
+
+    def __str__(self):
+        return (f"{self.duration_ms:6d} ms  {self.distance_mm:7.1f} mm  "
+                f"end ({self.x_mm:7.1f}, {self.y_mm:7.1f}) mm {self.heading_deg:7.1f} deg  "
+                f"peak {self.peak_speed_mmps:5.0f} mm/s {self.peak_rate_dps:5.0f} deg/s  "
+                f"{self.outputs} outputs")
+
+
+class SimHexDrive:
+    """Stand-in for the HexDrive app which records every output it is sent."""
+
+    def __init__(self, sim: Simulation):
+        self._sim = sim
+        self.power = False
+        self.freq = 0
+        self.outputs: list[tuple[int, int, int]] = []     # (t_ms, left, right)
+
+    def initialise(self) -> bool:
+        """Nothing to initialise."""
+        return True
+
+    def set_logging(self, state: bool):
+        """Logging is not simulated."""
+
+    def set_power(self, state: bool) -> bool:
+        """Record the motor power state."""
+        self.power = state
+        return True
+
+    def set_freq(self, freq: int, channel: int | None = None) -> bool:  # pylint: disable=unused-argument
+        """Record the PWM frequency."""
+        self.freq = freq
+        return True
+
+    def set_motors(self, outputs) -> bool:
+        """Record *outputs* and apply them to the simulated motors."""
+        left, right = outputs
+        self.outputs.append((self._sim.now_ms, int(left), int(right)))
+        self._sim.set_output(left, right)
+        return True
+
+
+class SimImu:
+    """Stand-in for the badge ``imu`` module reading the simulated robot."""
+
+    def __init__(self, sim: Simulation):
+        self._sim = sim
+
+    def gyro_read(self) -> tuple[float, float, float]:
+        """Yaw rate on the z axis, clockwise positive, plus the model's gyro bias."""
+        sim = self._sim
+        return (0.0, 0.0, -sim.rate_dps + sim.model.gyro_bias_dps)
+
+    def acc_read(self) -> tuple[float, float, float]:
+        """Forward acceleration on x, centripetal on y and gravity on z (m/s²)."""
+        sim = self._sim
+        return (sim.accel_mps2, sim.speed_mmps * math.radians(sim.rate_dps) / 1000.0, GRAVITY_MPS2)
+
+
+class _VirtualSelector(selectors.SelectSelector):
+    """Selector which, instead of waiting, moves the simulation on to the next timer."""
+
+    def __init__(self, sim: Simulation):
+        super().__init__()
+        self._sim = sim
+
+    def select(self, timeout=None):
+        """Advance the clock by *timeout* instead of waiting; nothing is ever ready."""
+        if timeout is None:
+            raise RuntimeError("simulation deadlocked: no task is waiting on a timer")
+        if timeout > 0:
+            self._sim.advance_us(max(1, math.ceil(timeout * 1_000_000)))
+        return []
+
+
+class _VirtualEventLoop(asyncio.SelectorEventLoop):
+    """Event loop whose clock is the simulation's."""
+
+    def __init__(self, sim: Simulation):
+        super().__init__(_VirtualSelector(sim))
+        self._sim = sim
+
+    def time(self) -> float:
+        """The simulation time (s)."""
+        return self._sim.now_us / 1_000_000
+
+
+class Simulation:      # pylint: disable=too-many-instance-attributes,too-many-public-methods
+    """Differential-drive robot, fake HexDrive and fake IMU on a virtual clock.
+
+    Parameters
+    ----------
+    model : RobotModel | None
+        Physical parameters (defaults if None).
+    step_us : int
+        Longest physics integration step.
+    sample_ms : int
+        Interval between the points recorded in ``path``.
+    """
+
+    def __init__(self, model: RobotModel | None = None, step_us: int = 1000, sample_ms: int = 10):
+        self.model = model or RobotModel()
+        self.step_us = step_us
+        self.sample_ms = sample_ms
+        self.now_us = 0
+        self.hexdrive = SimHexDrive(self)
+        self.imu = SimImu(self)
+        self._output = (0, 0)
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self.reset()
+
+    # ------------------------------------------------------------------
+    # State
+    # ------------------------------------------------------------------
+
+    def reset(self):
+        """Put the robot back at the origin, at rest, facing along x."""
+        self.x_mm = 0.0
+        self.y_mm = 0.0
+        self.heading_rad = 0.0
+        self.left_mmps = 0.0
+        self.right_mmps = 0.0
+        self.accel_mps2 = 0.0
+        self.distance_mm = 0.0
+        self.peak_speed_mmps = 0.0
+        self.peak_rate_dps = 0.0
+        self.rest_us = self.now_us
+        self.path: list[tuple[int, float, float, float]] = []    # (t_ms, x_mm, y_mm, heading_deg)
+        self._next_sample_us = self.now_us
+        self.hexdrive.outputs.clear()
+
+    @property
+    def now_ms(self) -> int:
+        """The simulation time (ms)."""
+        return self.now_us // 1000
+
+    @property
+    def heading_deg(self) -> float:
+        """Heading, anti-clockwise positive."""
+        return math.degrees(self.heading_rad)
+
+    @property
+    def speed_mmps(self) -> float:
+        """Forward speed of the middle of the axle."""
+        return (self.left_mmps + self.right_mmps) / 2.0
+
+    @property
+    def rate_dps(self) -> float:
+        """Yaw rate, anti-clockwise positive."""
+        return math.degrees((self.right_mmps - self.left_mmps) / self.model.track_mm)
+
+    def set_output(self, left: int, right: int):
+        """Apply PWM outputs to the motors from now on."""
+        self._output = (int(left), int(right))
+
+    def summary(self) -> Summary:
+        """Path and timing of the run so far."""
+        return Summary(duration_ms=self.rest_us // 1000, distance_mm=self.distance_mm,
+                       x_mm=self.x_mm, y_mm=self.y_mm, heading_deg=self.heading_deg,
+                       peak_speed_mmps=self.peak_speed_mmps, peak_rate_dps=self.peak_rate_dps,
+                       outputs=len(self.hexdrive.outputs))
+
+    # ------------------------------------------------------------------
+    # Physics
+    # ------------------------------------------------------------------
+
+    def _target_mmps(self, pwm: int) -> float:
+        model = self.model
+        magnitude = min(abs(pwm), PWM_FULL_SCALE) - model.deadband
+        if magnitude <= 0:
+            return 0.0
+        speed = model.max_speed_mmps * magnitude / (PWM_FULL_SCALE - model.deadband)
+        return speed if pwm > 0 else -speed
+
+    def _wheel(self, speed: float, pwm: int, dt_ms: float) -> float:
+        target = self._target_mmps(pwm)
+        tau = self.model.drive_tau_ms if target != 0.0 else self.model.coast_tau_ms
+        speed += (target - speed) * (1.0 - math.exp(-dt_ms / tau))
+        if target == 0.0 and abs(speed) < _STOPPED_MMPS:
+            speed = 0.0
+        return speed
+
+    def _step(self, dt_us: int):
+        dt_ms = dt_us / 1000.0
+        dt_s = dt_us / 1_000_000
+        before = self.speed_mmps
+        left, right = self._output
+        self.left_mmps = self._wheel(self.left_mmps, left, dt_ms)
+        self.right_mmps = self._wheel(self.right_mmps, right, dt_ms)
+        speed = self.speed_mmps
+        omega = (self.right_mmps - self.left_mmps) / self.model.track_mm
+        heading = self.heading_rad + omega * dt_s / 2.0      # midpoint heading for the step
+        self.x_mm += speed * math.cos(heading) * dt_s
+        self.y_mm += speed * math.sin(heading) * dt_s
+        self.heading_rad += omega * dt_s
+        self.distance_mm += abs(speed) * dt_s
+        self.accel_mps2 = (speed - before) / 1000.0 / dt_s
+        self.now_us += dt_us
+        self.peak_speed_mmps = max(self.peak_speed_mmps, abs(speed))
+        self.peak_rate_dps = max(self.peak_rate_dps, abs(math.degrees(omega)))
+        if self.left_mmps != 0.0 or self.right_mmps != 0.0 or self._output != (0, 0):
+            self.rest_us = self.now_us
+        if self.now_us >= self._next_sample_us:
+            self.path.append((self.now_ms, self.x_mm, self.y_mm, self.heading_deg))
+            self._next_sample_us += self.sample_ms * 1000
+
+    def advance_us(self, us: int):
+        """Move the clock on by *us*, integrating the robot's motion."""
+        while us > 0:
+            dt = min(us, self.step_us)
+            self._step(dt)
+            us -= dt
+
+    def advance_ms(self, ms: int):
+        """Move the clock on by *ms*, integrating the robot's motion."""
+        self.advance_us(ms * 1000)
+
+    def settle(self, timeout_ms: int = 2000):
+        """Let the robot coast until it comes to rest (or *timeout_ms* passes)."""
+        end_us = self.now_us + timeout_ms * 1000
+        while self.now_us < end_us and (self.left_mmps != 0.0 or self.right_mmps != 0.0):
+            self.advance_us(self.step_us)
+
+    # ------------------------------------------------------------------
+    # Virtual clock
+    # ------------------------------------------------------------------
+
+    def ticks_ms(self) -> int:
+        """``time.ticks_ms`` on the virtual clock."""
+        return (self.now_us // 1000) & _TICKS_MASK
+
+    def ticks_us(self) -> int:
+        """``time.ticks_us`` on the virtual clock."""
+        return self.now_us & _TICKS_MASK
+
+    @staticmethod
+    def ticks_diff(end: int, start: int) -> int:
+        """``time.ticks_diff`` for the virtual clock's wrapping ticks."""
+        return ((end - start + _TICKS_HALF) & _TICKS_MASK) - _TICKS_HALF
+
+    @staticmethod
+    def ticks_add(ticks: int, delta: int) -> int:
+        """``time.ticks_add`` for the virtual clock's wrapping ticks."""
+        return (ticks + delta) & _TICKS_MASK
+
+    @contextmanager
+    def installed(self):
+        """Point ``time.ticks_*`` and ``asyncio.sleep_ms`` at the virtual clock while active."""
+        names = ("ticks_ms", "ticks_us", "ticks_diff", "ticks_add")
+        saved = {name: getattr(time, name, None) for name in names}
+        saved_sleep_ms = getattr(asyncio, "sleep_ms", None)
+        sleep = asyncio.sleep
+        for name in names:
+            setattr(time, name, getattr(self, name))
+        asyncio.sleep_ms = lambda ms: sleep(ms / 1000)
+        try:
+            yield self
+        finally:
+            for name, value in saved.items():
+                if value is None:
+                    delattr(time, name)
+                else:
+                    setattr(time, name, value)
+            if saved_sleep_ms is None:
+                del asyncio.sleep_ms
+            else:
+                asyncio.sleep_ms = saved_sleep_ms
+
+    def attach_imu(self, module):
+        """Make *module* (motor_controller) read the simulated IMU; do this before constructing a controller."""
+        module._imu = self.imu      # pylint: disable=protected-access
+
+    # ------------------------------------------------------------------
+    # Running code
+    # ------------------------------------------------------------------
+
+    def run(self, coro, settle: bool = True):
+        """Run *coro* to completion on the virtual clock and return its result."""
+        if self._loop is None:
+            self._loop = _VirtualEventLoop(self)
+        with self.installed():
+            result = self._loop.run_until_complete(coro)
+        if settle:
+            self.settle()
+        return result
+
+    def close(self):
+        """Close the event loop used by ``run``."""
+        if self._loop is not None:
+            self._loop.close()
+            self._loop = None
+
+    def run_background(self, update, period_ms: int = 10, until=None, timeout_ms: int = 60000,
+                       settle: bool = True) -> Summary:
+        """Call ``update(delta)`` every *period_ms*, as the app's background loop does.
+
+        Any output it returns is sent to the HexDrive.  Runs until ``until()``
+        is true or, without *until*, until the update returns None after it
+        has returned an output.
+        """
+        end_us = self.now_us + timeout_ms * 1000
+        started = False
+        with self.installed():
+            while self.now_us < end_us:
+                output = update(period_ms)
+                if output is not None:
+                    self.hexdrive.set_motors(output)
+                    started = True
+                elif until is None and started:
+                    break
+                if until is not None and until():
+                    break
+                self.advance_ms(period_ms)
+        if settle:
+            self.settle()
+        return self.summary()
+
+
+    def play_plans(self, plans, settle: bool = True) -> Summary:
+        """Send each ``(output, duration_ms)`` step of the power plans in *plans*
+        to the HexDrive and hold it for exactly its duration."""
+        for plan in plans:
+            for output, duration_ms in plan:
+                self.hexdrive.set_motors(output)
+                self.advance_ms(duration_ms)
+        if settle:
+            self.settle()
+        return self.summary()
+
+    def run_motor_moves(self, program: str, settle: bool = True, **settings) -> Summary:
+        """Run a Motor Moves program such as ``"U4 R2 U4"`` through the app's own
+        ``MotorMovesMgr``, as the app's background loop does (needs the badge simulator).
+
+        *settings* are Motor Moves setting values (``max_power``, ``acceleration``,
+        ``drive_step_ms``, ``turn_step_ms``); the app's defaults apply to any not given.
+        """
+        modules = badge_modules()
+        if modules is None:
+            raise RuntimeError("the badge simulator (sim.run) is not available")
+        motor_moves, program_store, settings_mgr = modules
+        container = {}
+        container['logging'] = settings_mgr.MySetting(container, False, False, True)
+        for name, value in settings.items():
+            container[name] = settings_mgr.MySetting(container, value, value, value)
+        app = types.SimpleNamespace(settings=container, hexdrive=self.hexdrive, hexdrive_apps=[self.hexdrive],
+                                    motor_controller=None, notification=None, countdown_message="",
+                                    update_period=0, refresh=False, last_press=None, animation_counter=0,
+                                    long_press_delta=0, run_countdown_elapsed_ms=0)
+        mgr = motor_moves.MotorMovesMgr(app)
+        mgr.loaded_program = program_store.encode_program(_program_steps(program))
+        mgr.compile_program()
+        mgr.begin_moves()
+        return self.run_background(mgr.background_update, _MOVES_TICK_MS, settle=settle)
+
+
+def badge_modules():
+    """The app's motor_moves, program_store and settings_mgr modules, or None
+    without the badge simulator."""
+    if str(BADGE_SIM_ROOT) not in sys.path and (BADGE_SIM_ROOT / "sim" / "run.py").exists():
+        sys.path.append(str(BADGE_SIM_ROOT))
+    try:
+        # side effect: configures sys.path & fakes
+        import sim.run  # noqa: F401  pylint: disable=unused-import
+        from sim.apps.BadgeBot import motor_moves, program_store, settings_mgr
+    except ImportError:
+        return None
+    return motor_moves, program_store, settings_mgr
+
+
+def _program_steps(program: str) -> list[tuple[int, int]]:
+    """(direction code, count) moves of a program such as ``"U4 R2 U4"``."""
+    return [(_MOVES_CODES.index(move[0]), int(move[1:] or 1)) for move in program.upper().split()]
+
+
+def program_plans(program: str, max_power: int, acceleration: int,
+                  drive_step_ms: int = 50, turn_step_ms: int = 20) -> list[PowerPlan]:
+    """Power plans for a Motor Moves program such as ``"U4 R2 U4"``, for ``play_plans``.
+
+    Each move is a direction (U, D, L or R) and a step count (default 1);
+    the settings are in the same units as the app's Motor Moves settings.
+    Planned as ``Instruction.make_power_plan`` plans them, for use without
+    the badge simulator.
+    """
+    plans = []
+    for direction, count in _program_steps(program):
+        move = _MOVES_CODES[direction]
+        step_ms = drive_step_ms if move in "UD" else turn_step_ms
+        plans.append(PowerPlan(_MOVES_DIRECTIONS[move], count * step_ms, _MOVES_SCALE_FACTOR * acceleration,
+                               _MOVES_SCALE_FACTOR * max_power, _MOVES_TICK_MS))
+    return plans
+
+
+def simulate_program(program: str, model: RobotModel | None = None, **settings) -> Summary:
+    """Run a Motor Moves program from rest and summarise the result.
+
+    Uses the app's ``MotorMovesMgr`` under the badge simulator, and
+    ``play_plans`` without it.
+    """
+    sim = Simulation(model)
+    if badge_modules() is not None:
+        return sim.run_motor_moves(program, **settings)
+    return sim.play_plans(program_plans(program, **settings))
+
+
+def _int_list(text: str) -> list[int]:
+    """Parse a comma separated list of integers."""
+    return [int(v) for v in text.split(",")]
+
+
+def main() -> int:
+    """Benchmark a Motor Moves program over the settings given on the command line."""
+    parser = argparse.ArgumentParser(description=__doc__.split("\n", 1)[0])
+    parser.add_argument("--program", default="U4 R2 U4", help="Motor Moves program, e.g. \"U4 R2 U4\"")
+    parser.add_argument("--max-power", type=_int_list, default=[96], help="max_power setting(s), comma separated")
+    parser.add_argument("--acceleration", type=_int_list, default=[48], help="acceleration setting(s), comma separated")
+    parser.add_argument("--drive-step-ms", type=int, default=None, help="drive_step_ms setting (default: the app's)")
+    parser.add_argument("--turn-step-ms", type=int, default=None, help="turn_step_ms setting (default: the app's)")
+    parser.add_argument("--max-speed", type=float, default=RobotModel.max_speed_mmps, help="wheel speed at full power (mm/s)")
+    parser.add_argument("--track", type=float, default=RobotModel.track_mm, help="wheel base (mm)")
+    parser.add_argument("--drive-tau", type=float, default=RobotModel.drive_tau_ms, help="wheel speed time constant when driven (ms)")
+    parser.add_argument("--coast-tau", type=float, default=RobotModel.coast_tau_ms, help="wheel speed time constant when coasting (ms)")
+    args = parser.parse_args()
+
+    model = RobotModel(max_speed_mmps=args.max_speed, track_mm=args.track,
+                       drive_tau_ms=args.drive_tau, coast_tau_ms=args.coast_tau)
+    steps = {name: value for name, value in (("drive_step_ms", args.drive_step_ms), ("turn_step_ms", args.turn_step_ms))
+             if value is not None}
+    print(f"Program: {args.program} ({'MotorMovesMgr' if badge_modules() is not None else 'standalone power plans'})")
+    for max_power in args.max_power:
+        for acceleration in args.acceleration:
+            summary = simulate_program(args.program, model, max_power=max_power, acceleration=acceleration, **steps)
+            print(f"max_power={max_power:3d} acceleration={acceleration:3d}  {summary}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
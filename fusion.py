@@ -0,0 +1,150 @@
+# Sensor Fusion Module for BadgeBot
+#
+# Estimates heading, forward velocity and distance from the gyro and the
+# accelerometer together, at the control rate, for MotorController.
+#
+# It is a complementary filter rather than a full Kalman filter:
+#
+#   * the gyro bias is tracked whenever the robot is detected to be still,
+#     so slow rotations can be integrated with a much smaller deadband than
+#     a raw threshold allows;
+#   * the gyro gates the accelerometer – while the robot is rotating in
+#     place the forward axis picks up centripetal and tangential terms, so
+#     velocity is held rather than integrated;
+#   * zero-velocity updates (gyro and accel both quiet with the motors off)
+#     reset the accelerometer velocity, and a leak pulls it back towards
+#     zero once the motors stop, bounding the drift of the double integral;
+#   * distance is integrated with the trapezoidal rule.
+#
+# It also predicts where a move will end up if the motors start ramping to
+# zero now, so callers can begin stopping early instead of overshooting.
+#
+# Public interface:
+#   MotionEstimator(gyro_deadband, accel_deadband, accel_lpf_alpha)
+#     reset_heading() / reset_distance() / zero_velocity()
+#     set_gyro_bias(dps)
+#     update_gyro(dps, dt_ms)    – feed one gyro (yaw) sample
+#     update_accel(mps2, dt_ms)  – feed one forward acceleration sample
+#     driving                    – True while the motors are being driven
+#     rotating                   – True while turning too fast for the accelerometer to be used
+#     heading_deg, rate_dps, velocity_mps, distance_m, accel_mps2, gyro_bias_dps
+#     stop_heading_deg(ramp_ms)  – predicted |heading| once stopped
+#     stop_distance_m(ramp_ms)   – predicted distance once stopped
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+_STILL_MS          = const(100)     # how long the sensors must be quiet before the robot counts as still
+_STILL_GYRO_DPS    = 2.0            # bias-corrected rate below which the robot may be still
+_STILL_ACCEL_MPS2  = 0.15           # filtered accel below which the robot may be still
+_ROTATING_DPS      = 20.0           # above this the accelerometer's forward axis is not trusted
+_BIAS_ALPHA        = 0.05           # how quickly the gyro bias follows still readings
+_COAST_TAU_S       = 0.25           # time constant of the velocity leak once the motors are off
+
+
+class MotionEstimator:
+    """Complementary-filter estimate of heading, velocity and distance.
+
+    Parameters
+    ----------
+    gyro_deadband : float
+        Bias-corrected yaw rate (°/s) below which the gyro is treated as noise.
+    accel_deadband : float
+        Filtered forward acceleration (m/s²) below which the accel is treated as noise.
+    accel_lpf_alpha : float
+        Low-pass filter coefficient for the accelerometer (0–1, higher = faster response).
+    """
+    __slots__ = ("_gyro_deadband", "_accel_deadband", "_accel_lpf_alpha", "_accel_filtered", "_still_ms",
+                 "driving", "heading_deg", "rate_dps", "velocity_mps", "distance_m", "accel_mps2", "gyro_bias_dps")
+
+    def __init__(self, gyro_deadband: float = 0.5, accel_deadband: float = 0.05, accel_lpf_alpha: float = 0.6):
+        self._gyro_deadband: float = gyro_deadband
+        self._accel_deadband: float = accel_deadband
+        self._accel_lpf_alpha: float = accel_lpf_alpha
+        self._accel_filtered: float = 0.0
+        self._still_ms: int = 0
+        self.driving: bool = False
+        self.heading_deg: float = 0.0
+        self.rate_dps: float = 0.0
+        self.velocity_mps: float = 0.0
+        self.distance_m: float = 0.0
+        self.accel_mps2: float = 0.0
+        self.gyro_bias_dps: float = 0.0
+
+
+    def reset_heading(self):
+        """Zero the integrated heading (keeps the gyro bias)."""
+        self.heading_deg = 0.0
+
+
+    def reset_distance(self):
+        """Zero the accelerometer integrator state."""
+        self._accel_filtered = 0.0
+        self.accel_mps2 = 0.0
+        self.velocity_mps = 0.0
+        self.distance_m = 0.0
+
+
+    def zero_velocity(self):
+        """Apply a zero-velocity update, e.g. once the robot is known to have stopped."""
+        self.velocity_mps = 0.0
+
+
+    def set_gyro_bias(self, dps: float):
+        """Set the gyro bias from a stationary calibration."""
+        self.gyro_bias_dps = dps
+
+
+    def update_gyro(self, dps: float, dt_ms: int):
+        """Integrate one raw yaw-rate sample taken *dt_ms* after the previous one."""
+        rate = dps - self.gyro_bias_dps
+        if not self.driving and abs(rate) < _STILL_GYRO_DPS and abs(self._accel_filtered) < _STILL_ACCEL_MPS2:
+            self._still_ms += dt_ms
+            if self._still_ms >= _STILL_MS:
+                # Still: track the bias and pin the velocity to zero
+                self.gyro_bias_dps += _BIAS_ALPHA * rate
+                rate = dps - self.gyro_bias_dps
+                self.velocity_mps = 0.0
+        else:
+            self._still_ms = 0
+        if abs(rate) < self._gyro_deadband:
+            rate = 0.0
+        self.rate_dps = rate
+        self.heading_deg += rate * dt_ms / 1000.0
+
+
+    def update_accel(self, mps2: float, dt_ms: int):
+        """Integrate one bias-corrected forward acceleration sample taken *dt_ms* after the previous one."""
+        dt = dt_ms / 1000.0
+        alpha = self._accel_lpf_alpha
+        self._accel_filtered = alpha * mps2 + (1.0 - alpha) * self._accel_filtered
+        accel = self._accel_filtered
+        if abs(accel) < self._accel_deadband or self.rotating:
+            accel = 0.0
+        self.accel_mps2 = accel
+        v_prev = self.velocity_mps
+        v = v_prev + accel * dt
+        if not self.driving:
+            # Motors off: friction brings the robot to rest, so leak the velocity towards zero
+            v -= v * min(1.0, dt / _COAST_TAU_S)
+        self.velocity_mps = v
+        self.distance_m += abs(v_prev + v) * 0.5 * dt
+
+
+    @property
+    def rotating(self) -> bool:
+        """Whether the robot is turning too fast for the accelerometer to be used."""
+        return abs(self.rate_dps) > _ROTATING_DPS
+
+
+    def stop_heading_deg(self, ramp_ms: int) -> float:
+        """Predicted |heading| if the motors ramp to zero over *ramp_ms* starting now."""
+        return abs(self.heading_deg) + abs(self.rate_dps) * ramp_ms / 2000.0
+
+
+    def stop_distance_m(self, ramp_ms: int) -> float:
+        """Predicted distance if the motors ramp to zero over *ramp_ms* starting now."""
+        return self.distance_m + abs(self.velocity_mps) * ramp_ms / 2000.0
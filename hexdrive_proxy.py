@@ -0,0 +1,122 @@
+# HexDrive Proxy Module for BadgeBot
+#
+# Wraps the HexDrive hexpansion app and remembers the power, PWM frequency
+# and motor outputs last sent to it, so repeated calls with the same values
+# (every control loop tick, and the start of every command) don't go all the
+# way to the driver.  Unchanged motor outputs are still re-sent every
+# keep-alive period so the HexDrive's own keep-alive timeout (1000 ms) never
+# expires while the motors are meant to be running.
+#
+# Every other HexDrive method is passed straight through.
+#
+# Public interface:
+#   HexDriveProxy(app, keep_alive_ms)
+#     set_power(state) / set_freq(freq, channel) / set_motors(outputs)
+#     initialise()   – pass through and forget the cached state
+#     invalidate()   – forget the cached state (next calls are always sent)
+#     app            – the wrapped HexDrive app
+#     sent, skipped  – driver calls made / suppressed
+
+import time
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+_DEFAULT_KEEP_ALIVE_MS = const(500)     # half the HexDrive keep-alive timeout
+
+
+class HexDriveProxy:
+    """Caching wrapper around a HexDrive app.
+
+    Parameters
+    ----------
+    app : HexDriveApp
+        The HexDrive hexpansion app to forward calls to.
+    keep_alive_ms : int
+        Longest time an unchanged motor output is held back before it is sent again.
+    """
+    __slots__ = ("app", "_keep_alive_ms", "_power", "_freq", "_outputs", "_outputs_ms", "sent", "skipped")
+
+    def __init__(self, app, keep_alive_ms: int = _DEFAULT_KEEP_ALIVE_MS):
+        self.app = app
+        self._keep_alive_ms: int = keep_alive_ms
+        self._power: bool | None = None
+        self._freq: dict = {}               # channel (None = all) -> frequency last set
+        self._outputs: tuple | None = None
+        self._outputs_ms: int = 0
+        self.sent: int = 0
+        self.skipped: int = 0
+
+
+    def __getattr__(self, name):
+        # Anything not cached here goes straight to the HexDrive app; other
+        # setters (e.g. servo positions) may change the PWM outputs as well
+        if name.startswith("set_"):
+            self._outputs = None
+        return getattr(self.app, name)
+
+
+    def invalidate(self):
+        """Forget the cached driver state, so the next call of each kind is always sent."""
+        self._power = None
+        self._freq = {}
+        self._outputs = None
+
+
+    def initialise(self) -> bool:
+        """Re-initialise the HexDrive, which resets its state."""
+        self.invalidate()
+        return self.app.initialise()
+
+
+    def set_power(self, state: bool) -> bool:
+        """Switch the HexDrive's motor power, unless it is already in that state."""
+        if state == self._power:
+            self.skipped += 1
+            return True
+        result = self.app.set_power(state)
+        self.sent += 1
+        # the outputs have to be sent again after a power change
+        self._outputs = None
+        self._power = None if result is False else state
+        return result
+
+
+    def set_freq(self, freq: int, channel: int | None = None) -> bool:
+        """Set the PWM frequency, unless it is already set to *freq*."""
+        if self._freq.get(channel) == freq:
+            self.skipped += 1
+            return True
+        result = self.app.set_freq(freq) if channel is None else self.app.set_freq(freq, channel=channel)
+        self.sent += 1
+        self._outputs = None
+        if channel is None:
+            # setting every channel supersedes any per-channel values
+            self._freq = {}
+        else:
+            # ...and one channel differing means they are no longer all at the same value
+            self._freq.pop(None, None)
+        if result is False:
+            self._freq.pop(channel, None)
+        else:
+            self._freq[channel] = freq
+        return result
+
+
+    def set_motors(self, outputs: tuple) -> bool:
+        """Set the motor outputs, skipping repeats until the keep-alive period is due."""
+        now = time.ticks_ms()
+        if outputs == self._outputs and time.ticks_diff(now, self._outputs_ms) < self._keep_alive_ms:
+            self.skipped += 1
+            return True
+        result = self.app.set_motors(outputs)
+        self.sent += 1
+        if result is False:
+            self._outputs = None
+        else:
+            self._outputs = tuple(outputs)
+            self._outputs_ms = now
+        return result
@@ -726,10 +726,11 @@ class HexpansionMgr:
             try:
                 from .motor_controller import MotorController
                 app.motor_controller = MotorController(
-                    app.hexdrive_apps[0], app.settings,
+                    app.hexdrive, app.settings,
                     logging=self._logging,
                     front_face_setting=app.settings.get('front_face'),
                     apply_motor_directions_callback=app.apply_motor_directions,
+                    output_arbiter=app.output_arbiter,
                 )
             except Exception as e:      # pylint: disable=broad-except
                 print(f"H:MotorController init failed: {e}")
@@ -0,0 +1,141 @@
+# IMU Sampler Module for BadgeBot
+#
+# Reads the IMU in a background asyncio task at (close to) the sensor's
+# native output rate, independent of the 10 ms control period, and queues
+# timestamped samples in a small array-backed FIFO.  The control loop then
+# drains every queued sample on each tick, so the integrators see all of the
+# data instead of one reading per tick.
+#
+# The FIFO is a fixed-size ring: nothing is allocated per sample, and if the
+# consumer falls behind the oldest samples are dropped (and counted).
+#
+# Public interface:
+#   ImuSampler(gyro_read, acc_read, gyro_axis, capacity, period_ms)
+#     start(read_accel) / stop() – run / cancel the background sampling task
+#     running                     – True while the task is running
+#     sample(now_us)              – take one reading now (used by the task)
+#     pop()                       – index of the oldest queued sample, or -1
+#     t_us / gyro / acc_x / acc_y – sample arrays, indexed by pop()
+#     count, dropped              – queued and dropped sample counts
+
+import asyncio
+import time
+from array import array
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+_DEFAULT_CAPACITY  = const(32)      # samples held; several control periods at the default rate
+_DEFAULT_PERIOD_MS = const(2)       # sampling period, close to the IMU's output data rate
+
+
+class ImuSampler:
+    """Background IMU reader with a fixed-size FIFO of timestamped samples.
+
+    Parameters
+    ----------
+    gyro_read : Callable[[], tuple] | None
+        Returns the gyro reading (°/s per axis), e.g. ``imu.gyro_read``.
+    acc_read : Callable[[], tuple] | None
+        Returns the accelerometer reading (m/s² per axis), e.g. ``imu.acc_read``.
+    gyro_axis : int
+        Index into the gyro reading for the yaw axis.
+    capacity : int
+        Number of samples the FIFO holds.
+    period_ms : int
+        Interval between readings taken by the background task.
+    """
+    __slots__ = ("_gyro_read", "_acc_read", "_gyro_axis", "_capacity", "_period_ms", "_read_accel",
+                 "_head", "_task", "t_us", "gyro", "acc_x", "acc_y", "count", "dropped")
+
+    def __init__(self, gyro_read, acc_read, gyro_axis: int = 2,
+                 capacity: int = _DEFAULT_CAPACITY, period_ms: int = _DEFAULT_PERIOD_MS):
+        self._gyro_read = gyro_read
+        self._acc_read = acc_read
+        self._gyro_axis: int = gyro_axis
+        self._capacity: int = max(1, capacity)
+        self._period_ms: int = max(1, period_ms)
+        self._read_accel: bool = True
+        self._head: int = 0                 # index of the oldest queued sample
+        self._task = None
+        self.t_us = array("i", [0] * self._capacity)
+        self.gyro = array("f", [0.0] * self._capacity)
+        self.acc_x = array("f", [0.0] * self._capacity)
+        self.acc_y = array("f", [0.0] * self._capacity)
+        self.count: int = 0
+        self.dropped: int = 0
+
+
+    @property
+    def running(self) -> bool:
+        """True while the background sampling task is running."""
+        return self._task is not None
+
+
+    def start(self, read_accel: bool = True):
+        """Clear the FIFO and start sampling in the background."""
+        self.stop()
+        self._head = 0
+        self.count = 0
+        self.dropped = 0
+        self._read_accel = read_accel and self._acc_read is not None
+        if self._gyro_read is None:
+            return
+        self._task = asyncio.create_task(self._run())
+
+
+    def stop(self):
+        """Stop the background sampling task (queued samples are kept)."""
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+
+    async def _run(self):
+        try:
+            while True:
+                self.sample(time.ticks_us())
+                await asyncio.sleep_ms(self._period_ms)
+        except asyncio.CancelledError:
+            pass
+
+
+    def sample(self, now_us: int):
+        """Take one reading and queue it, dropping the oldest sample if the FIFO is full."""
+        try:
+            gyro = float(self._gyro_read()[self._gyro_axis])
+            if self._read_accel:
+                acc = self._acc_read()
+                acc_x = float(acc[0])
+                acc_y = float(acc[1])
+            else:
+                acc_x = acc_y = 0.0
+        except Exception:       # pylint: disable=broad-exception-caught
+            return
+        capacity = self._capacity
+        if self.count == capacity:
+            self._head = (self._head + 1) % capacity
+            self.count -= 1
+            self.dropped += 1
+        i = (self._head + self.count) % capacity
+        self.t_us[i] = now_us
+        self.gyro[i] = gyro
+        self.acc_x[i] = acc_x
+        self.acc_y[i] = acc_y
+        self.count += 1
+
+
+    def pop(self) -> int:
+        """Remove the oldest queued sample and return its index into the sample arrays, or -1 if empty.
+
+        The slot stays valid until the next call to ``sample``.
+        """
+        if self.count == 0:
+            return -1
+        i = self._head
+        self._head = (i + 1) % self._capacity
+        self.count -= 1
+        return i
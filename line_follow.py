@@ -2,7 +2,7 @@
 #
 # Handles the line-following functionality.
 # Contains the LineSensors and LineSensor hardware driver classes
-# for QTRX reflectance sensors.
+# for QTRX reflectance sensors (timed by line_kernel.LineKernel).
 #
 # Public interface (called by the main app):
 #   __init__(app)           – wire up to BadgeBotApp
@@ -15,29 +15,29 @@
 #   create_line_sensors()   – create LineSensors from hexpansion config
 
 
-import time
-import gc
 from math import pi
 from events.input import BUTTON_TYPES
 from app_components.notification import Notification
 from app_components.tokens import label_font_size, button_labels
-from machine import Pin, disable_irq, enable_irq
+from machine import Pin
 from system.hexpansion.config import HexpansionConfig
-from .app import MOTOR_PWM_FREQ
+from .app import MOTOR_PWM_FREQ, MOTOR_POWER_SCALE_FACTOR
 from .motor_moves import DEFAULT_MAX_POWER
+from .line_kernel import LineKernel
+from .pid import PID
 
 # Line Follower constants
 _NUM_LINE_SENSORS = 2
 _LINE_SENSOR_DEFAULT_THRESHOLD = 500
 _LINE_SENSOR_READ_TIMEOUT_US = 5000            # Maximum expected discharge time for the line sensors; readings above this are ignored as timeouts
-_LINE_SENSOR_TRIGGER_DURATION_US = 10
-_LINE_SENSOR_UPDATE_PERIOD_MS = 10
+_LINE_SENSOR_UPDATE_PERIOD_MS = 5             # a reading takes two ticks (release, then collect + charge)
 _LINE_SENSOR_SAMPLE_RATE_UPDATE_PERIOD_MS = 1000
 
 # PID Gains
 _FOLLOWER_PID_KP_DEFAULT = 20000
 _FOLLOWER_PID_KI_DEFAULT = 0
 _FOLLOWER_PID_KD_DEFAULT = 0
+_FOLLOWER_PID_D_FILTER_MS = 20                 # derivative low-pass time constant (two readings)
 
 _FOLLOWER_FORWARD_POWER = 20000
 
@@ -60,9 +60,21 @@ SENSOR_NAMES       = ["Left", "Right"]
 class LineSensors:
     """Manages multiple QTRX line sensors efficiently.
 
-    All ctrl/sig pins are pulsed simultaneously (single 10µs charge for all)
-    and timing starts at the same moment, so all sensor responses are measured
-    in parallel rather than sequentially.
+    All ctrl/sig pins are charged and released together and timing starts
+    at the same moment, so all sensor responses are measured in parallel
+    rather than sequentially.
+
+    A reading is taken by calling step() once per loop tick rather than
+    waiting for it: one step charges the sensors, the next releases them,
+    and the falling edge IRQ of each signal pin captures its discharge time
+    while the loop gets on with other work.  The step after that collects
+    the captured times (waiting further steps if a sensor may still be
+    discharging) and starts charging for the next reading, so a reading is
+    completed every other tick.  The timing itself is done by a LineKernel.
+
+    The IRQ captures are delayed by however long the scheduler takes to run
+    them; readings seen to be late are discarded (see late_count()).  Setting
+    blocking times the discharge by polling the pins on release instead.
     """
 
     def __init__(self, sensor_configs):
@@ -71,6 +83,9 @@ class LineSensors:
             for cfg in sensor_configs
         ]
         self._threshold = 0
+        self._kernel = LineKernel([sensor.pins["ctrl"] for sensor in self._sensors],
+                                  [sensor.pins["sig"] for sensor in self._sensors],
+                                  _LINE_SENSOR_READ_TIMEOUT_US)
 
 
     # ------------------------------------------------------------------
@@ -90,6 +105,17 @@ class LineSensors:
         """Get the number of sensors managed by this LineSensors instance."""
         return len(self._sensors)
 
+    @property
+    def blocking(self) -> bool:
+        """Whether readings are taken by polling the pins rather than from their IRQs."""
+        return self._kernel.blocking
+
+    @blocking.setter
+    def blocking(self, value: bool):
+        """Select polled (True) or IRQ captured (False) readings from the next reading on."""
+        self._kernel.blocking = bool(value)
+        self._kernel.restart()
+
     @property
     def threshold(self):
         """Get the threshold value for the line sensors."""
@@ -101,9 +127,10 @@ class LineSensors:
         self._threshold = value
 
     def enable(self):
-        """Enable all sensors."""
-        for sensor in self._sensors:
-            sensor.enable()
+        """Enable all sensors and start a new reading on the next step()."""
+        for i, sensor in enumerate(self._sensors):
+            sensor.enable(self._kernel.handler(i))
+        self._kernel.restart()
 
     def disable(self):
         """Disable all sensors."""
@@ -112,100 +139,48 @@ class LineSensors:
 
     def raw_value(self, index):
         """Get the raw discharge time value for the sensor at the specified index."""
-        return self._sensors[index].value
+        return self._kernel.values[index]
 
     def raw_values(self):
         """Get the raw discharge time values for all sensors."""
-        return [sensor.value for sensor in self._sensors]
+        return list(self._kernel.values)
 
     def sample_count(self):
         """Get the total sample count across all sensors."""
-        return sum(sensor.sample_count for sensor in self._sensors)
+        return sum(self._kernel.counts)
 
     def sample_count_and_reset(self):
         """Atomically get the total sample count across all sensors and reset to zero."""
         count = self.sample_count()
-        for sensor in self._sensors:
-            sensor.sample_count = 0
+        counts = self._kernel.counts
+        for i in range(len(counts)):
+            counts[i] = 0
         return count
 
-    def read(self):
-        """Charge, release, and poll for all sensors using interrupts."""
-        for sensor in self._sensors:
-            if sensor.start_time != 0:
-                if time.ticks_diff(time.ticks_us(), sensor.start_time) <= _LINE_SENSOR_READ_TIMEOUT_US:
-                    print(f"Sensor {sensor.name} already in progress")
-                    return False
-
-        for sensor in self._sensors:
-            sensor.pins["ctrl"].on()
-            sensor.pins["sig"].init(mode=Pin.OUT)
-            sensor.pins["sig"].on()
-
-        time.sleep_us(_LINE_SENSOR_TRIGGER_DURATION_US)
-
-        irq_state = disable_irq()
-        start_time = time.ticks_us()
-        for sensor in self._sensors:
-            sensor.start_time = start_time
-            sensor.pins["sig"].init(mode=Pin.IN, pull=None)
-        enable_irq(irq_state)
-
-        return True
-
-    #@micropython.native
-    def read_blocking(self):
-        """Charge, release, and poll for all sensors — no IRQ needed."""
-
-        gc.disable()
-        irq_state = disable_irq()
+    def late_count(self):
+        """Get the total number of readings discarded because their IRQ ran late."""
+        return sum(self._kernel.late)
 
-        # Charge phase
-        for sensor in self._sensors:
-            sensor.pins["ctrl"].on()
-            sensor.pins["sig"].init(mode=Pin.OUT)
-            sensor.pins["sig"].on()
+    def restart(self):
+        """Abandon any reading in progress; the next step() starts a new one."""
+        self._kernel.restart()
 
-        time.sleep_us(_LINE_SENSOR_TRIGGER_DURATION_US)
+    def step(self) -> bool:
+        """Advance the acquisition by one loop tick.
 
-        # Release all sig pins simultaneously
-        start = time.ticks_us()
-        for sensor in self._sensors:
-            sensor.pins["sig"].init(mode=Pin.IN, pull=None)
-
-        # Poll until both sensors have fallen or timeout
-        done = [False] * len(self._sensors)
-        while not all(done):
-            now = time.ticks_us()
-            elapsed = time.ticks_diff(now, start)
-            if elapsed > _LINE_SENSOR_READ_TIMEOUT_US:
-                break
-            for i, sensor in enumerate(self._sensors):
-                if not done[i] and sensor.pins["sig"].value() == 0:
-                    sensor.value = elapsed
-                    sensor.pins["ctrl"].off()
-                    sensor.sample_count += 1
-                    done[i] = True
-
-        enable_irq(irq_state)
-        gc.enable()
-
-        # Mark timed-out sensors
-        for i, sensor in enumerate(self._sensors):
-            if not done[i]:
-                sensor.pins["ctrl"].off()
+        Returns True when this step completed a new reading of every sensor
+        (see raw_value()).  Sensors that did not discharge within the timeout
+        keep their previous value.
+        """
+        return self._kernel.step()
 
 # ---- LineSensor class ------------------------------------------------------
 
 class LineSensor:
-    """Driver for a single QTRX reflectance sensor."""
+    """Pins of a single QTRX reflectance sensor (the timing is done by LineSensors)."""
     def __init__(self, pins, name="LineSensor"):
         try:
             self._name = name
-            self.start_time = 0
-            self.value = 0
-            self._irq_state = None
-            self.sample_count = 0
             self.pins = pins
             self.pins["ctrl"].init(mode=Pin.OUT)
             self.pins["ctrl"].off()
@@ -226,41 +201,10 @@ class LineSensor:
         self.pins["sig"].off()
 
 
-    def enable(self):
-        """Enable the sensor by enabling interrupts on signal pin."""
+    def enable(self, handler):
+        """Enable the sensor by attaching *handler* to the falling edge interrupt of its signal pin."""
         print(f"Line Sensor {self._name} enabled")
-        self.pins["sig"].irq(trigger=Pin.IRQ_FALLING, handler=self.handler) # unfortunately hard and priority are not recognised keywords)
-        self.start_time = 0
-
-
-    def handler(self, _):
-        """Interrupt handler for the sensor signal pin.
-        Measures the time since the sensor was triggered and updates the state."""
-        # Currently as the "irq" is not a hardware interrupt we are not guaranteed that the handler will be called immediately
-        #  when the signal pin goes low, so instead of relying on the handler to capture the timing
-        #  it is recommended to do a blocking read in the background update loop.
-        # However the code here is the leanest way to capture the timing if the IRQ handler is called immediately when the signal
-        # pin goes low, so leaving it here for now in case that becomes possible in the future.
-
-        #if self.start_time == 0:
-        #    # spurious interrupt or handler called before read() set up the start_time; ignore
-        #    return
-        #self._irq_state = disable_irq()
-        value = time.ticks_diff(time.ticks_us(), self.start_time)
-        # Handle the hardware
-        #self.pins["sig"].irq(handler=None)
-        #enable_irq(self._irq_state)
-        #self.pins["sig"].off()
-        #self.pins["sig"].init(mode=Pin.OUT)
-        self.pins["ctrl"].off()
-        self.start_time = 0
-
-        if value > _LINE_SENSOR_READ_TIMEOUT_US:
-            # timeout expired; ignore this reading
-            #print(f"{self._name} reading timed out (value={value}µs)")
-            return
-        self.value = value
-        self.sample_count += 1
+        self.pins["sig"].irq(trigger=Pin.IRQ_FALLING, handler=handler) # unfortunately hard and priority are not recognised keywords)
 
 
 # ---- Settings initialisation -----------------------------------------------
@@ -268,6 +212,7 @@ class LineSensor:
 def init_settings(s, MySetting: type):      #pylint: disable=invalid-name
     """Register line-follower-specific settings in the shared settings dict."""
     s['line_threshold'] = MySetting(s, _LINE_SENSOR_DEFAULT_THRESHOLD, 0, 65535)
+    s['line_blocking']  = MySetting(s, False, False, True)
     s['pid_kp']         = MySetting(s, _FOLLOWER_PID_KP_DEFAULT, 0, 65536)
     s['pid_ki']         = MySetting(s, _FOLLOWER_PID_KI_DEFAULT, 0, 65535)
     s['pid_kd']         = MySetting(s, _FOLLOWER_PID_KD_DEFAULT, 0, 65535)
@@ -317,14 +262,11 @@ class LineFollowMgr:
         self.sensor_rate: int = 0     # sample rate
         self.follower_mode: int = _FOLLOWER_MODE_DIFFERENTIAL   # Default follower mode
         self.forward_power: int = -_FOLLOWER_FORWARD_POWER      # Default forward power for line follower (sign sets direction)
-        self.pid_integral: int = 0                             # Accumulated integral term for PID controller
-        self.pid_previous_error: int = 0                       # Previous error for derivative term of PID controller
-        self.kp: int = _FOLLOWER_PID_KP_DEFAULT
-        self.ki: int = _FOLLOWER_PID_KI_DEFAULT
-        self.kd: int = _FOLLOWER_PID_KD_DEFAULT
-        self.max_pwr: int = DEFAULT_MAX_POWER
+        self.max_pwr: int = DEFAULT_MAX_POWER * MOTOR_POWER_SCALE_FACTOR
+        self.pid = PID(_FOLLOWER_PID_KP_DEFAULT, _FOLLOWER_PID_KI_DEFAULT, _FOLLOWER_PID_KD_DEFAULT,
+                       self.max_pwr + _FOLLOWER_FORWARD_POWER, _FOLLOWER_PID_D_FILTER_MS)
+        self.reading_ms: int = 0                               # time since the last complete sensor reading
         self.line_threshold: int = _LINE_SENSOR_DEFAULT_THRESHOLD
-        self.integral_limit: int = 0
         self.motor_output = (0,0)
         if self._logging:
             print("LineFollowMgr initialised")
@@ -348,26 +290,22 @@ class LineFollowMgr:
             return False
         else:
             if len(app.hexdrive_apps) > 0:
-                app.hexdrive_apps[0].set_logging(False)
-                if app.hexdrive_apps[0].initialise() and app.hexdrive_apps[0].set_power(True) and app.hexdrive_apps[0].set_freq(MOTOR_PWM_FREQ):
-                    #self.line_sensors.enable()
-                    #self.line_sensors.read()    # initiate first sensor reading
-                    self.line_sensors.read_blocking()    # initiate first sensor reading
+                app.hexdrive.set_logging(False)
+                if app.hexdrive.initialise() and app.hexdrive.set_power(True) and app.hexdrive.set_freq(MOTOR_PWM_FREQ):
+                    self.line_sensors.blocking = app.settings['line_blocking'].v if 'line_blocking' in app.settings else False
+                    self.line_sensors.enable()    # arm the capture IRQs; the first reading starts on the next tick
                     app.update_period = _LINE_SENSOR_UPDATE_PERIOD_MS
                     app.set_menu(None)
                     app.button_states.clear()
                     app.refresh = True
                     app.auto_repeat_clear()
                     self.motor_output = (0,0)
-                    self.kp = app.settings['pid_kp'].v
-                    self.ki = app.settings['pid_ki'].v
-                    self.kd = app.settings['pid_kd'].v
-                    self.max_pwr = app.settings['max_power'].v if 'max_power' in app.settings else DEFAULT_MAX_POWER
+                    self.max_pwr = MOTOR_POWER_SCALE_FACTOR * (app.settings['max_power'].v if 'max_power' in app.settings else DEFAULT_MAX_POWER)
+                    # the correction has no further effect once both motors are saturated
+                    self.pid.set_gains(app.settings['pid_kp'].v, app.settings['pid_ki'].v, app.settings['pid_kd'].v,
+                                       self.max_pwr + abs(self.forward_power))
+                    self.reading_ms = 0
                     self.line_threshold = app.settings['line_threshold'].v
-                    if self.ki > 0:
-                        self.integral_limit = self.max_pwr // self.ki
-                    else:
-                        self.integral_limit = 0
                     if self._logging:
                         print("Entered Line Follower mode")
                     return True
@@ -389,11 +327,10 @@ class LineFollowMgr:
         if app.button_states.get(BUTTON_TYPES["CANCEL"]):
             app.button_states.clear()
             if len(app.hexdrive_apps) > 0:
-                app.hexdrive_apps[0].set_power(False)
+                app.hexdrive.set_power(False)
             if self.line_sensors is not None:
                 self.line_sensors.disable()
-            app.pid_integral = 0
-            app.pid_previous_error = 0
+            self.pid.reset()
             app.return_to_menu()
             return True
         elif app.button_states.get(BUTTON_TYPES["UP"]):
@@ -414,6 +351,8 @@ class LineFollowMgr:
         if self.sample_time > _LINE_SENSOR_SAMPLE_RATE_UPDATE_PERIOD_MS and self.line_sensors is not None:
             sample_count = self.line_sensors.sample_count_and_reset()
             self.sensor_rate = int(((self.sample_time / self.line_sensors.num_sensors) * sample_count) // self.sample_time)
+            if self._logging:
+                print(f"Line sensors: {self.sensor_rate} Hz, {self.line_sensors.late_count()} late readings discarded")
             self.sample_time = 0
             app.refresh = True
         return True
@@ -423,7 +362,7 @@ class LineFollowMgr:
     # Background update (called from the fast loop)
     # ------------------------------------------------------------------
 
-    def background_update(self, delta) -> tuple[int, int] | None:  # pylint: disable=unused-argument
+    def background_update(self, delta) -> tuple[int, int] | None:
         """Line follower motor control.
         Returns motor output tuple, or None if not active."""
         #app = self._app
@@ -433,10 +372,12 @@ class LineFollowMgr:
             # PID control
             # Calculate the error as the normalised difference between the two sensor readings
         if self.line_sensors is not None:
-            self.line_sensors.read_blocking()    # wait for sensor reading
-            error = self.compute_error(self.line_sensors.raw_value(0), self.line_sensors.raw_value(1))
-            # self.line_sensors.read()           # initiate next sensor reading (non-blocking, using IRQ handler to capture values when ready)
-            output = self.compute_differential_output(error)
+            self.reading_ms += delta
+            if self.line_sensors.step():        # steer only when a new reading has come in
+                error = self.compute_error(self.line_sensors.raw_value(0), self.line_sensors.raw_value(1))
+                self.motor_output = self.compute_differential_output(error, self.reading_ms)
+                self.reading_ms = 0
+            output = self.motor_output
         else:
             output = (0, 0)
         #    # Bang Bang control
@@ -454,38 +395,26 @@ class LineFollowMgr:
         return output
 
 
-    def compute_differential_output(self, error: int) -> tuple[int, int]:
+    def compute_differential_output(self, error: int, dt_ms: int) -> tuple[int, int]:
         """Compute motor output using a full PID controller for differential line following.
 
         Uses the difference between left and right sensor readings as the error signal,
-        and applies proportional, integral, and derivative terms to compute a steering correction.
+        and applies proportional, integral, and derivative terms (see pid.PID) to compute
+        a steering correction from a reading taken *dt_ms* after the previous one.
         Returns a tuple of (left_motor, right_motor) power values, clamped to max_power.
         """
-
-        # Proportional term
-        p_term = (self.kp * error) // 1000  # Scale down the error for the proportional term
-
-        # Integral term - accumulate error over time with anti-windup clamping
-        #self.pid_integral += error
-        #self.pid_integral = max(min(self.pid_integral, self.integral_limit), -self.integral_limit)
-        #i_term = (self.ki * self.pid_integral) // 1000
-
-        # Derivative term - rate of change of error
-        #d_term = (self.kd * (error - self.pid_previous_error)) // 1000
-        #self.pid_previous_error = error
-
-        # Combined PID output
-        # make correction value as integer to avoid issues with motor control expecting int values
-        correction = p_term # + int(i_term) + int(d_term)
+        correction = self.pid.update(error, dt_ms)
 
         # Combine correction with base forward power to get output for each motor
-        output = (self.forward_power + correction, self.forward_power - correction)
+        max_pwr = self.max_pwr
+        left = self.forward_power + correction
+        right = self.forward_power - correction
 
         # Limit output to max power
-        output = (max(min(output[0], self.max_pwr), -self.max_pwr), max(min(output[1], self.max_pwr), -self.max_pwr))
+        output = (max(min(left, max_pwr), -max_pwr), max(min(right, max_pwr), -max_pwr))
 
-        #if self.self._logging:
-        #    print(f"PID: err={error} P={p_term} I={i_term} D={d_term} corr={correction} out={output}")
+        #if self._logging:
+        #    print(f"PID: err={error} P={self.pid.p_term} I={self.pid.i_term} D={self.pid.d_term} corr={correction} out={output}")
 
         return output
 
@@ -0,0 +1,237 @@
+# Line Sensor Kernel Module for BadgeBot
+#
+# The time-critical part of reading the QTRX line sensors: charging and
+# releasing them, capturing each sensor's discharge time from its signal
+# pin's falling edge IRQ and collecting the results, stepped once per loop
+# tick (see line_follow.LineSensors).
+#
+# The pin IRQ is scheduled (a soft IRQ) rather than run when the edge
+# happens, so a capture includes however long the scheduler took to get to
+# it.  That latency is not measurable from inside the handler, but when a
+# step finds a sensor's signal pin already low with its capture still
+# outstanding, the edge is known to have been delayed by at least the time
+# since then: that reading is discarded and counted as late rather than
+# stored with the latency added.  Where the IRQ latency is too high to be
+# useful, the kernel can instead be made blocking: the release step then
+# polls the signal pins with interrupts disabled until every sensor has
+# discharged (up to the timeout), as the original read did.
+#
+# Everything the per-tick code needs is resolved once when the kernel is
+# created - the pin objects are held in tuples rather than looked up by name,
+# the tick functions are bound to attributes, and the results go into
+# preallocated arrays with the in-progress sensors tracked as a bitmask - so
+# nothing is allocated after start-up and the methods compile to native code
+# (@micropython.native).  Under CPython (the simulator and tests) the same
+# methods run as plain Python.
+#
+# Public interface:
+#   LineKernel(ctrl_pins, sig_pins, timeout_us, blocking)
+#     blocking        – poll the pins on release instead of using the IRQ captures
+#     restart()       – abandon any reading in progress; the next step() charges
+#     step()          – advance one tick; True when a new reading has completed
+#     capture(index)  – record sensor *index*'s discharge time (from its IRQ)
+#     handler(index)  – IRQ handler function calling capture(index)
+#     values, counts  – latest discharge times (µs) and readings taken, per sensor
+#     late            – readings discarded because their IRQ ran late, per sensor
+
+import time
+from array import array
+
+try:
+    import micropython
+except ImportError:
+    # CPython / simulator fallback – the native decorator leaves the methods as plain Python
+    class micropython:          # pylint: disable=invalid-name,too-few-public-methods
+        """Stand-in for the micropython module's code emitter decorators."""
+        @staticmethod
+        def native(func):
+            return func
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+try:
+    from machine import Pin, disable_irq, enable_irq
+    _PIN_IN = Pin.IN
+    _PIN_OUT = Pin.OUT
+except ImportError:
+    # CPython fallback: the pin modes are only handed back to the pin objects
+    _PIN_IN = 1
+    _PIN_OUT = 3
+
+    def disable_irq() -> int:
+        """Disable interrupts and return previous state (if supported)."""
+        # No-op in CPython fallback.
+        return 0
+
+    def enable_irq(_state: int) -> None:
+        """Restore interrupts to the given state (if supported)."""
+        # No-op in CPython fallback.
+        return None
+
+# Acquisition states (what the next step() does)
+_CHARGE  = const(0)
+_RELEASE = const(1)
+_SAMPLE  = const(2)
+
+
+class LineKernel:
+    """Charge / release / capture timing for a set of QTRX sensors.
+
+    Parameters
+    ----------
+    ctrl_pins : sequence of Pin
+        Emitter control pin of each sensor.
+    sig_pins : sequence of Pin
+        Signal pin of each sensor, in the same order.
+    timeout_us : int
+        Longest discharge time accepted; slower sensors keep their previous value.
+    blocking : bool
+        Time the discharge by polling the signal pins with interrupts disabled
+        rather than from their IRQs.
+    """
+    __slots__ = ("_ctrl", "_sig", "_num", "_all", "_timeout_us", "_ticks_us", "_ticks_diff",
+                 "_state", "_start", "_pending", "blocking", "values", "counts", "late")
+
+    def __init__(self, ctrl_pins, sig_pins, timeout_us: int, blocking: bool = False):
+        self._ctrl: tuple = tuple(ctrl_pins)
+        self._sig: tuple = tuple(sig_pins)
+        self._num: int = len(self._sig)
+        self._all: int = (1 << self._num) - 1
+        self._timeout_us: int = timeout_us
+        self._ticks_us = time.ticks_us
+        self._ticks_diff = time.ticks_diff
+        self._state: int = _CHARGE
+        self._start: int = 0                # release time of the reading in progress
+        self._pending: int = 0              # bit per sensor still discharging
+        self.blocking: bool = blocking
+        self.values = array("i", [0] * self._num)
+        self.counts = array("I", [0] * self._num)
+        self.late = array("I", [0] * self._num)
+
+
+    def restart(self):
+        """Abandon any reading in progress; the next step() starts a new one."""
+        self._pending = 0
+        self._state = _CHARGE
+
+
+    def handler(self, index: int):
+        """Return an IRQ handler which captures sensor *index*'s discharge time."""
+        def _handler(_pin):
+            self.capture(index)
+        return _handler
+
+
+    @micropython.native
+    def step(self) -> bool:
+        """Advance the acquisition by one loop tick; True when this step completed a new reading."""
+        state = self._state
+        complete = False
+        if state == _SAMPLE:
+            if not self._collect():
+                return False        # still discharging
+            complete = True
+            state = _CHARGE
+        if state == _CHARGE:
+            # held until the next step, which is far longer than the minimum charge time
+            ctrl = self._ctrl
+            sig = self._sig
+            for i in range(self._num):
+                ctrl[i].on()
+                sig[i].init(mode=_PIN_OUT)
+                sig[i].on()
+            self._state = _RELEASE
+        else:
+            # release all the signal pins together; each falling edge IRQ captures its sensor,
+            # or when blocking the pins are polled before interrupts are enabled again
+            sig = self._sig
+            irq_state = disable_irq()
+            self._start = self._ticks_us()
+            self._pending = self._all
+            for i in range(self._num):
+                sig[i].init(mode=_PIN_IN, pull=None)
+            if self.blocking:
+                self._poll()
+                enable_irq(irq_state)
+                self._state = _CHARGE
+                return True
+            enable_irq(irq_state)
+            self._state = _SAMPLE
+        return complete
+
+
+    @micropython.native
+    def _poll(self):
+        """Wait for every sensor to discharge or time out, timing each from its pin."""
+        sig = self._sig
+        ctrl = self._ctrl
+        start = self._start
+        timeout_us = self._timeout_us
+        pending = self._pending
+        while pending:
+            value = self._ticks_diff(self._ticks_us(), start)
+            if value > timeout_us:
+                break
+            for i in range(self._num):
+                bit = 1 << i
+                if pending & bit and not sig[i].value():
+                    pending &= ~bit
+                    ctrl[i].off()
+                    self.values[i] = value
+                    self.counts[i] += 1
+        # sensors still pending timed out and keep their previous value; the edges
+        # (and any IRQs raised while polling) are then ignored by capture()
+        self._pending = 0
+        for i in range(self._num):
+            if pending & (1 << i):
+                ctrl[i].off()
+
+
+    @micropython.native
+    def capture(self, index: int):
+        """Record the discharge time of sensor *index*, if it is still discharging."""
+        # The pin "irq" is scheduled rather than a true hardware interrupt, so the
+        # capture can be late by however long the loop takes to get round to it
+        now = self._ticks_us()
+        bit = 1 << index
+        if not self._pending & bit:
+            return                  # edge while charging, or the reading already timed out
+        self._pending &= ~bit
+        self._ctrl[index].off()
+        value = self._ticks_diff(now, self._start)
+        if value <= self._timeout_us:
+            self.values[index] = value
+            self.counts[index] += 1
+
+
+    @micropython.native
+    def _collect(self) -> bool:
+        """Whether every sensor has either been captured or timed out."""
+        pending = self._pending
+        if not pending:
+            return True
+        # a sensor which has discharged but not been captured yet has its IRQ waiting
+        # on the scheduler, so its capture would be late: discard that reading
+        sig = self._sig
+        ctrl = self._ctrl
+        for i in range(self._num):
+            bit = 1 << i
+            if self._pending & bit and not sig[i].value():
+                self._pending &= ~bit
+                ctrl[i].off()
+                self.late[i] += 1
+        pending = self._pending
+        if not pending:
+            return True
+        if self._ticks_diff(self._ticks_us(), self._start) <= self._timeout_us:
+            return False
+        # no falling edge in time - ignore these readings
+        self._pending = 0
+        for i in range(self._num):
+            if pending & (1 << i):
+                ctrl[i].off()
+        return True
@@ -0,0 +1,356 @@
+# Loop Timing Module for BadgeBot
+#
+# Deadline-based scheduler for the fixed-rate background control loop.
+#
+# The background task used to sleep for "period - time taken" after every
+# tick, which lets lateness accumulate: every wake-up that arrives a little
+# late pushes all later ticks back by the same amount.  LoopScheduler keeps an
+# absolute next-deadline on a fixed grid instead, so lateness in one tick is
+# absorbed by a shorter sleep before the next one.
+#
+# A tick that overruns its period causes the next tick to run immediately.
+# If one or more whole periods were missed entirely they are handled
+# according to a policy:
+#   POLICY_SKIP     – drop the missed ticks and realign to the grid
+#                     (the next delta reports the time skipped)
+#   POLICY_CATCH_UP – run the missed ticks back-to-back (up to max_catch_up)
+#                     before falling back to skipping
+#
+# The delta handed to the tick is the scheduled (grid) time since the
+# previous tick, so consumers such as the PID and auto-tuner see exact
+# multiples of the period rather than whatever the sleep happened to be.
+#
+# Per-state counters (ticks, overruns, skipped ticks, start jitter) are kept
+# so that loop health can be inspected for each app state.
+#
+# Public interface:
+#   LoopScheduler(period_ms, policy, max_catch_up)
+#     start(now, period_ms)   – anchor the grid at *now*
+#     begin_tick(now, state)  – call at the top of a tick; returns delta (ms)
+#     end_tick(now, period_ms)– call after the work; returns ms to sleep
+#     stats(state)            – LoopStats for *state* (or None)
+#     reset_stats()           – clear all per-state counters
+#   LoopProfiler()
+#     record(state, section, us) – add a hot-path duration to its histogram
+#     histogram(state, section)  – TimingHistogram (or None)
+#     telemetry_lines(names)     – text lines suitable for BLE telemetry
+#   FrameGovernor(min_frame_ms)
+#     should_draw(now, state)    – False if the state's frame-rate cap has not elapsed
+#     frame_drawn(now, state)    – record a frame, updating the achieved draw rate
+#     rate(state)                – FrameRate (or None)
+
+import time
+from array import array
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+# MicroPython provides wrap-safe tick arithmetic; plain subtraction/addition is
+# equivalent on CPython where the tick counter never wraps.
+_ticks_diff = getattr(time, "ticks_diff", lambda new, old: new - old)
+_ticks_add = getattr(time, "ticks_add", lambda ticks, delta: ticks + delta)
+
+POLICY_SKIP     = const(0)
+POLICY_CATCH_UP = const(1)
+
+_DEFAULT_MAX_CATCH_UP = const(3)    # most missed ticks that will be replayed back-to-back
+
+
+class LoopStats:
+    """Timing counters for the background loop while in one app state."""
+    __slots__ = ("ticks", "overruns", "skipped", "jitter_max", "jitter_total")
+
+    def __init__(self):
+        self.ticks: int = 0             # ticks executed
+        self.overruns: int = 0          # ticks that finished after the next deadline
+        self.skipped: int = 0           # ticks dropped by POLICY_SKIP
+        self.jitter_max: int = 0        # worst lateness of a tick start (ms)
+        self.jitter_total: int = 0      # sum of tick start lateness (ms)
+
+    @property
+    def jitter_avg(self) -> int:
+        """Average lateness of a tick start in ms."""
+        return self.jitter_total // self.ticks if self.ticks else 0
+
+    def __str__(self):
+        return f"n={self.ticks} ovr={self.overruns} skp={self.skipped} jit={self.jitter_avg}/{self.jitter_max}ms"
+
+
+class LoopScheduler:
+    """Fixed-rate scheduler keeping an absolute next-deadline.
+
+    Parameters
+    ----------
+    period_ms : int
+        Initial loop period in ms.
+    policy : int
+        POLICY_SKIP or POLICY_CATCH_UP – how to handle overruns.
+    max_catch_up : int
+        Most missed ticks replayed back-to-back under POLICY_CATCH_UP.
+    """
+    __slots__ = ("policy", "max_catch_up", "_period", "_deadline", "_last_deadline", "_stats", "_current")
+
+    def __init__(self, period_ms: int, policy: int = POLICY_SKIP, max_catch_up: int = _DEFAULT_MAX_CATCH_UP):
+        self.policy: int = policy
+        self.max_catch_up: int = max_catch_up
+        self._period: int = max(1, period_ms)
+        self._deadline: int = 0
+        self._last_deadline: int = 0
+        self._stats: dict = {}
+        self._current: LoopStats | None = None
+
+    @property
+    def period_ms(self) -> int:
+        """Current loop period in ms."""
+        return self._period
+
+    def start(self, now: int, period_ms: int | None = None):
+        """Anchor the deadline grid so the first tick is due at *now*."""
+        if period_ms is not None:
+            self._period = max(1, period_ms)
+        self._deadline = now
+        self._last_deadline = _ticks_add(now, -self._period)
+
+    def begin_tick(self, now: int, state: int) -> int:
+        """Record the start of a tick in *state*; returns the scheduled delta in ms."""
+        stats = self._stats.get(state)
+        if stats is None:
+            stats = LoopStats()
+            self._stats[state] = stats
+        self._current = stats
+        stats.ticks += 1
+        late = _ticks_diff(now, self._deadline)
+        if late > 0:
+            stats.jitter_total += late
+            if late > stats.jitter_max:
+                stats.jitter_max = late
+        delta = _ticks_diff(self._deadline, self._last_deadline)
+        self._last_deadline = self._deadline
+        return delta
+
+    def end_tick(self, now: int, period_ms: int | None = None) -> int:
+        """Advance the deadline after a tick finishing at *now*; returns ms to sleep."""
+        if period_ms is not None and period_ms != self._period:
+            # Period changed (e.g. a new state wants a faster loop) – re-anchor the grid
+            self._period = max(1, period_ms)
+            self._deadline = _ticks_add(now, self._period)
+            return self._period
+        period = self._period
+        self._deadline = _ticks_add(self._deadline, period)
+        lag = _ticks_diff(now, self._deadline)
+        if lag <= 0:
+            return -lag
+        # Overrun: the next tick is already due, so run it straight away.
+        stats = self._current
+        if stats is not None:
+            stats.overruns += 1
+        missed = lag // period      # further whole periods that have also elapsed
+        if missed and (self.policy != POLICY_CATCH_UP or missed > self.max_catch_up):
+            # drop the ticks that were missed entirely and realign to the grid
+            if stats is not None:
+                stats.skipped += missed
+            self._deadline = _ticks_add(self._deadline, missed * period)
+        return 0
+
+    def stats(self, state: int) -> LoopStats | None:
+        """Return the counters recorded for *state*, or None if it has not run."""
+        return self._stats.get(state)
+
+    def states(self) -> list:
+        """Return the states for which counters have been recorded."""
+        return list(self._stats)
+
+    def reset_stats(self):
+        """Clear all per-state counters."""
+        self._stats = {}
+        self._current = None
+
+
+# ---- Hot-path timing histograms -----------------------------------------------
+#
+# Durations of background_update, update and draw are recorded per app state
+# into fixed-bucket histograms, so loop budget usage can be read on-screen or
+# over BLE without an oscilloscope on the HexDiag pins.
+
+SECTION_BACKGROUND = const(0)
+SECTION_UPDATE     = const(1)
+SECTION_DRAW       = const(2)
+SECTION_NAMES = ("bg", "upd", "draw")
+_NUM_SECTIONS = const(3)
+
+# Upper bucket edges in µs; the final bucket catches everything above the last edge
+_BUCKET_EDGES_US = (500, 1000, 2000, 5000, 10000, 20000, 50000)
+BUCKET_LABELS = ("<.5", "<1", "<2", "<5", "<10", "<20", "<50", ">50")   # ms
+NUM_BUCKETS = len(BUCKET_LABELS)
+
+
+class TimingHistogram:
+    """Fixed-bucket histogram of durations in µs."""
+    __slots__ = ("counts", "count", "max_us", "total_us")
+
+    def __init__(self):
+        self.counts = array("I", [0] * NUM_BUCKETS)
+        self.count: int = 0
+        self.max_us: int = 0
+        self.total_us: int = 0
+
+    def add(self, duration_us: int):
+        """Record one duration."""
+        bucket = 0
+        for edge in _BUCKET_EDGES_US:
+            if duration_us < edge:
+                break
+            bucket += 1
+        self.counts[bucket] += 1
+        self.count += 1
+        self.total_us += duration_us
+        if duration_us > self.max_us:
+            self.max_us = duration_us
+
+    @property
+    def avg_us(self) -> int:
+        """Mean duration in µs."""
+        return self.total_us // self.count if self.count else 0
+
+    def percentile_bucket(self, pct: int) -> int:
+        """Index of the bucket containing the *pct* percentile (0-100)."""
+        threshold = (self.count * pct + 99) // 100
+        running = 0
+        for i in range(NUM_BUCKETS):
+            running += self.counts[i]
+            if running >= threshold and running > 0:
+                return i
+        return 0
+
+    def reset(self):
+        """Clear all counts."""
+        for i in range(NUM_BUCKETS):
+            self.counts[i] = 0
+        self.count = 0
+        self.max_us = 0
+        self.total_us = 0
+
+
+class LoopProfiler:
+    """Per-state TimingHistograms for each hot-path section."""
+    __slots__ = ("_hists",)
+
+    def __init__(self):
+        self._hists: dict = {}
+
+    def record(self, state: int, section: int, duration_us: int):
+        """Add *duration_us* to the histogram for *section* in *state*."""
+        hists = self._hists.get(state)
+        if hists is None:
+            hists = [TimingHistogram() for _ in range(_NUM_SECTIONS)]
+            self._hists[state] = hists
+        hists[section].add(duration_us)
+
+    def histogram(self, state: int, section: int) -> TimingHistogram | None:
+        """Return the histogram for *section* in *state*, or None if nothing recorded."""
+        hists = self._hists.get(state)
+        return hists[section] if hists is not None else None
+
+    def states(self) -> list:
+        """Return the states for which durations have been recorded, in ascending order."""
+        return sorted(self._hists)
+
+    def reset(self):
+        """Discard all recorded durations."""
+        self._hists = {}
+
+    def telemetry_lines(self, state_names=None):
+        """Yield one compact text line per recorded (state, section) for streaming."""
+        for state in self.states():
+            name = state_names[state] if state_names is not None and state < len(state_names) else str(state)
+            for section in range(_NUM_SECTIONS):
+                hist = self._hists[state][section]
+                if hist.count:
+                    counts = ",".join(str(c) for c in hist.counts)
+                    yield f"T:{name}:{SECTION_NAMES[section]} n={hist.count} avg={hist.avg_us} max={hist.max_us} [{counts}]"
+
+
+# ---- Display frame-rate governor ----------------------------------------------
+#
+# Drawing the full screen is slow and stalls the background loop, so each state
+# may cap its frame rate.  Refresh requests arriving faster than the cap are
+# coalesced: the frame is skipped, the request stays pending and is satisfied
+# by the next frame that is allowed.
+
+_FPS_WINDOW_MS = const(1000)        # window over which the achieved draw rate is measured
+
+
+class FrameRate:
+    """Achieved draw rate for one app state."""
+    __slots__ = ("fps", "frames", "coalesced", "_window_start", "_window_frames")
+
+    def __init__(self, now: int):
+        self.fps: int = 0               # frames drawn per second over the last complete window
+        self.frames: int = 0            # total frames drawn
+        self.coalesced: int = 0         # frames skipped because the state's cap had not elapsed
+        self._window_start: int = now
+        self._window_frames: int = 0
+
+    def add_frame(self, now: int):
+        """Count a frame drawn at *now*, updating fps at the end of each window."""
+        self.frames += 1
+        self._window_frames += 1
+        elapsed = _ticks_diff(now, self._window_start)
+        if elapsed >= _FPS_WINDOW_MS:
+            self.fps = (self._window_frames * 1000) // elapsed
+            self._window_start = now
+            self._window_frames = 0
+
+    def __str__(self):
+        return f"fps={self.fps} n={self.frames} coal={self.coalesced}"
+
+
+class FrameGovernor:
+    """Caps the display frame rate per app state and measures the rate achieved.
+
+    Parameters
+    ----------
+    min_frame_ms : dict
+        Minimum time between frames (ms) for each state; states not listed are not capped.
+    """
+    __slots__ = ("_min_frame_ms", "_last_frame", "_rates")
+
+    def __init__(self, min_frame_ms: dict | None = None):
+        self._min_frame_ms: dict = min_frame_ms if min_frame_ms is not None else {}
+        self._last_frame: int | None = None
+        self._rates: dict = {}
+
+    def _rate(self, state: int, now: int) -> FrameRate:
+        rate = self._rates.get(state)
+        if rate is None:
+            rate = FrameRate(now)
+            self._rates[state] = rate
+        return rate
+
+    def should_draw(self, now: int, state: int) -> bool:
+        """Whether a frame wanted in *state* may be drawn at *now*; if not, the request is coalesced."""
+        min_ms = self._min_frame_ms.get(state, 0)
+        if min_ms and self._last_frame is not None and _ticks_diff(now, self._last_frame) < min_ms:
+            self._rate(state, now).coalesced += 1
+            return False
+        return True
+
+    def frame_drawn(self, now: int, state: int):
+        """Record that a frame was drawn in *state* at *now*."""
+        self._last_frame = now
+        self._rate(state, now).add_frame(now)
+
+    def rate(self, state: int) -> FrameRate | None:
+        """Return the draw rate recorded for *state*, or None if it has not drawn."""
+        return self._rates.get(state)
+
+    def states(self) -> list:
+        """Return the states for which frames have been recorded."""
+        return list(self._rates)
+
+    def reset(self):
+        """Clear all recorded draw rates."""
+        self._rates = {}
@@ -0,0 +1,197 @@
+# Motion Profile Module for BadgeBot
+#
+# Plans the velocity (motor power) profile of a timed move once, when the
+# command starts, so the control loop only has to index it on each tick
+# instead of re-reading settings and re-computing the slew step.
+#
+# A profile is stored as two short ramp tables (up and down) plus the
+# cruise section between them, so memory depends on the ramp length rather
+# than on the length of the move.
+#
+#   PROFILE_TRAPEZOID – constant acceleration ramps (matches the original
+#                       slew-rate limited behaviour)
+#   PROFILE_SCURVE    – smoothstep ramps, with the peak slope limited to
+#                       the same acceleration, for jerk-free starts/stops
+#
+# Moves too short to reach the peak become triangular: the ramp down starts
+# from wherever the ramp up had got to when the move's time ran out.
+#
+# Motor Moves instructions use a PowerPlan instead: the same (power,
+# duration) steps the instruction list used to be expanded into, but held
+# as a handful of numbers describing the ramp up, cruise and ramp down and
+# only generated one step at a time as the plan is run.
+#
+# Public interface:
+#   MotionProfile(peak, duration_ms, accel_per_tick, shape, tick_ms, start)
+#     level(elapsed_ms)  – power magnitude to apply at *elapsed_ms*
+#     down_ms            – time the ramp down begins
+#     total_ms           – time until the profile reaches zero
+#     peak               – highest level reached
+#   PowerPlan(signs, duration_ms, accel_per_tick, max_power, tick_ms)
+#     iter(plan)         – yields ((left, right), duration_ms) steps
+#     total_ms, len(plan), peak
+
+from array import array
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+PROFILE_TRAPEZOID = const(0)
+PROFILE_SCURVE    = const(1)
+PROFILE_LABELS = ("Trapezoid", "S-Curve")
+
+_DEFAULT_TICK_MS = const(10)
+
+
+def _ramp(start: int, end: int, accel_per_tick: int, shape: int) -> array:
+    """Return the levels for a ramp from *start* to *end* (exclusive of *start*, inclusive of *end*)."""
+    span = end - start
+    if span == 0:
+        return array("i")
+    step = max(1, accel_per_tick)
+    if shape == PROFILE_SCURVE:
+        # smoothstep 3x²-2x³ has a peak slope of 1.5 × span / ticks
+        ticks = max(1, (3 * abs(span) + 2 * step - 1) // (2 * step))
+        levels = array("i", [0] * ticks)
+        for i in range(ticks):
+            x = (i + 1) / ticks
+            levels[i] = start + int(span * x * x * (3.0 - 2.0 * x))
+    else:
+        ticks = (abs(span) + step - 1) // step
+        levels = array("i", [0] * ticks)
+        delta = step if span > 0 else -step
+        level = start
+        for i in range(ticks):
+            level += delta
+            if (delta > 0 and level > end) or (delta < 0 and level < end):
+                level = end
+            levels[i] = level
+    levels[-1] = end
+    return levels
+
+
+class MotionProfile:
+    """Precomputed power profile for one timed move.
+
+    Parameters
+    ----------
+    peak : int
+        Cruise power magnitude (PWM units).
+    duration_ms : int
+        Time from the start of the move until the ramp down begins, as for
+        the original timed drives (the ramp up is included in this time).
+    accel_per_tick : int
+        Largest change in power per tick.
+    shape : int
+        PROFILE_TRAPEZOID or PROFILE_SCURVE.
+    tick_ms : int
+        Control loop tick the acceleration is specified for.
+    start : int
+        Power magnitude the move starts from (0 when starting at rest).
+    """
+    __slots__ = ("_up", "_down", "_tick_ms", "_up_ticks", "_down_start", "peak", "down_ms", "total_ms")
+
+    def __init__(self, peak: int, duration_ms: int, accel_per_tick: int,
+                 shape: int = PROFILE_TRAPEZOID, tick_ms: int = _DEFAULT_TICK_MS, start: int = 0):
+        self._tick_ms: int = max(1, tick_ms)
+        peak = max(0, peak)
+        run_ticks = max(0, duration_ms) // self._tick_ms
+        up = _ramp(start, peak, accel_per_tick, shape)
+        if len(up) > run_ticks:
+            # Too short to reach the peak - ramp down from wherever the ramp up has got to
+            up = up[:run_ticks]
+            peak = up[-1] if run_ticks else start
+        self._up = up
+        self._up_ticks: int = len(up)
+        self._down_start: int = run_ticks
+        self._down = _ramp(peak, 0, accel_per_tick, shape)
+        self.peak: int = peak
+        self.down_ms: int = run_ticks * self._tick_ms       # when the ramp down begins
+        self.total_ms: int = (run_ticks + len(self._down)) * self._tick_ms
+
+    def level(self, elapsed_ms: int) -> int:
+        """Power magnitude to apply *elapsed_ms* after the move started."""
+        tick = elapsed_ms // self._tick_ms
+        if tick < self._up_ticks:
+            return self._up[tick]
+        if tick < self._down_start:
+            return self.peak
+        tick -= self._down_start
+        if tick < len(self._down):
+            return self._down[tick]
+        return 0
+
+    def __len__(self):
+        return self.total_ms // self._tick_ms
+
+
+class PowerPlan:
+    """Ramp up / cruise / ramp down power plan for one Motor Moves instruction.
+
+    The power rises by *accel_per_tick* every tick for at most half of the
+    move (less one tick), stopping short of *max_power*; the move then
+    cruises at *max_power* (or at the last ramp level, if the move was too
+    short to get there), ramps back down through the same levels and ends
+    with one tick of zero power.
+
+    Parameters
+    ----------
+    signs : tuple[int, int]
+        Direction of each motor (-1, 0 or 1).
+    duration_ms : int
+        Length of the move, ramps included.
+    accel_per_tick : int
+        Change in power per tick on the ramps.
+    max_power : int
+        Cruise power.
+    tick_ms : int
+        Duration of each ramp step.
+    """
+    __slots__ = ("_sign_l", "_sign_r", "_step", "_ramp_ticks", "_cruise_ms", "_tick_ms", "peak")
+
+    def __init__(self, signs: tuple, duration_ms: int, accel_per_tick: int, max_power: int,
+                 tick_ms: int = _DEFAULT_TICK_MS):
+        self._sign_l: int = signs[0]
+        self._sign_r: int = signs[1]
+        self._tick_ms: int = max(1, tick_ms)
+        step = max(1, accel_per_tick)
+        max_ramp_ticks = duration_ms // (2 * self._tick_ms) - 1
+        below_max = (max_power - 1) // step        # ramp levels strictly below max_power
+        if max_ramp_ticks > below_max:
+            ramp_ticks = below_max
+            peak = max_power
+        else:
+            ramp_ticks = max(0, max_ramp_ticks)
+            peak = ramp_ticks * step
+        self._step: int = step
+        self._ramp_ticks: int = ramp_ticks
+        self._cruise_ms: int = duration_ms - 2 * ramp_ticks * self._tick_ms
+        self.peak: int = peak
+
+    @property
+    def total_ms(self) -> int:
+        """Time taken to run the whole plan."""
+        return 2 * self._ramp_ticks * self._tick_ms + max(0, self._cruise_ms) + self._tick_ms
+
+    def __len__(self):
+        return 2 * self._ramp_ticks + (1 if self._cruise_ms > 0 else 0) + 1
+
+    def _power(self, level: int) -> tuple:
+        return (self._sign_l * level, self._sign_r * level)
+
+    def __iter__(self):
+        tick_ms = self._tick_ms
+        step = self._step
+        for k in range(1, self._ramp_ticks + 1):
+            yield self._power(k * step), tick_ms
+        if self._cruise_ms > 0:
+            yield self._power(self.peak), self._cruise_ms
+        for k in range(self._ramp_ticks, 0, -1):
+            yield self._power(k * step), tick_ms
+        yield (0, 0), tick_ms
+
+    def __str__(self):
+        return "%d ramp steps of %d, %d for %d ms" % (self._ramp_ticks, self._step, self.peak, self._cruise_ms)
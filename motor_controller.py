@@ -10,13 +10,44 @@ Provides simple awaitable commands such as:
     mc.stop()                    # immediate stop
 
 The controller handles acceleration ramps internally and uses the
-on-board IMU gyroscope for accurate heading changes.
+on-board IMU gyroscope for accurate heading changes.  Timed moves follow a
+motion profile (trapezoidal or S-curve) planned once when the command
+starts, see motion_profile.py.
+
+The control loops are written to avoid heap allocation on each 10 ms tick:
+the per-command limits and the front-face projection are worked out once
+when a command starts, the loop state lives in ``__slots__`` fields, the
+output tuple is only rebuilt when the power actually changes, and every
+tick is appended to a binary trace (see trace_recorder.py) that is only
+printed once the command has finished.
+
+Heading, velocity and distance come from a complementary filter over the
+gyro and accelerometer (see fusion.py), which also predicts how far the
+robot will coast so turns and distance drives start stopping early.
+While a command runs the IMU is read in the background at its own rate
+(see imu_sampler.py) and every queued sample is integrated on each tick.
+
+When wheel encoders are configured (``enc_port`` setting) turns and
+distance drives close the loop on the encoder counts instead (see
+odometry.py), falling back to the IMU if the encoders stop counting.
+
+Gyro turns also learn how far this robot carries on turning after the
+power is cut (see coast_model.py) and stop that much earlier next time;
+the learned model is kept in the ``coast_ms``/``coast_offset`` settings.
 """
 
 import asyncio
 import time
 from math import cos, sin, radians
-from .settings_mgr import MySetting
+from .settings_mgr import MySetting, commit_settings
+from .motion_profile import MotionProfile, PROFILE_TRAPEZOID
+from .fusion import MotionEstimator
+from .imu_sampler import ImuSampler
+from .odometry import WheelOdometry
+from .pcnt import Encoder, hs_pin_gpio
+from .output_arbiter import SOURCE_CONTROLLER
+from .trace_recorder import TraceRecorder
+from .coast_model import CoastModel
 
 try:
     import imu as _imu
@@ -29,12 +60,17 @@ from .app import MOTOR_PWM_FREQ, MOTOR_POWER_SCALE_FACTOR
 # application constants into a separate module.
 _TICK_MS                = 10        # Smallest unit of change for power, in ms
 _AUTO_GYRO_AXIS         = 2         # index into gyro_read() tuple for yaw (0=X,1=Y,2=Z)
-_AUTO_GYRO_DEADBAND_DPS = 3.0       # ignore gyro readings below this magnitude (noise floor)
+_AUTO_GYRO_DEADBAND_DPS = 0.5       # ignore bias-corrected gyro readings below this magnitude (noise floor)
 _AUTO_ACCEL_AXIS        = 0         # index into acc_read() tuple for fwd/back (0=X,1=Y,2=Z)
 _AUTO_ACCEL_DEADBAND    = 0.05      # m/s² - ignore accel readings below this (vibration/noise)
 _AUTO_ACCEL_LPF_ALPHA   = 0.6       # low-pass filter coefficient (0-1, higher = faster response)
 _AUTO_ACCEL_SCALE       = 100       # distance calibration % (100 = 1:1, raise if undershooting)
 _AUTO_DRIVE_TIMEOUT_MS  = 30000     # safety timeout for distance-based drives (ms)
+_ENCODER_FILTER_NS      = 1000      # PCNT glitch filter for the wheel encoders
+_ENCODER_STALL_MS       = 500       # no counts for this long while driving = encoders not working
+_COAST_MIN_RATE_DPS     = 20        # turns stopped slower than this don't teach the coast model
+_ROTATION_SETTLE_MS     = 1000      # longest wait for a turn's rotation to die away before an accelerometer drive
+_DRIVE_MODE_DISTANCE    = 1         # drive_mode setting value for distance moves (motor_moves.DRIVE_MODE_DISTANCE)
 
 # ---------------------------------------------------------------------------
 # Defaults (can be overridden via constructor kwargs)
@@ -46,6 +82,9 @@ _DEFAULT_DRIVE_TIMEOUT_MS = _AUTO_DRIVE_TIMEOUT_MS  # safety cap on distance dri
 _DEFAULT_UPDATE_MS = 10             # how often the control loop ticks
 _DEFAULT_SETTLE_MS = 50             # brief pause after stopping motors
 
+
+_STOPPED = (0, 0)
+
 MotorOutputTuple = tuple
 
 
@@ -55,7 +94,9 @@ class MotorController:
     Parameters
     ----------
     hexdrive_app : HexDriveApp
-        The low-level HexDrive interface (``set_motors``, ``set_power``).
+        The low-level HexDrive interface (``set_motors``, ``set_power``),
+        normally the app's ``HexDriveProxy`` so unchanged outputs are not
+        re-sent on every tick.
     settings : dict[str, MySetting]
         The shared BadgeBot settings dict (needs ``max_power``,
         ``acceleration``).
@@ -68,10 +109,14 @@ class MotorController:
         Callback that applies per-motor direction settings to an output
         tuple before values are sent to HexDrive. If ``None``, outputs
         are sent unchanged.
+    output_arbiter : OutputArbiter | None
+        If given, outputs are submitted to the app's arbiter (which maps
+        the motor directions itself and sends one output per background
+        tick) instead of being written to the HexDrive directly.
     gyro_axis : int
         Index into ``imu.gyro_read()`` for the yaw axis (default 2).
     gyro_deadband : float
-        Minimum gyro reading (°/s) before it counts (default 3.0).
+        Minimum bias-corrected gyro reading (°/s) before it counts (default 0.5).
     accel_axis : int
         Index into ``imu.acc_read()`` for the forward/back axis (default 0).
     accel_deadband : float
@@ -89,6 +134,13 @@ class MotorController:
     update_ms : int
         Control-loop tick period in ms (default 10).
     """
+    __slots__ = ("_hexdrive", "_settings", "_logging", "_front_face_setting", "_apply_motor_directions_callback", "_output_arbiter",
+                 "_gyro_axis", "_gyro_deadband", "_accel_axis", "_accel_deadband", "_accel_lpf_alpha",
+                 "_turn_speed_frac", "_drive_speed_frac", "_turn_timeout_ms", "_drive_timeout_ms", "_update_ms",
+                 "motor_output", "gyro_dps", "integrated_deg", "accel_mps2", "velocity_mps", "distance_m",
+                 "_fusion", "_sampler", "_sample_us",
+                 "_coast", "_coast_config", "_odometry", "_odometry_config", "_odometry_active", "_odometry_idle_ms", "_accel_bias_x", "_accel_bias_y", "_accel_calibrated", "_ramp_overshoot_m",
+                 "_avg_loop_ms", "_busy", "_limit", "_accel_step", "_fwd_cos", "_fwd_sin", "trace", "_trace_ms")
 
     def __init__(
         self,
@@ -98,6 +150,7 @@ class MotorController:
         logging=False,
         front_face_setting=None,
         apply_motor_directions_callback=None,
+        output_arbiter=None,
         gyro_axis=_AUTO_GYRO_AXIS,
         gyro_deadband=_AUTO_GYRO_DEADBAND_DPS,
         accel_axis=_AUTO_ACCEL_AXIS,
@@ -114,6 +167,7 @@ class MotorController:
         self._logging: bool = logging
         self._front_face_setting: MySetting | None = front_face_setting
         self._apply_motor_directions_callback = apply_motor_directions_callback
+        self._output_arbiter = output_arbiter
         self._gyro_axis: int = gyro_axis
         self._gyro_deadband: float = gyro_deadband
         self._accel_axis: int = accel_axis
@@ -126,19 +180,36 @@ class MotorController:
         self._update_ms: int = update_ms
 
         # Live state (read-only for callers)
-        self.motor_output = (0, 0)           # current PWM sent to motors
+        self.motor_output = _STOPPED         # current PWM sent to motors
         self.gyro_dps = 0.0                  # latest gyro reading (deg/s)
         self.integrated_deg = 0.0            # degrees turned since reset
         self.accel_mps2 = 0.0                # latest filtered accel (m/s2)
         self.velocity_mps = 0.0              # integrated velocity (m/s)
         self.distance_m = 0.0                # integrated distance (m)
-        self._accel_filtered = 0.0           # low-pass filtered accel
+        self._fusion = MotionEstimator(gyro_deadband, accel_deadband, accel_lpf_alpha)
+        self._sampler = None if _imu is None else ImuSampler(_imu.gyro_read, _imu.acc_read, gyro_axis)
+        self._sample_us: int = 0             # timestamp of the last IMU sample integrated
+        self._coast = CoastModel()
+        self._coast_config: tuple | None = None     # (coast_ms, coast_offset) settings the model was loaded from / saved to
+        self._odometry: WheelOdometry | None = None
+        self._odometry_config: tuple = (0, 0, 0)   # (port, counts per 10 mm, track) the encoders were set up for
+        self._odometry_active: bool = False  # encoders in use for the current command
+        self._odometry_idle_ms: int = 0      # time driving without any encoder counts
         self._accel_bias_x = 0.0             # calibrated X-axis bias
         self._accel_bias_y = 0.0             # calibrated Y-axis bias
         self._accel_calibrated = False
         self._ramp_overshoot_m = 0.0         # estimated extra distance during ramp-down
         self._avg_loop_ms = _TICK_MS           # measured average loop period
         self._busy = False
+
+        # Per-command loop state, set up by _begin_command() so the loops
+        # don't have to go back to the settings on every tick
+        self._limit: int = 0                 # max_power for the current command
+        self._accel_step: int = 1            # acceleration per _TICK_MS for the current command
+        self._fwd_cos: float = 1.0           # forward unit vector for the front_face rotation
+        self._fwd_sin: float = 0.0
+        self.trace = TraceRecorder()          # per-tick record of the last command
+        self._trace_ms: int = 0              # start time of the traced command
         if self._logging:
             print("B:MotorController initialised")
 
@@ -170,6 +241,12 @@ class MotorController:
         return max(1, int(self._settings['acceleration'].v) * MOTOR_POWER_SCALE_FACTOR)
 
 
+    @property
+    def profile_shape(self) -> int:
+        """Motion profile used for timed moves (PROFILE_TRAPEZOID or PROFILE_SCURVE)."""
+        return int(self._settings['motion_profile'].v) if 'motion_profile' in self._settings else PROFILE_TRAPEZOID
+
+
     @property
     def drive_step_ms(self) -> int:
         """Estimated time in ms to drive one step (for time-based driving)."""
@@ -192,7 +269,7 @@ class MotorController:
     # Public high-level commands (all awaitable)
     # ------------------------------------------------------------------
 
-    async def forward(self, duration_ms, *, speed_frac=None):
+    async def forward(self, duration_ms, *, speed_frac=None, blend=False):
         """Drive both motors forward for *duration_ms* milliseconds.
 
         Parameters
@@ -201,10 +278,13 @@ class MotorController:
             How long to drive (ms).  Includes ramp-up and ramp-down.
         speed_frac : float | None
             Override the default drive speed as a fraction of max_power.
+        blend : bool
+            Leave the motors running at the end instead of ramping down, for
+            the next command to ramp from.
         """
         frac = speed_frac if speed_frac is not None else self._drive_speed_frac
         target = int(self.max_power * frac)
-        await self._timed_drive((target, target), duration_ms)
+        await self._timed_drive((target, target), duration_ms, blend=blend)
 
 
     async def forward_mm(self, distance_mm, *, speed_frac=None,
@@ -230,11 +310,11 @@ class MotorController:
         await self._distance_drive((target, target), abs(distance_mm), timeout_ms)
 
 
-    async def backward(self, duration_ms, *, speed_frac=None):
-        """Drive both motors backward for *duration_ms* milliseconds."""
+    async def backward(self, duration_ms, *, speed_frac=None, blend=False):
+        """Drive both motors backward for *duration_ms* milliseconds (see ``forward``)."""
         frac = speed_frac if speed_frac is not None else self._drive_speed_frac
         target = int(self.max_power * frac)
-        await self._timed_drive((-target, -target), duration_ms)
+        await self._timed_drive((-target, -target), duration_ms, blend=blend)
 
 
     async def backward_mm(self, distance_mm, *, speed_frac=None,
@@ -249,7 +329,7 @@ class MotorController:
 
 
     async def turn(self, degrees, *, speed_frac=None,
-                   timeout_ms=None):
+                   timeout_ms=None, blend=False):
         """Turn *degrees* using the gyro for feedback.
 
         Positive = clockwise, negative = anti-clockwise.
@@ -263,9 +343,20 @@ class MotorController:
             Override the default turn speed as a fraction of max_power.
         timeout_ms : int | None
             Override the safety timeout for this turn.
+        blend : bool
+            Leave the motors running when the turn is done so the next
+            command ramps straight from this speed instead of stopping.
+            The turn then runs to the target itself rather than stopping
+            early for the ramp down.
+
+        Returns
+        -------
+        float
+            How far the turn went past the target (negative if short),
+            clockwise positive.
         """
         if degrees == 0:
-            return
+            return 0.0
         frac = speed_frac if speed_frac is not None else self._turn_speed_frac
         timeout = timeout_ms if timeout_ms is not None else self._turn_timeout_ms
         target_deg = abs(degrees)
@@ -274,21 +365,29 @@ class MotorController:
 
         # CW  = left motor fwd, right motor rev
         # CCW = left motor rev, right motor fwd
-        target_output = (speed * direction, -speed * direction)
+        tgt_l = speed * direction
+        tgt_r = -tgt_l
 
-        dir_label = "CW" if direction > 0 else "CCW"
-        print("[MC-DIAG] turn start: %.1f deg %s, speed=%d, timeout=%d ms"
-              % (target_deg, dir_label, speed, timeout))
+        if self._logging:
+            print("[MC-DIAG] turn start: %.1f deg %s, speed=%d, timeout=%d ms"
+                  % (target_deg, "CW" if direction > 0 else "CCW", speed, timeout))
 
+        self._begin_command()
+        self._load_coast_model()
         self._busy = True
+        self._fusion.reset_heading()
         self.integrated_deg = 0.0
         elapsed_ms = 0
         loop_count = 0
         peak_dps = 0.0
+        learn = False            # stopped on the gyro, so the coast model can learn from this turn
+        stop_rate = 0.0
+        predicted_deg = 0.0
         last_time = time.ticks_ms()
 
         try:
             self._power_on()
+            self._start_sampling(False)
 
             while elapsed_ms < timeout:
                 cur_time = time.ticks_ms()
@@ -296,69 +395,89 @@ class MotorController:
                 last_time = cur_time
 
                 # Ramp toward target
-                self._ramp_toward(target_output, delta)
+                self._ramp_toward(tgt_l, tgt_r, delta)
                 self._send_output()
 
                 # Integrate gyro
-                self._read_gyro(delta)
+                self._sense(delta, False)
                 elapsed_ms += delta
                 loop_count += 1
                 if abs(self.gyro_dps) > peak_dps:
                     peak_dps = abs(self.gyro_dps)
 
-                # Periodic progress (every ~250 ms)
-                if loop_count % 25 == 0 and self._logging:
-                    remaining = target_deg - self.integrated_deg
-                    print("[MC-DIAG]   turn progress: %.1f / %.1f deg  "
-                          "gyro=%.1f dps  elapsed=%d ms  remaining=%.1f deg"
-                          % (self.integrated_deg, target_deg,
-                             self.gyro_dps, elapsed_ms, remaining))
-
-                if self.integrated_deg >= target_deg:
-                    break
+                self._trace_tick(cur_time)
+
+                # Start stopping once the coast during the ramp down (plus the
+                # learned coast after it) will carry us to the target; when
+                # handing over at speed there is no ramp down, so run to it
+                ramp_ms = self._ramp_ms()
+                if blend:
+                    if self.integrated_deg >= target_deg:
+                        break
+                elif self._odometry_active:
+                    if abs(self._odometry.stop_heading_deg(ramp_ms)) >= target_deg:
+                        break
+                else:
+                    stop_rate = self._fusion.rate_dps
+                    predicted_deg = self._fusion.stop_heading_deg(ramp_ms)
+                    if predicted_deg + self._coast.predict(stop_rate) >= target_deg:
+                        learn = True
+                        break
 
                 await asyncio.sleep_ms(self._update_ms)
 
             timed_out = elapsed_ms >= timeout
-            overshoot = self.integrated_deg - target_deg
             avg_loop = elapsed_ms / loop_count if loop_count else 0
 
-            # Ramp down to stop
-            await self._ramp_stop()
-
-            # Read a few more gyro samples during coast-down
-            post_stop_deg = self.integrated_deg
-            for _ in range(5):
-                t = time.ticks_ms()
-                d = time.ticks_diff(t, last_time)
-                last_time = t
-                self._read_gyro(d)
-                await asyncio.sleep_ms(self._update_ms)
+            ramp_start_deg = self.integrated_deg
+            post_stop_deg = ramp_start_deg
+            if not blend:
+                # Ramp down to stop, still integrating the gyro
+                await self._ramp_stop_sensing()
+
+                # Read a few more gyro samples during coast-down
+                post_stop_deg = self.integrated_deg
+                last_time = time.ticks_ms()
+                for _ in range(5):
+                    await asyncio.sleep_ms(self._update_ms)
+                    t = time.ticks_ms()
+                    d = time.ticks_diff(t, last_time)
+                    last_time = t
+                    self._sense(d, False)
             coast_deg = self.integrated_deg - post_stop_deg
+            overshoot = self.integrated_deg - target_deg
+            if learn and not blend and abs(stop_rate) >= _COAST_MIN_RATE_DPS:
+                self._learn_coast(stop_rate, abs(self.integrated_deg) - predicted_deg)
             if self._logging:
+                if not blend:
+                    self._dump_trace()
                 print("[MC-DIAG] turn done: integrated=%.2f deg  target=%.1f deg  "
                     "overshoot=%.2f deg" % (self.integrated_deg, target_deg, overshoot))
                 print("[MC-DIAG]   elapsed=%d ms  loops=%d  avg_loop=%.1f ms"
                     % (elapsed_ms, loop_count, avg_loop))
-                print("[MC-DIAG]   peak_dps=%.1f  coast_after_stop=%.2f deg"
-                    % (peak_dps, coast_deg))
+                print("[MC-DIAG]   peak_dps=%.1f  ramp_down=%.2f deg  coast_after_stop=%.2f deg"
+                    % (peak_dps, post_stop_deg - ramp_start_deg, coast_deg))
+                print("[MC-DIAG]   coast model: %.0f ms %+.2f deg (%d turns this session)"
+                    % (self._coast.coast_ms, self._coast.offset_deg, self._coast.turns))
                 if timed_out:
                     print("[MC-DIAG]   WARNING: turn timed out before reaching target")
         finally:
+            self._stop_sampling()
             self._busy = False
+        return (self.integrated_deg - target_deg) * direction
 
 
     async def turn_left(self, degrees, **kwargs):
         """Convenience: turn anti-clockwise by *degrees*."""
-        await self.turn(-abs(degrees), **kwargs)
+        return await self.turn(-abs(degrees), **kwargs)
 
 
     async def turn_right(self, degrees, **kwargs):
         """Convenience: turn clockwise by *degrees*."""
-        await self.turn(abs(degrees), **kwargs)
+        return await self.turn(abs(degrees), **kwargs)
 
 
-    async def timed_turn(self, duration_ms, direction=1, *, speed_frac=None):
+    async def timed_turn(self, duration_ms, direction=1, *, speed_frac=None, blend=False):
         """Turn for *duration_ms* milliseconds without gyro feedback.
 
         Parameters
@@ -369,13 +488,16 @@ class MotorController:
             +1 = clockwise, -1 = anti-clockwise.
         speed_frac : float | None
             Override the default turn speed as a fraction of max_power.
+        blend : bool
+            Leave the motors running at the end instead of ramping down, for
+            the next command to ramp from.
         """
         frac = speed_frac if speed_frac is not None else self._turn_speed_frac
         speed = int(self.max_power * frac)
         # CW  = left motor fwd, right motor rev
         # CCW = left motor rev, right motor fwd
         target = (speed * direction, -speed * direction)
-        await self._timed_drive(target, abs(duration_ms))
+        await self._timed_drive(target, abs(duration_ms), blend=blend)
 
 
     async def timed_turn_left(self, duration_ms, **kwargs):
@@ -390,7 +512,7 @@ class MotorController:
 
     def stop(self):
         """Immediately zero the motors (non-async, no ramp)."""
-        self.motor_output = (0, 0)
+        self.motor_output = _STOPPED
         self._send_output()
         if self._hexdrive is not None:
             self._hexdrive.set_power(False)
@@ -399,6 +521,7 @@ class MotorController:
 
     async def brake(self):
         """Ramp the motors to zero then cut power."""
+        self._begin_command()
         await self._ramp_stop()
         if self._hexdrive is not None:
             self._hexdrive.set_power(False)
@@ -409,16 +532,38 @@ class MotorController:
     # ------------------------------------------------------------------
 
     async def run_instructions(self, instructions):
-        """Execute a list of ``Instruction`` objects sequentially.
-
-        Each instruction is translated into the appropriate ``forward``,
-        ``backward``, or ``turn`` call.  When the ``drive_mode`` setting
-        is 1 (Distance), UP/DOWN use the accelerometer-based
-        ``forward_mm`` / ``backward_mm`` with ``drive_step_mm`` as the
-        distance per step.  Otherwise time-based driving is used with
-        ``drive_step_ms``.
-
-        Turns always use the gyro regardless of drive mode.
+        """Execute a list of ``Instruction`` objects as one pipelined move.
+
+        The list is expected to have been optimised already (see
+        ``program_store.optimise_program``), so each instruction is one
+        segment in a different direction from the one before.  Each segment
+        hands over to the next one while the motors are still running (the
+        next segment ramps straight from the current speed) so the robot
+        only comes to a full stop where it has to:
+
+        * a reversal on the same axis (UP then DOWN, or LEFT then RIGHT)
+          stops first, so the new segment does not count the deceleration
+          in the old direction as progress;
+        * a drive measured by the accelerometer starts from rest, as its
+          velocity is integrated from zero and the accelerometer is ignored
+          while the robot is still turning.  With wheel encoders a turn
+          hands over to a drive at speed too.
+
+        Segments that hand over run to their actual target rather than
+        stopping early for a ramp down that does not happen, and how far
+        each segment ended up past (or short of) its target is taken off the
+        next segment it affects: the next turn for heading, and the next
+        drive for distance if there is no turn in between.  For distance
+        drives the accelerometer is calibrated once, before the first
+        segment, instead of before every drive.
+
+        When the ``drive_mode`` setting is 1 (Distance, the default), UP/DOWN
+        drive ``drive_step_mm`` per step using the encoders or accelerometer
+        and LEFT/RIGHT turn using the gyro.  Otherwise time-based moves are
+        used with ``drive_step_ms`` / ``turn_step_ms``; every change of
+        direction reverses a wheel, so only a segment followed by another in
+        the same direction (in a list that has not been merged) hands over
+        at speed.
 
         Parameters
         ----------
@@ -428,48 +573,56 @@ class MotorController:
         """
         from events.input import BUTTON_TYPES
 
-        use_distance = True # (self._settings.get('drive_mode') is not None and int(self._settings['drive_mode'].v) == 1)
+        use_distance = self._setting('drive_mode', _DRIVE_MODE_DISTANCE) == _DRIVE_MODE_DISTANCE
+        last = len(instructions) - 1
+        up = BUTTON_TYPES["UP"]
+        down = BUTTON_TYPES["DOWN"]
+        carry_mm = 0.0          # forward distance past the last drive's target, while no turn has followed it
+        carry_deg = 0.0         # clockwise heading past the last turn's target
 
         self._power_on()
         try:
-            for instr in instructions:
+            if use_distance:
+                # Calibrate once, while the robot is known to be stationary
+                self._begin_command()
+                if not self._odometry_active:
+                    await self._calibrate_accel()
+            for i, instr in enumerate(instructions):
                 btn = instr.press_type
                 count = instr.duration
-
-                if btn == BUTTON_TYPES["UP"]:
+                is_drive = btn == up or btn == down
+                blend = False
+                if i < last:
+                    nxt = instructions[i + 1].press_type
                     if use_distance:
-                        # temprarily use drive_step_ms as the time per step to estimate distance, until we have a real distance-per-step calibration value
-                        mm = self.drive_step_ms * count
-                        await self.forward_mm(mm)
+                        next_is_drive = nxt == up or nxt == down
+                        blend = is_drive != next_is_drive and (not next_is_drive or self._odometry_active)
                     else:
-                        dur = self.drive_step_ms * count
-                        await self.forward(dur)
-                elif btn == BUTTON_TYPES["DOWN"]:
+                        blend = nxt == btn
+                if is_drive:
+                    sign = 1 if btn == up else -1
                     if use_distance:
                         # temprarily use drive_step_ms as the time per step to estimate distance, until we have a real distance-per-step calibration value
-                        mm = self.drive_step_ms * count
-                        await self.backward_mm(mm)
+                        target = int(self.max_power * self._drive_speed_frac) * sign
+                        over_mm = await self._distance_drive((target, target), max(0.0, self.drive_step_ms * count - sign * carry_mm),
+                                                             blend=blend, calibrate=False)
+                        carry_mm = sign * over_mm
+                    elif sign > 0:
+                        await self.forward(self.drive_step_ms * count, blend=blend)
                     else:
-                        dur = self.drive_step_ms * count
-                        await self.backward(dur)
-                elif btn == BUTTON_TYPES["LEFT"]:
+                        await self.backward(self.drive_step_ms * count, blend=blend)
+                elif btn == BUTTON_TYPES["LEFT"] or btn == BUTTON_TYPES["RIGHT"]:
+                    sign = 1 if btn == BUTTON_TYPES["RIGHT"] else -1
                     if use_distance:
                         # temprarily use turn_step_ms as the time per step to estimate distance, until we have a real distance-per-step calibration value
-                        deg = self.turn_step_ms * count
-                        await self.turn_left(deg)
+                        carry_deg = await self.turn(sign * self.turn_step_ms * count - carry_deg, blend=blend)
+                        carry_mm = 0.0
                     else:
-                        dur = self.turn_step_ms * count
-                        await self.timed_turn_left(dur)
-                elif btn == BUTTON_TYPES["RIGHT"]:
-                    if use_distance:
-                        # temprarily use turn_step_ms as the time per step to estimate distance, until we have a real distance-per-step calibration value
-                        deg = self.turn_step_ms * count
-                        await self.turn_right(deg)
-                    else:
-                        dur = self.turn_step_ms * count
-                        await self.timed_turn_right(dur)
+                        await self.timed_turn(self.turn_step_ms * count, direction=sign, blend=blend)
         finally:
             await self.brake()
+            # save anything learned (e.g. the coast model) once the robot has stopped
+            commit_settings(self._settings)
 
     # ------------------------------------------------------------------
     # Internal helpers
@@ -491,6 +644,83 @@ class MotorController:
             return 0.0
         return radians(-(int(self._front_face_setting.v) * 30))
 
+    def _begin_command(self):
+        """Latch the settings used by the control loops for the next command.
+
+        Works out the power limit, the per-tick acceleration and the
+        forward unit vector for the accelerometer projection once, and
+        starts a new trace - unless the motors are still running from a
+        command that handed over to this one, which adds to its trace so
+        that the whole move is printed once, after it has stopped.
+        """
+        self._limit = self.max_power
+        self._accel_step = self.acceleration
+        theta = self._get_front_angle_rad()
+        self._fwd_cos = cos(theta)
+        self._fwd_sin = sin(theta)
+        if self.motor_output == _STOPPED:
+            self.trace.clear()
+            self._trace_ms = time.ticks_ms()
+        self._setup_odometry()
+
+    def _setting(self, name, default=0):
+        return int(self._settings[name].v) if name in self._settings else default
+
+    def _load_coast_model(self):
+        """Load the coast model from the settings, unless they still hold what it was last loaded from or saved as."""
+        config = (self._setting('coast_ms'), self._setting('coast_offset'))
+        if config != self._coast_config:
+            self._coast_config = config
+            self._coast.reset(config[0], config[1] / 10.0)
+
+    def _learn_coast(self, rate_dps, extra_deg):
+        """Update the coast model from a finished turn and copy it into the settings (saved by ``run_instructions``)."""
+        coast = self._coast
+        coast.update(rate_dps, extra_deg)
+        config = (int(round(coast.coast_ms)), int(round(coast.offset_deg * 10)))
+        self._coast_config = config
+        if 'coast_ms' in self._settings and 'coast_offset' in self._settings:
+            self._settings['coast_ms'].v = config[0]
+            self._settings['coast_offset'].v = config[1]
+
+    def _setup_odometry(self):
+        """(Re)attach the wheel encoders if the settings call for them, and zero the odometry."""
+        config = (self._setting('enc_port'), self._setting('enc_counts', 1), self._setting('enc_track_mm', 1),
+                  self._setting('enc1_dir'), self._setting('enc2_dir'))
+        if config != self._odometry_config:
+            self._odometry_config = config
+            if self._odometry is not None:
+                self._odometry.deinit()
+                self._odometry = None
+            port = config[0]
+            if port > 0:
+                left = Encoder(None, hs_pin_gpio(port, 0), hs_pin_gpio(port, 1), filter_ns=_ENCODER_FILTER_NS)
+                right = Encoder(None, hs_pin_gpio(port, 2), hs_pin_gpio(port, 3), filter_ns=_ENCODER_FILTER_NS)
+                if left.unit is None or right.unit is None:
+                    left.deinit()
+                    right.deinit()
+                    print("[MC] wheel encoders unavailable (no free PCNT units)")
+                else:
+                    self._odometry = WheelOdometry(left, right, config[1], config[2], config[3] != 0, config[4] != 0)
+                    if self._logging:
+                        print("[MC] wheel encoders on port %d" % port)
+        self._odometry_active = self._odometry is not None
+        self._odometry_idle_ms = 0
+        if self._odometry is not None:
+            self._odometry.reset()
+
+    def _trace_tick(self, now):
+        """Append the current outputs and estimates to the trace (no formatting, no allocation)."""
+        output = self.motor_output
+        self.trace.record(time.ticks_diff(now, self._trace_ms), output[0], output[1], self.gyro_dps,
+                          self.integrated_deg, self.accel_mps2, self.distance_m)
+
+    def _dump_trace(self):
+        """Print the trace of the command that has just finished."""
+        self.trace.dump("[MC-TRACE]")
+        if self._sampler is not None and self._sampler.dropped:
+            print("[MC-DIAG]   imu samples dropped=%d" % self._sampler.dropped)
+
     async def _calibrate_accel(self):
         """Sample the accelerometer while stationary to estimate bias.
 
@@ -502,6 +732,8 @@ class MotorController:
             return
         total_x = 0.0
         total_y = 0.0
+        total_gyro = 0.0
+        gyro_count = 0
         samples_x = []
         samples_y = []
         n = 10
@@ -517,6 +749,11 @@ class MotorController:
             except Exception:           # pylint: disable=broad-exception-caught
                 # Ignore individual read failures; we'll check how many succeeded below.
                 pass
+            try:
+                total_gyro += float(_imu.gyro_read()[self._gyro_axis])
+                gyro_count += 1
+            except Exception:           # pylint: disable=broad-exception-caught
+                pass
             # we need to wait a bit between samples to let the IMU update, otherwise we just get the same reading repeatedly
             await asyncio.sleep_ms(10)
         success_count = len(samples_x)
@@ -528,10 +765,13 @@ class MotorController:
             return
         self._accel_bias_x = total_x / success_count
         self._accel_bias_y = total_y / success_count
-        self._accel_filtered = 0.0
+        if gyro_count:
+            self._fusion.set_gyro_bias(total_gyro / gyro_count)
+        self._fusion.reset_distance()
         self._accel_calibrated = True
         if self._logging:
-            print("[MC-DIAG] calibrate: bias_x=%.4f  bias_y=%.4f" % (self._accel_bias_x, self._accel_bias_y))
+            print("[MC-DIAG] calibrate: bias_x=%.4f  bias_y=%.4f  gyro_bias=%.3f dps"
+                  % (self._accel_bias_x, self._accel_bias_y, self._fusion.gyro_bias_dps))
             if samples_x:
                 sx_str = ', '.join(['%.3f' % s for s in samples_x])
                 sy_str = ', '.join(['%.3f' % s for s in samples_y])
@@ -541,15 +781,50 @@ class MotorController:
 
     def _reset_distance(self):
         """Zero the accelerometer integrator state."""
+        self._fusion.reset_distance()
         self.accel_mps2 = 0.0
         self.velocity_mps = 0.0
         self.distance_m = 0.0
-        self._accel_filtered = 0.0
+
+
+    async def _wait_for_rotation_to_stop(self):
+        """Keep reading the gyro until the robot has stopped turning (or _ROTATION_SETTLE_MS passes).
+
+        The accelerometer is ignored while the robot turns, so a drive that
+        started while the robot was still coasting round from a turn would
+        miss its own acceleration.
+        """
+        waited = 0
+        last_time = time.ticks_ms()
+        while waited < _ROTATION_SETTLE_MS:
+            await asyncio.sleep_ms(self._update_ms)
+            cur_time = time.ticks_ms()
+            delta = time.ticks_diff(cur_time, last_time)
+            last_time = cur_time
+            self._sense(delta, False)
+            waited += delta
+            if not self._fusion.rotating:
+                break
+
+
+    def _ramp_ms(self) -> int:
+        """Time the current output would take to ramp down to zero."""
+        cur_l, cur_r = self.motor_output
+        peak = max(abs(cur_l), abs(cur_r))
+        return (peak // self._accel_step) * _TICK_MS
 
 
     def _send_output(self):
-        """Push ``self.motor_output`` to the HexDrive."""
-        if self._hexdrive is not None:
+        """Push ``self.motor_output`` to the HexDrive, or to the output arbiter if there is one."""
+        arbiter = self._output_arbiter
+        if arbiter is not None:
+            # held until replaced, as this loop does not run in step with the arbiter;
+            # once stopped, give the motors back to the other sources
+            if self.motor_output == _STOPPED:
+                arbiter.release(SOURCE_CONTROLLER)
+            else:
+                arbiter.submit(SOURCE_CONTROLLER, self.motor_output, hold=True)
+        elif self._hexdrive is not None:
             output = self.motor_output
             if self._apply_motor_directions_callback is not None:
                 mapped = self._apply_motor_directions_callback(output)
@@ -569,93 +844,152 @@ class MotorController:
         return current
 
 
-    def _ramp_toward(self, target, delta_ms):
-        """Slew ``self.motor_output`` toward *target* respecting acceleration."""
-        ticks = max(1, delta_ms // _TICK_MS)
-        step = self.acceleration * ticks
-        cur_l, cur_r = int(self.motor_output[0]), int(self.motor_output[1])
-        tgt_l = max(-self.max_power, min(self.max_power, int(target[0])))
-        tgt_r = max(-self.max_power, min(self.max_power, int(target[1])))
-        self.motor_output = (
-            self._slew(cur_l, tgt_l, step),
-            self._slew(cur_r, tgt_r, step),
-        )
+    def _ramp_toward(self, tgt_l, tgt_r, delta_ms):
+        """Slew ``self.motor_output`` toward (*tgt_l*, *tgt_r*) respecting acceleration.
+
+        Uses the limits latched by ``_begin_command`` and only builds a new
+        output tuple when the power actually changes.
+        """
+        ticks = delta_ms // _TICK_MS
+        step = self._accel_step * (ticks if ticks > 1 else 1)
+        limit = self._limit
+        tgt_l = -limit if tgt_l < -limit else (limit if tgt_l > limit else tgt_l)
+        tgt_r = -limit if tgt_r < -limit else (limit if tgt_r > limit else tgt_r)
+        cur_l, cur_r = self.motor_output
+        new_l = self._slew(cur_l, tgt_l, step)
+        new_r = self._slew(cur_r, tgt_r, step)
+        if new_l == 0 and new_r == 0:
+            self.motor_output = _STOPPED
+        elif new_l != cur_l or new_r != cur_r:
+            self.motor_output = (new_l, new_r)
 
 
     async def _ramp_stop(self):
         """Ramp motors to zero and hold briefly to let the robot settle."""
         last_time = time.ticks_ms()
-        while self.motor_output != (0, 0):
+        while self.motor_output != _STOPPED:
             cur_time = time.ticks_ms()
             delta = time.ticks_diff(cur_time, last_time)
             last_time = cur_time
-            self._ramp_toward((0, 0), max(delta, 1))
+            self._ramp_toward(0, 0, delta)
             self._send_output()
             await asyncio.sleep_ms(self._update_ms)
         self._send_output()
         # Zero velocity when we know the robot has stopped (drift reset)
+        self._fusion.zero_velocity()
         self.velocity_mps = 0.0
         await asyncio.sleep_ms(_DEFAULT_SETTLE_MS)
 
-    async def _ramp_stop_with_accel(self):
-        """Ramp motors to zero while continuing to read the accelerometer.
+    async def _ramp_stop_sensing(self, read_accel=False):
+        """Ramp motors to zero while continuing to read the IMU.
 
-        This is used by ``_distance_drive`` so that the final distance
-        includes displacement accumulated during the ramp-down phase.
+        This is used by ``turn`` and ``_distance_drive`` so that the final
+        heading and distance include the motion during the ramp-down phase
+        (the fusion filter needs the gyro for both).
         """
         last_time = time.ticks_ms()
-        while self.motor_output != (0, 0):
+        while self.motor_output != _STOPPED:
             cur_time = time.ticks_ms()
             delta = time.ticks_diff(cur_time, last_time)
             last_time = cur_time
-            self._ramp_toward((0, 0), max(delta, 1))
+            self._ramp_toward(0, 0, delta)
             self._send_output()
-            self._read_accel(max(delta, 1))
+            self._sense(delta if delta > 1 else 1, read_accel)
+            self._trace_tick(cur_time)
             await asyncio.sleep_ms(self._update_ms)
         self._send_output()
+        self._fusion.zero_velocity()
         self.velocity_mps = 0.0
         await asyncio.sleep_ms(_DEFAULT_SETTLE_MS)
 
 
-    async def _timed_drive(self, target, duration_ms):
-        """Run motors at *target* for *duration_ms* with ramp-up and ramp-down."""
+    async def _timed_drive(self, target, duration_ms, *, blend=False):
+        """Run motors at *target* for *duration_ms* with ramp-up and ramp-down.
+
+        The whole power profile is planned up front from the current settings,
+        so each tick just looks up the power for the elapsed time.  The ramp
+        up starts from the current output if the wheels keep their directions.
+        With *blend* the move ends where the ramp down would begin, leaving the
+        motors running for the next command.
+        """
+        self._begin_command()
+        max_power = self._limit
+        tgt_l = max(-max_power, min(max_power, int(target[0])))
+        tgt_r = max(-max_power, min(max_power, int(target[1])))
+        mag_l = abs(tgt_l)
+        mag_r = abs(tgt_r)
+        sign_l = 1 if tgt_l >= 0 else -1
+        sign_r = 1 if tgt_r >= 0 else -1
+        peak = max(mag_l, mag_r)
+        if peak == 0:
+            return
+        # Ramp on from the current output when the wheels keep their directions;
+        # only a reversal has to stop first
+        cur_l, cur_r = self.motor_output
+        start = 0
+        if cur_l * tgt_l >= 0 and cur_r * tgt_r >= 0:
+            start = max(abs(cur_l), abs(cur_r))
+        elif self.motor_output != _STOPPED:
+            await self._ramp_stop()
+        profile = MotionProfile(peak, duration_ms, self._accel_step, self.profile_shape, _TICK_MS, start)
+        total_ms = profile.down_ms if blend else profile.total_ms
+        last_level = -1
         self._busy = True
-        elapsed = 0
-        last_time = time.ticks_ms()
 
         try:
             self._power_on()
-
-            # Phase 1 — ramp up and cruise
-            while elapsed < duration_ms:
+            start_time = time.ticks_ms()
+            while True:
                 cur_time = time.ticks_ms()
-                delta = time.ticks_diff(cur_time, last_time)
-                last_time = cur_time
-                self._ramp_toward(target, delta)
+                elapsed = time.ticks_diff(cur_time, start_time)
+                if elapsed >= total_ms:
+                    break
+                level = profile.level(elapsed)
+                if level != last_level:
+                    # Cruise ticks reuse the existing output tuple
+                    last_level = level
+                    # scaled on the magnitudes so both directions round the same way
+                    self.motor_output = (sign_l * (level * mag_l // peak), sign_r * (level * mag_r // peak))
                 self._send_output()
-                elapsed += delta
+                self._trace_tick(cur_time)
                 await asyncio.sleep_ms(self._update_ms)
 
-            # Phase 2 — ramp down
-            await self._ramp_stop()
+            if blend:
+                return
+            self.motor_output = _STOPPED
+            self._send_output()
+            # Zero velocity when we know the robot has stopped (drift reset)
+            self._fusion.zero_velocity()
+            self.velocity_mps = 0.0
+            await asyncio.sleep_ms(_DEFAULT_SETTLE_MS)
         finally:
             self._busy = False
 
 
     async def _distance_drive(self, target, distance_mm,
-                              timeout_ms=None):
-        """Drive until the accelerometer estimates *distance_mm* covered.
+                              timeout_ms=None, *, blend=False, calibrate=True):
+        """Drive until the wheel encoders or the accelerometer estimate *distance_mm* covered.
 
         Uses proportional deceleration: the motor speed scales linearly
         from full to zero over the last 30% of the target distance.
         This avoids the need to predict coast/overshoot and naturally
         adapts to different speeds, surfaces and battery levels.
+
+        With *blend* the motors are left running at the end for the next
+        command to ramp from, so the drive runs at full speed to the target
+        itself (no taper and no early stop for a ramp down); with
+        *calibrate* False the accelerometer bias from an earlier calibration
+        is reused instead of stopping to measure it again.
+
+        Returns how far the drive went past *distance_mm* (negative if short).
         """
         timeout = timeout_ms if timeout_ms is not None else self._drive_timeout_ms
+        self._begin_command()
+        use_encoders = self._odometry_active
 
-        # Apply calibration scale (percentage).
+        # Apply calibration scale (percentage) - accelerometer only.
         scale_pct = 100
-        if self._settings.get('accel_scale') is not None:
+        if not use_encoders and self._settings.get('accel_scale') is not None:
             scale_pct = max(1, int(self._settings['accel_scale'].v))
         target_m = abs(distance_mm) / 1000.0 * (100.0 / scale_pct)
 
@@ -663,7 +997,7 @@ class MotorController:
         # there is nothing to do. Early-return to avoid division by zero
         # when computing proportional deceleration.
         if target_m <= 0:
-            return
+            return 0.0
 
         # Deceleration zone: start slowing at this fraction of the target
         DECEL_START = 0.70  # begin slowing at 70% of target
@@ -672,18 +1006,22 @@ class MotorController:
         # Minimum motor speed during deceleration (below this we just stop)
         min_frac = 0.15
 
+        tgt_l = int(target[0])
+        tgt_r = int(target[1])
         self._busy = True
-        # wait a moment to let any previous motion settle, then calibrate the accelerometer bias
-        await asyncio.sleep_ms(250)
-        self._calibrate_accel()
+        if calibrate and not use_encoders:
+            # wait a moment to let any previous motion settle, then calibrate the accelerometer bias
+            await asyncio.sleep_ms(250)
+            await self._calibrate_accel()
+        if not use_encoders and self.motor_output == _STOPPED:
+            await self._wait_for_rotation_to_stop()
         self._reset_distance()
         elapsed = 0
         last_time = time.ticks_ms()
-        _diag_tick = 0
+        target_mm = target_m * 1000
 
         # --- DIAGNOSTICS: start ---
         if self._logging:
-            target_mm = target_m * 1000
             print("[MC-DIAG] === distance_drive START ===")
             print("[MC-DIAG]   requested   = %.1f mm" % distance_mm)
             print("[MC-DIAG]   accel_scale = %d%%" % scale_pct)
@@ -696,61 +1034,57 @@ class MotorController:
             if self._front_face_setting is not None:
                 theta_deg = -(int(self._front_face_setting.v) * 30)
             print("[MC-DIAG]   front_face_angle=%d deg" % theta_deg)
+            print("[MC-DIAG]   source=%s" % ("encoders" if use_encoders else "accelerometer"))
 
         try:
             self._power_on()
+            self._start_sampling(not use_encoders)
 
             while elapsed < timeout:
                 cur_time = time.ticks_ms()
                 delta = time.ticks_diff(cur_time, last_time)
                 last_time = cur_time
 
+                if use_encoders and not self._odometry_active:
+                    # Encoders stopped counting and the accelerometer isn't calibrated - give up
+                    break
+                if blend:
+                    stop_m = self.distance_m
+                elif use_encoders:
+                    stop_m = abs(self._odometry.stop_distance_mm(self._ramp_ms())) / 1000.0
+                else:
+                    stop_m = self._fusion.stop_distance_m(self._ramp_ms())
+
                 # Proportional speed: full speed up to decel_start,
                 # then linearly taper to min_frac, then stop.
-                if self.distance_m >= target_m:
-                    # Target reached — stop immediately
+                if stop_m >= target_m:
+                    # Target will be reached during the ramp down (or has
+                    # been reached, when handing over at speed) — stop now
                     break
-                elif self.distance_m > decel_start_m:
+                elif not blend and self.distance_m > decel_start_m:
                     # In deceleration zone — scale speed linearly
                     remaining = max(0, target_m - self.distance_m)
                     frac = remaining / decel_range_m
                     frac = max(min_frac, min(1.0, frac))
-                    scaled = (int(target[0] * frac), int(target[1] * frac))
-                    self._ramp_toward(scaled, delta)
+                    self._ramp_toward(int(tgt_l * frac), int(tgt_r * frac), delta)
                 else:
                     # Full speed
-                    self._ramp_toward(target, delta)
+                    self._ramp_toward(tgt_l, tgt_r, delta)
 
                 self._send_output()
-                self._read_accel(delta)
+                self._sense(delta, not use_encoders)
                 elapsed += delta
 
-                # --- DIAGNOSTICS: periodic (every ~100 ms) ---
-                _diag_tick += delta
-                if _diag_tick >= 100:
-                    _diag_tick = 0
-                    d_mm = self.distance_m * 1000
-                    spd_pct = 100
-                    if self.distance_m > decel_start_m and decel_range_m > 0:
-                        remaining = max(0, target_m - self.distance_m)
-                        spd_pct = int(max(min_frac, min(1.0, remaining / decel_range_m)) * 100)
-                    if self._logging:
-                        print("[MC-DIAG]  t=%5dms a=%+.4f m/s2 v=%+.5f m/s d=%.2f/%.1f mm spd=%d%% mot=%s" % (
-                            elapsed, self.accel_mps2, self.velocity_mps, d_mm, target_mm, spd_pct, str(self.motor_output)))
-
+                self._trace_tick(cur_time)
                 await asyncio.sleep_ms(self._update_ms)
-            else:
-                d_mm = self.distance_m * 1000
-                if self._logging:
-                    print("[MC-DIAG]  TIMEOUT after %d ms  dist=%.2f mm" % (elapsed, d_mm))
 
-            d_mm = self.distance_m * 1000
-            if self._logging:
-                print("[MC-DIAG]  STOP at dist=%.2f mm (elapsed=%d ms)" % (d_mm, elapsed))
+            timed_out = elapsed >= timeout
+            stop_mm = self.distance_m * 1000
 
             # Ramp down remaining motor output while still reading accel
             ramp_start_dist = self.distance_m
-            await self._ramp_stop_with_accel()
+            if not blend:
+                await self._ramp_stop_sensing(read_accel=not use_encoders)
             ramp_dist = self.distance_m - ramp_start_dist
 
             # --- DIAGNOSTICS: end ---
@@ -758,14 +1092,21 @@ class MotorController:
                 final_mm = self.distance_m * 1000
                 ramp_mm = ramp_dist * 1000
                 over_mm = (self.distance_m - target_m) * 1000
+                if not blend:
+                    self._dump_trace()
                 print("[MC-DIAG] === distance_drive END ===")
+                if timed_out:
+                    print("[MC-DIAG]   TIMEOUT after %d ms" % elapsed)
+                print("[MC-DIAG]   stop_distance  = %.2f mm" % stop_mm)
                 print("[MC-DIAG]   final_distance = %.2f mm  (target was %.1f mm, scaled target %.1f mm)" % (final_mm, distance_mm, target_mm))
                 print("[MC-DIAG]   ramp_down_dist = %.2f mm" % ramp_mm)
                 print("[MC-DIAG]   final_velocity = %.5f m/s" % self.velocity_mps)
                 print("[MC-DIAG]   elapsed        = %d ms" % elapsed)
                 print("[MC-DIAG]   overshoot      = %+.2f mm" % over_mm)
         finally:
+            self._stop_sampling()
             self._busy = False
+        return (self.distance_m - target_m) * 1000.0 * scale_pct / 100.0
 
     def _estimate_ramp_overshoot(self):
         """Estimate distance the robot will coast while motors ramp to zero.
@@ -781,48 +1122,121 @@ class MotorController:
         ramp_secs = ramp_iters * self._avg_loop_ms / 1000.0
         return v * ramp_secs * 0.75
 
+    def _start_sampling(self, read_accel):
+        """Start the background IMU sampler for a command."""
+        if self._sampler is not None:
+            self._sample_us = time.ticks_us()
+            self._sampler.start(read_accel)
+
+    def _stop_sampling(self):
+        if self._sampler is not None:
+            self._sampler.stop()
+
+    def _sense(self, delta_ms, read_accel):
+        """Integrate the IMU data gathered since the last tick.
+
+        When the background sampler is running every queued sample is
+        integrated with its own time step; otherwise the IMU is read once
+        and integrated over *delta_ms*.
+        """
+        sampler = self._sampler
+        if sampler is None or not sampler.running:
+            self._read_gyro(delta_ms)
+            if read_accel:
+                self._read_accel(delta_ms)
+        else:
+            self._drain_sampler(sampler, read_accel)
+        if self._odometry_active:
+            self._update_odometry(delta_ms)
+
+    def _drain_sampler(self, sampler, read_accel):
+        last_us = self._sample_us
+        while True:
+            i = sampler.pop()
+            if i < 0:
+                break
+            t_us = sampler.t_us[i]
+            dt_ms = time.ticks_diff(t_us, last_us) / 1000.0
+            last_us = t_us
+            if dt_ms <= 0:
+                continue
+            self._integrate_gyro(sampler.gyro[i], dt_ms)
+            if read_accel:
+                self._integrate_accel(sampler.acc_x[i], sampler.acc_y[i], dt_ms)
+        self._sample_us = last_us
+
+    def _update_odometry(self, delta_ms):
+        """Read the wheel encoders and use them for the heading and distance."""
+        odometry = self._odometry
+        left_mm = odometry.left_mm
+        right_mm = odometry.right_mm
+        odometry.update(delta_ms)
+        if self.motor_output == _STOPPED or odometry.left_mm != left_mm or odometry.right_mm != right_mm:
+            self._odometry_idle_ms = 0
+        else:
+            self._odometry_idle_ms += delta_ms
+            if self._odometry_idle_ms >= _ENCODER_STALL_MS:
+                # Driving but no counts - encoders missing or mis-wired, fall back to the IMU
+                self._odometry_active = False
+                print("[MC] no wheel encoder counts, using the IMU")
+                return
+        self.integrated_deg = abs(odometry.heading_deg)
+        self.distance_m = abs(odometry.distance_mm) / 1000.0
+        self.velocity_mps = odometry.velocity_mmps / 1000.0
+
     def _read_gyro(self, delta_ms):
-        """Read the gyro and accumulate into ``integrated_deg``."""
+        """Read the gyro once and integrate it over *delta_ms*."""
         if _imu is None:
             return
         try:
             raw = _imu.gyro_read()
-            self.gyro_dps = float(raw[self._gyro_axis])
+            dps = float(raw[self._gyro_axis])
         except Exception:       # pylint: disable=broad-exception-caught
             self.gyro_dps = 0.0
             return
-        magnitude = abs(self.gyro_dps)
-        if magnitude > self._gyro_deadband:
-            self.integrated_deg += magnitude * (delta_ms / 1000.0)
+        self._integrate_gyro(dps, delta_ms)
+
+    def _integrate_gyro(self, dps, delta_ms):
+        """Feed a gyro sample to the fusion filter and update ``integrated_deg``.
+
+        ``integrated_deg`` is the magnitude of the bias-corrected heading
+        change, so turns in either direction count up from zero.
+        """
+        self.gyro_dps = dps
+        fusion = self._fusion
+        fusion.driving = self.motor_output != _STOPPED
+        fusion.update_gyro(dps, delta_ms)
+        self.integrated_deg = abs(fusion.heading_deg)
 
     def _read_accel(self, delta_ms):
-        """Read the accelerometer, filter, and double-integrate into distance.
+        """Read the accelerometer once and integrate it over *delta_ms*."""
+        if _imu is None:
+            return
+        try:
+            raw = _imu.acc_read()
+            raw_x = float(raw[0])
+            raw_y = float(raw[1])
+        except Exception:       # pylint: disable=broad-exception-caught
+            return
+        self._integrate_accel(raw_x, raw_y, delta_ms)
+
+    def _integrate_accel(self, raw_x, raw_y, delta_ms):
+        """Filter and double-integrate an accelerometer sample into distance.
 
         The raw X and Y axes are rotated by the ``front_face`` angle so
         that the resulting value represents acceleration along the
         robot's actual forward direction — regardless of how the motors
         are mounted on the badge.
 
-        The projected value is bias-corrected (see ``_calibrate_accel``),
-        passed through a simple exponential low-pass filter to smooth out
-        motor vibration, then integrated twice:
+        The projected value is bias-corrected (see ``_calibrate_accel``)
+        and handed to the fusion filter, which smooths it and integrates it
+        twice (gated by the gyro, see fusion.py):
 
             acceleration → velocity → distance
 
         Only the absolute magnitude of displacement is accumulated so the
         result works for both forward and backward drives.
         """
-        if _imu is None:
-            return
-        try:
-            raw = _imu.acc_read()
-            raw_x = float(raw[0])
-            raw_y = float(raw[1])
-        except Exception:       # pylint: disable=broad-exception-caught
-            return
-
-        dt = delta_ms / 1000.0  # seconds
-
         # Remove per-axis bias (gravity component + sensor offset at rest)
         cx = raw_x - self._accel_bias_x
         cy = raw_y - self._accel_bias_y
@@ -830,21 +1244,12 @@ class MotorController:
         # Project onto the robot's forward direction using front_face angle.
         # This is the dot product of (cx, cy) with the forward unit vector
         # (cos(theta), sin(theta)), NOT a coordinate rotation.
-        theta = self._get_front_angle_rad()
-        fwd_accel = cx * cos(theta) + cy * sin(theta)
-
-        # Exponential low-pass filter to suppress vibration
-        alpha = self._accel_lpf_alpha
-        self._accel_filtered = alpha * fwd_accel + (1.0 - alpha) * self._accel_filtered
-
-        # Deadband — treat very small readings as zero (noise)
-        if abs(self._accel_filtered) < self._accel_deadband:
-            self.accel_mps2 = 0.0
-        else:
-            self.accel_mps2 = self._accel_filtered
-
-        # Integrate acceleration → velocity (m/s)
-        self.velocity_mps += self.accel_mps2 * dt
-
-        # Integrate velocity → distance (m), accumulate absolute displacement
-        self.distance_m += abs(self.velocity_mps) * dt
+        # The unit vector is worked out once per command by _begin_command().
+        fwd_accel = cx * self._fwd_cos + cy * self._fwd_sin
+
+        fusion = self._fusion
+        fusion.driving = self.motor_output != _STOPPED
+        fusion.update_accel(fwd_accel, delta_ms)
+        self.accel_mps2 = fusion.accel_mps2
+        self.velocity_mps = fusion.velocity_mps
+        self.distance_m = fusion.distance_m
@@ -1,7 +1,9 @@
 """ Motor Moves Module for BadgeBot """
 #
 # Handles the "turtle/Logo" style motor-move programming.
-# Internally manages its own sub-states (HELP, RECEIVE_INSTR, RUN, DONE).
+# Internally manages its own sub-states (HELP, RECEIVE_INSTR, RUN, DONE,
+# LIBRARY).  Programs can be saved to and loaded from a small library of
+# slots in flash (see program_store.py).
 #
 # The countdown state (STATE_COUNTDOWN) is shared with PID AutoTune and
 # remains in the main app.  When the countdown finishes it calls
@@ -25,6 +27,8 @@ from events.input import BUTTON_TYPES, Button
 from app_components.tokens import label_font_size, button_labels
 from app_components.notification import Notification
 from .utils import chain
+from .motion_profile import PROFILE_TRAPEZOID, PROFILE_SCURVE, PROFILE_LABELS, PowerPlan
+from .program_store import encode_program, decode_program, optimise_program, ProgramLibrary
 from .app import (STATE_COUNTDOWN, STATE_MOTOR_MOVES, STATE_LOGO, DEFAULT_BACKGROUND_UPDATE_PERIOD, MOTOR_PWM_FREQ)
 
 # Screen positioning for movement sequence text
@@ -60,23 +64,46 @@ DRIVE_MODE_DISTANCE = 1     # exposed for use in autodrive.py
 _DEFAULT_DRIVE_MODE  = DRIVE_MODE_DISTANCE
 _DRIVE_MODE_LABELS = ("Time", "Distance")
 
+# Wheel encoders (PCNT quadrature, on the HS pins of a hexpansion port:
+# HS0/HS1 = left phase A/B, HS2/HS3 = right phase A/B). Port 0 = no encoders.
+_DEFAULT_ENC_PORT        = 0
+_MAX_ENC_PORT            = 6
+_DEFAULT_ENC_COUNTS_10MM = 40
+_MIN_ENC_COUNTS_10MM     = 1
+_MAX_ENC_COUNTS_10MM     = 2000
+_DEFAULT_ENC_TRACK_MM    = 80
+_MIN_ENC_TRACK_MM        = 20
+_MAX_ENC_TRACK_MM        = 300
+_ENC_DIRECTION_LABELS    = ("Normal", "Reverse")
+
+# Learned extra angle after a gyro turn is stopped (see coast_model.py),
+# updated by MotorController after each turn.
+_DEFAULT_COAST_MS        = 0
+_MIN_COAST_MS            = -200
+_MAX_COAST_MS            = 500
+_MAX_COAST_OFFSET        = 100     # tenths of a degree
+
 
 # Local sub-states (internal to Motor Moves)
 _SUB_HELP          = 0
 _SUB_RECEIVE_INSTR = 1
 _SUB_RUN           = 2
 _SUB_DONE          = 3
+_SUB_LIBRARY       = 4
+
+# Directions in the order of their program_store direction codes
+_DIRECTIONS = (BUTTON_TYPES["UP"], BUTTON_TYPES["DOWN"], BUTTON_TYPES["LEFT"], BUTTON_TYPES["RIGHT"])
 
 
 # ---- Instruction class -----------------------------------------------------
 
 class Instruction:
     """Represents a single movement instruction, consisting of a direction (button press) and duration (number of ticks).
-    Also contains the power plan for this instruction, which is a list of (power_tuple)"""
-    def __init__(self, press_type: Button) -> None:
+    Also contains the power plan for this instruction (see motion_profile.PowerPlan)."""
+    def __init__(self, press_type: Button, duration: int = 1) -> None:
         self._press_type = press_type
-        self._duration = 1
-        self.power_plan: list[tuple[tuple[int, int], int]] = []
+        self._duration = duration
+        self.power_plan: PowerPlan | tuple = ()
 
     @property
     def press_type(self) -> Button:
@@ -88,9 +115,9 @@ class Instruction:
         """The duration (number of ticks) for this instruction."""
         return self._duration
 
-    def inc(self):
-        """Increment the duration of this instruction by one tick."""
-        self._duration += 1
+    def inc(self, count: int = 1):
+        """Increment the duration of this instruction by *count* ticks."""
+        self._duration += count
 
 
     def __str__(self):
@@ -129,33 +156,14 @@ class Instruction:
 
 
     def make_power_plan(self, mysettings):
-        """Convert the instruction's duration and direction into a power plan, which is a list of (power_tuple, duration) pairs."""
-        curr_power = 0
-        ramp_up = []
+        """Convert the instruction's duration and direction into a power plan, which yields (power_tuple, duration) pairs
+        as it is run rather than holding them all."""
         _d = self._duration * self.directional_duration(mysettings)
         _a = _ACCELERATION_SCALE_FACTOR * (mysettings['acceleration'].v if 'acceleration' in mysettings else _DEFAULT_ACCELERATION)
         _m = _POWER_SCALE_FACTOR * (mysettings['max_power'].v if 'max_power' in mysettings else DEFAULT_MAX_POWER)
-        max_ramp_up_ticks = (_d // (2 * _TICK_MS)) - 1
-        for _ in range(max_ramp_up_ticks):
-            curr_power += _a
-            if curr_power >= _m:
-                curr_power = _m
-                break
-            else:
-                ramp_up.append((self.directional_power_tuple(curr_power), _TICK_MS))
-        power_durations = ramp_up.copy()
-        # period of constant power after ramp-up, before ramp-down
-        user_power_duration = _d - (2 * len(ramp_up) * _TICK_MS)
-        if user_power_duration > 0:
-            power_durations.append((self.directional_power_tuple(curr_power), user_power_duration))
-        ramp_down = ramp_up.copy()
-        ramp_down.reverse()
-        power_durations.extend(ramp_down)
-        power_durations.append(((0, 0), _TICK_MS))  # ensure we end with motors off
+        self.power_plan = PowerPlan(self.directional_power_tuple(1), _d, _a, _m, _TICK_MS)
         if mysettings['logging'].v:
-            print("Power durations:")
-            print(power_durations)
-        self.power_plan = power_durations
+            print(f"Power plan: {self.power_plan}")
 
 
 # ---- Settings initialisation -----------------------------------------------
@@ -167,6 +175,14 @@ def init_settings(s, MySetting: type):  #pylint: disable=invalid-name
     s['drive_step_ms'] = MySetting(s, _DEFAULT_USER_DRIVE_MS, _MIN_USER_DRIVE_MS, _MAX_USER_DRIVE_MS)
     s['turn_step_ms']  = MySetting(s, _DEFAULT_USER_TURN_MS,  _MIN_USER_TURN_MS,  _MAX_USER_TURN_MS)
     s['drive_mode']    = MySetting(s, _DEFAULT_DRIVE_MODE, DRIVE_MODE_TIME, DRIVE_MODE_DISTANCE, labels=_DRIVE_MODE_LABELS)
+    s['motion_profile'] = MySetting(s, PROFILE_TRAPEZOID, PROFILE_TRAPEZOID, PROFILE_SCURVE, labels=PROFILE_LABELS)
+    s['enc_port']      = MySetting(s, _DEFAULT_ENC_PORT, 0, _MAX_ENC_PORT)
+    s['enc_counts']    = MySetting(s, _DEFAULT_ENC_COUNTS_10MM, _MIN_ENC_COUNTS_10MM, _MAX_ENC_COUNTS_10MM)
+    s['enc_track_mm']  = MySetting(s, _DEFAULT_ENC_TRACK_MM, _MIN_ENC_TRACK_MM, _MAX_ENC_TRACK_MM)
+    s['enc1_dir']      = MySetting(s, 0, 0, 1, labels=_ENC_DIRECTION_LABELS)
+    s['enc2_dir']      = MySetting(s, 0, 0, 1, labels=_ENC_DIRECTION_LABELS)
+    s['coast_ms']      = MySetting(s, _DEFAULT_COAST_MS, _MIN_COAST_MS, _MAX_COAST_MS)
+    s['coast_offset']  = MySetting(s, 0, -_MAX_COAST_OFFSET, _MAX_COAST_OFFSET)
 
 
 # ---- Motor Moves manager ---------------------------------------------------
@@ -187,6 +203,12 @@ class MotorMovesMgr:
         self._prev_state: int = _SUB_HELP
         # Motor-moves instance variables
         self.instructions: list[Instruction] = []
+        self.program: list[Instruction] = []      # optimised copy of the instructions, as run
+        self.loaded_program: bytes | None = None  # encoded program loaded from the library, unpacked when run or edited
+        self.library = ProgramLibrary("/" + __file__.rsplit("/", 1)[0])
+        self._library_slot: int = 0
+        self._library_sizes: list[int] = []
+        self.eta_ms: int = 0                      # run time of the program
         self.current_instruction: Instruction | None = None
         self.current_power_duration: tuple[tuple[int, int], int] = ((0, 0), 0)
         self.power_plan_iter = None
@@ -250,12 +272,12 @@ class MotorMovesMgr:
             )
         else:
             # Fallback: old power-plan iterator
-            self.power_plan_iter = chain(*(instr.power_plan for instr in self.instructions))
+            self.power_plan_iter = chain(*(instr.power_plan for instr in self.program))
             if self.logging:
-                print(f"M:Beginning motor moves with power plan iterator based on {len(self.instructions)} instructions")
+                print(f"M:Beginning motor moves with power plan iterator based on {len(self.program)} instructions")
             if 0 < len(app.hexdrive_apps):
-                if app.hexdrive_apps[0].initialise() and app.hexdrive_apps[0].set_power(True) and app.hexdrive_apps[0].set_freq(MOTOR_PWM_FREQ):
-                    app.hexdrive_apps[0].set_logging(False)
+                if app.hexdrive.initialise() and app.hexdrive.set_power(True) and app.hexdrive.set_freq(MOTOR_PWM_FREQ):
+                    app.hexdrive.set_logging(False)
                 else:
                     if self.logging:
                         print("H:Failed to initialise HexDrive for motor moves")
@@ -272,7 +294,7 @@ class MotorMovesMgr:
         Runs as an asyncio task spawned from begin_moves; the background_update
         loop monitors the task and transitions to _SUB_DONE when it completes."""
         try:
-            await self._app.motor_controller.run_instructions(self.instructions)
+            await self._app.motor_controller.run_instructions(self.program)
         except asyncio.CancelledError:
             self._app.motor_controller.stop()
             return
@@ -296,6 +318,8 @@ class MotorMovesMgr:
             self._update_state_run(delta)
         elif self._sub_state == _SUB_DONE:
             self._update_state_done(delta)
+        elif self._sub_state == _SUB_LIBRARY:
+            self._update_state_library(delta)
 
         if self._sub_state != self._prev_state:
             if self.logging:
@@ -342,6 +366,7 @@ class MotorMovesMgr:
             app.return_to_menu()
         elif app.button_states.get(BUTTON_TYPES["CONFIRM"]):
             app.button_states.clear()
+            self._unpack_loaded_program()
             app.scroll(False)
             app.scroll_mode_enable(True)
             self._sub_state = _SUB_RECEIVE_INSTR
@@ -349,11 +374,17 @@ class MotorMovesMgr:
         elif app.button_states.get(BUTTON_TYPES["DOWN"]):
             # reset the instructions list on DOWN press in the help screen, for convenience
             app.button_states.clear()
-            if 0 < len(self.instructions) or self.current_instruction is not None:
+            if 0 < len(self.instructions) or self.current_instruction is not None or self.loaded_program is not None:
                 self.instructions = []
                 self.current_instruction = None
+                self.loaded_program = None
                 # Notification that list cleared
                 app.notification = Notification("Instructions Cleared")
+        elif app.button_states.get(BUTTON_TYPES["UP"]):
+            app.button_states.clear()
+            self._library_sizes = [self.library.size(slot) for slot in range(self.library.slots)]
+            self._sub_state = _SUB_LIBRARY
+            app.refresh = True
         else:
             app.animation_counter += delta
             if app.animation_counter > 10000:
@@ -375,7 +406,7 @@ class MotorMovesMgr:
                 #    self._sub_state = _SUB_HELP
                 #    return
                 # if there are No instructions then warn the user and return to help, otherwise start the countdown to run the instructions
-                if len(self.instructions) == 0 and self.current_instruction is None:
+                if len(self.instructions) == 0 and self.current_instruction is None and self.loaded_program is None:
                     if self.logging:
                         print("No instructions entered, returning to HELP")
                     app.notification = Notification("No instructions entered")
@@ -384,6 +415,7 @@ class MotorMovesMgr:
                     self._sub_state = _SUB_HELP
                     return
                 self.finalize_instruction()
+                self.compile_program()
                 app.countdown_next_state = STATE_MOTOR_MOVES
                 app.run_countdown_elapsed_ms = 0
                 app.current_state = STATE_COUNTDOWN
@@ -444,12 +476,69 @@ class MotorMovesMgr:
             app.button_states.clear()
             app.run_countdown_elapsed_ms = 1
             self.current_power_duration = ((0, 0), 0)
+            self.compile_program()
             app.countdown_next_state = STATE_MOTOR_MOVES
             app.current_state = STATE_COUNTDOWN
             app.refresh = True
             # at end of countdown begin_moves will be called, which will start the sequence running again
 
 
+    def _update_state_library(self, delta: int) -> None:     # pylint: disable=unused-argument
+        app = self._app
+        library = self.library
+        slot = self._library_slot
+        if app.button_states.get(BUTTON_TYPES["CANCEL"]):
+            app.button_states.clear()
+            self._sub_state = _SUB_HELP
+            app.refresh = True
+        elif app.button_states.get(BUTTON_TYPES["LEFT"]) or app.button_states.get(BUTTON_TYPES["RIGHT"]):
+            step = 1 if app.button_states.get(BUTTON_TYPES["RIGHT"]) else -1
+            app.button_states.clear()
+            self._library_slot = (slot + step) % library.slots
+            app.refresh = True
+        elif app.button_states.get(BUTTON_TYPES["UP"]):
+            # Save the current program into the selected slot
+            app.button_states.clear()
+            self.finalize_instruction()
+            if self.loaded_program is not None:
+                data = self.loaded_program
+            else:
+                data = encode_program((_DIRECTIONS.index(instr.press_type), instr.duration) for instr in self.instructions)
+            if len(data) == 0:
+                app.notification = Notification("Nothing to save")
+                return
+            try:
+                library.save(slot, data)
+                self._library_sizes[slot] = len(data)
+                app.notification = Notification(f"Saved to slot {slot + 1}")
+            except OSError as e:
+                print(f"M:Failed to save program: {e}")
+                app.notification = Notification("Save failed")
+            app.refresh = True
+        elif app.button_states.get(BUTTON_TYPES["DOWN"]) or app.button_states.get(BUTTON_TYPES["CONFIRM"]):
+            # Load the selected slot (and with CONFIRM, run it straight away)
+            run = app.button_states.get(BUTTON_TYPES["CONFIRM"])
+            app.button_states.clear()
+            data = library.load(slot)
+            if not data:
+                app.notification = Notification(f"Slot {slot + 1} empty")
+                return
+            self.loaded_program = data
+            self.instructions = []
+            self.current_instruction = None
+            if self.logging:
+                print(f"M:Loaded {len(data)} byte program from slot {slot}")
+            if run:
+                self.compile_program()
+                app.countdown_next_state = STATE_MOTOR_MOVES
+                app.run_countdown_elapsed_ms = 0
+                app.current_state = STATE_COUNTDOWN
+            else:
+                app.notification = Notification(f"Loaded slot {slot + 1}")
+                self._sub_state = _SUB_HELP
+            app.refresh = True
+
+
     # ------------------------------------------------------------------
     # Instruction helpers
     # ------------------------------------------------------------------
@@ -465,11 +554,42 @@ class MotorMovesMgr:
         app.last_press = press_type
 
 
+    def compile_program(self):
+        """Optimise the recorded instructions into the program to run (see
+        program_store.optimise_program), plan its power levels with the current
+        settings and show its run time on the countdown.
+
+        The ETA is the sum of the power plans' total_ms, so it is exact for the
+        power-plan runner but only an estimate when the program is run by the
+        MotorController, whose moves end on the sensors rather than on time.
+        """
+        app = self._app
+        if self.loaded_program is not None:
+            steps = decode_program(self.loaded_program)
+        else:
+            steps = ((_DIRECTIONS.index(instr.press_type), instr.duration) for instr in self.instructions)
+        self.program = [Instruction(_DIRECTIONS[direction], count) for direction, count in optimise_program(steps)]
+        eta_ms = 0
+        for instr in self.program:
+            instr.make_power_plan(app.settings)
+            eta_ms += instr.power_plan.total_ms
+        self.eta_ms = eta_ms
+        app.countdown_message = f"ETA {eta_ms // 1000}.{(eta_ms % 1000) // 100}s"
+        if self.logging:
+            print(f"M:Program optimised to {len(self.program)} instructions, ETA {eta_ms} ms")
+
+
+    def _unpack_loaded_program(self):
+        """Turn a program loaded from the library into instructions, so it can be edited."""
+        if self.loaded_program is not None:
+            self.instructions = [Instruction(_DIRECTIONS[direction], count)
+                                 for direction, count in decode_program(self.loaded_program)]
+            self.loaded_program = None
+
+
     def finalize_instruction(self):
         """Finalize the current instruction (if any) and add it to the list."""
-        app = self._app
         if self.current_instruction is not None:
-            self.current_instruction.make_power_plan(app.settings)
             self.instructions.append(self.current_instruction)
             self.current_instruction = None
 
@@ -491,13 +611,14 @@ class MotorMovesMgr:
         if self.logging:
             print("Robot reset")
         if len(app.hexdrive_apps) > 0:
-            range_app = app.hexdrive_apps[0]
+            range_app = app.hexdrive
             range_app.set_power(False)
 
     def reset_instructions(self):
         """Reset the instruction list and related state."""
         self.instructions = []
         self.current_instruction = None
+        self.loaded_program = None
         self.power_plan_iter = None
         self._app.scroll(False)
         if self.logging:
@@ -551,7 +672,7 @@ class MotorMovesMgr:
         app = self._app
         if self._sub_state == _SUB_HELP:
             app.draw_message(ctx, ["BadgeBot", "To program:", "Press C", "When finished:", "Long press C"], [(1, 1, 0), (1, 1, 0), (0, 1, 0), (1, 1, 0), (0, 1, 0)], label_font_size)
-            button_labels(ctx, down_label="Clear", confirm_label="Program", cancel_label="Back")
+            button_labels(ctx, up_label="Library", down_label="Clear", confirm_label="Program", cancel_label="Back")
         elif self._sub_state == _SUB_RECEIVE_INSTR:
             self._draw_receive_instr(ctx)
         elif self._sub_state == _SUB_RUN:
@@ -563,6 +684,13 @@ class MotorMovesMgr:
         elif self._sub_state == _SUB_DONE:
             app.draw_message(ctx, ["Program", "complete!"], [(0, 1, 0), (0, 1, 0)], label_font_size)
             button_labels(ctx, confirm_label="Replay", cancel_label="Restart")
+        elif self._sub_state == _SUB_LIBRARY:
+            slot = self._library_slot
+            size = self._library_sizes[slot] if slot < len(self._library_sizes) else -1
+            app.draw_message(ctx, ["Library", f"Slot {slot + 1}", "empty" if size < 0 else f"{size} bytes"],
+                             [(1, 1, 0), (0, 1, 1), (1, 1, 1)], label_font_size)
+            button_labels(ctx, up_label="Save", down_label="Load", left_label="<", right_label=">",
+                          confirm_label="Run", cancel_label="Back")
         return True
 
 
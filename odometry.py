@@ -0,0 +1,131 @@
+# Wheel Odometry Module for BadgeBot
+#
+# Turns the counts from two quadrature wheel encoders (see pcnt.py) into
+# per-wheel distance and velocity, distance travelled and heading change,
+# so MotorController can close the loop on the wheels themselves instead
+# of dead-reckoning from the accelerometer.
+#
+# The quadrature encoders count up or down with the way each wheel turns,
+# so the signed count is the wheel's travel, including any coast through a
+# reversal.  An encoder wired (or mounted) the other way round is corrected
+# by its reversed flag, as the motors are by their direction settings.
+# Travel is signed with forward positive: a straight move is the mean of the
+# two wheels, and a turn is the difference between the wheels' arcs divided
+# by the track width (clockwise positive).
+#
+# Public interface:
+#   WheelOdometry(left, right, counts_per_10mm, track_mm, left_reversed, right_reversed)
+#     reset()                    – zero distances and velocities
+#     update(dt_ms)              – read both encoders
+#     left_mm, right_mm          – signed travel of each wheel (mm)
+#     left_mmps, right_mmps      – filtered signed speed of each wheel (mm/s)
+#     distance_mm, heading_deg   – straight-line distance / heading change (CW positive)
+#     velocity_mmps, rate_dps    – their rates
+#     stop_distance_mm(ramp_ms) / stop_heading_deg(ramp_ms) – predicted value once stopped
+#     deinit()                   – release the encoders
+
+from math import degrees
+
+_VELOCITY_LPF_ALPHA = 0.5           # smoothing of the per-wheel speeds (0-1, higher = faster response)
+
+
+class WheelOdometry:
+    """Wheel odometry from a pair of encoders.
+
+    Parameters
+    ----------
+    left, right : Encoder
+        Encoders with a ``value()`` method returning the accumulated count.
+    counts_per_10mm : int
+        Encoder counts for 10 mm of wheel travel.
+    track_mm : int
+        Distance between the wheel contact points (mm).
+    left_reversed, right_reversed : bool
+        Whether the encoder counts down as its wheel turns forwards.
+    """
+    __slots__ = ("_left", "_right", "_left_mm_per_count", "_right_mm_per_count", "_track_mm",
+                 "_last_left", "_last_right", "left_mm", "right_mm", "left_mmps", "right_mmps")
+
+    def __init__(self, left, right, counts_per_10mm: int, track_mm: int,
+                 left_reversed: bool = False, right_reversed: bool = False):
+        self._left = left
+        self._right = right
+        mm_per_count = 10.0 / max(1, counts_per_10mm)
+        self._left_mm_per_count: float = -mm_per_count if left_reversed else mm_per_count
+        self._right_mm_per_count: float = -mm_per_count if right_reversed else mm_per_count
+        self._track_mm: float = float(max(1, track_mm))
+        self._last_left: int = 0
+        self._last_right: int = 0
+        self.left_mm: float = 0.0
+        self.right_mm: float = 0.0
+        self.left_mmps: float = 0.0
+        self.right_mmps: float = 0.0
+        self.reset()
+
+
+    def reset(self):
+        """Zero the accumulated distances and speeds."""
+        self._last_left = self._left.value()
+        self._last_right = self._right.value()
+        self.left_mm = 0.0
+        self.right_mm = 0.0
+        self.left_mmps = 0.0
+        self.right_mmps = 0.0
+
+
+    def update(self, dt_ms: int):
+        """Read both encoders and accumulate the travel since the last update."""
+        left = self._left.value()
+        right = self._right.value()
+        d_left = (left - self._last_left) * self._left_mm_per_count
+        d_right = (right - self._last_right) * self._right_mm_per_count
+        self._last_left = left
+        self._last_right = right
+        self.left_mm += d_left
+        self.right_mm += d_right
+        if dt_ms > 0:
+            alpha = _VELOCITY_LPF_ALPHA
+            self.left_mmps += alpha * (d_left * 1000.0 / dt_ms - self.left_mmps)
+            self.right_mmps += alpha * (d_right * 1000.0 / dt_ms - self.right_mmps)
+
+
+    @property
+    def distance_mm(self) -> float:
+        """Distance travelled by the middle of the axle on a straight move."""
+        return (self.left_mm + self.right_mm) * 0.5
+
+
+    @property
+    def heading_deg(self) -> float:
+        """Heading change, clockwise positive."""
+        return degrees((self.left_mm - self.right_mm) / self._track_mm)
+
+
+    @property
+    def velocity_mmps(self) -> float:
+        """Speed of the middle of the axle on a straight move."""
+        return (self.left_mmps + self.right_mmps) * 0.5
+
+
+    @property
+    def rate_dps(self) -> float:
+        """Turn rate, clockwise positive."""
+        return degrees((self.left_mmps - self.right_mmps) / self._track_mm)
+
+
+    def stop_distance_mm(self, ramp_ms: int) -> float:
+        """Predicted distance if the motors ramp to zero over *ramp_ms* starting now."""
+        return self.distance_mm + self.velocity_mmps * ramp_ms / 2000.0
+
+
+    def stop_heading_deg(self, ramp_ms: int) -> float:
+        """Predicted heading change if the motors ramp to zero over *ramp_ms* starting now."""
+        return self.heading_deg + self.rate_dps * ramp_ms / 2000.0
+
+
+    def deinit(self):
+        """Release both encoders."""
+        for encoder in (self._left, self._right):
+            deinit = getattr(encoder, "deinit", None)
+            if deinit is not None:
+                deinit()
@@ -0,0 +1,126 @@
+# Output Arbiter Module for BadgeBot
+#
+# Several things want to drive the motors: the BLE control pad, the active
+# functional area manager (via its background_update output) and the
+# MotorController's own control loops.  Instead of each of them writing to
+# the HexDrive whenever it likes, they submit their request here and the
+# background loop resolves all of the requests once per tick, so exactly one
+# set_motors call is made per tick and the time from a request to the motors
+# is at most one tick.
+#
+# Sources, highest priority first:
+#   SOURCE_SAFETY     – emergency stop (BLE Stop button)
+#   SOURCE_BLE        – BLE direction buttons
+#   SOURCE_MANAGER    – the active manager's background_update output
+#   SOURCE_CONTROLLER – MotorController
+#
+# A request normally lasts for a single tick, and is submitted again on every
+# tick it is still wanted.  A request submitted with hold=True stays in place
+# until it is replaced or released, for sources which don't run in step with
+# the background loop.  When the source that was driving the motors goes away
+# and nothing else is requesting an output, the motors are stopped once -
+# except after the manager, where no output has always meant "leave the
+# motors as they are".
+#
+# Whenever a lower-priority source asks for something different from the
+# winning request it is counted as a conflict against that source.
+#
+# Public interface:
+#   OutputArbiter()
+#     submit(source, output, hold)  – request an output for the next tick
+#     release(source)               – withdraw a held request
+#     resolve()                     – output to send this tick, or None
+#     owner, owner_name             – source that won the last tick (or None)
+#     conflicts, overridden[source] – conflict counts, total and per source
+#     report()                      – one-line summary of the counters
+
+from array import array
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+SOURCE_SAFETY     = const(0)
+SOURCE_BLE        = const(1)
+SOURCE_MANAGER    = const(2)
+SOURCE_CONTROLLER = const(3)
+_NUM_SOURCES      = const(4)
+
+SOURCE_NAMES = ("safety", "ble", "manager", "controller")
+
+# sources whose motors are stopped when they stop asking for an output
+_STOP_ON_RELEASE = const((1 << SOURCE_SAFETY) | (1 << SOURCE_BLE) | (1 << SOURCE_CONTROLLER))
+
+_STOPPED = (0, 0)
+
+
+class OutputArbiter:
+    """Chooses the single motor output to send each tick from prioritised sources."""
+    __slots__ = ("_requests", "_held", "owner", "ticks", "conflicts", "overridden")
+
+    def __init__(self):
+        self._requests: list = [None] * _NUM_SOURCES
+        self._held: int = 0                 # bit per source whose request persists between ticks
+        self.owner: int | None = None
+        self.ticks: int = 0
+        self.conflicts: int = 0
+        self.overridden = array("I", [0] * _NUM_SOURCES)
+
+
+    @property
+    def owner_name(self) -> str:
+        """Name of the source that won the last tick, or "none"."""
+        return "none" if self.owner is None else SOURCE_NAMES[self.owner]
+
+
+    def submit(self, source: int, output: tuple, hold: bool = False):
+        """Request *output* from *source* for the next tick (or until released, if *hold*)."""
+        self._requests[source] = output
+        if hold:
+            self._held |= 1 << source
+        else:
+            self._held &= ~(1 << source)
+
+
+    def release(self, source: int):
+        """Withdraw any request from *source*."""
+        self._requests[source] = None
+        self._held &= ~(1 << source)
+
+
+    def resolve(self) -> tuple | None:
+        """Choose this tick's output and clear the single-tick requests.
+
+        Returns the output to send, or None if nothing needs sending.
+        """
+        requests = self._requests
+        self.ticks += 1
+        winner = None
+        output = None
+        for source in range(_NUM_SOURCES):
+            request = requests[source]
+            if request is None:
+                continue
+            if winner is None:
+                winner = source
+                output = request
+            elif request != output:
+                self.conflicts += 1
+                self.overridden[source] += 1
+        previous = self.owner
+        self.owner = winner
+        if winner is None and previous is not None and (_STOP_ON_RELEASE >> previous) & 1:
+            output = _STOPPED
+        held = self._held
+        for source in range(_NUM_SOURCES):
+            if not (held >> source) & 1:
+                requests[source] = None
+        return output
+
+
+    def report(self) -> str:
+        """One-line summary of the arbitration counters."""
+        overridden = " ".join(f"{SOURCE_NAMES[s]}={self.overridden[s]}" for s in range(_NUM_SOURCES) if self.overridden[s])
+        return f"owner={self.owner_name} ticks={self.ticks} conflicts={self.conflicts} {overridden}".rstrip()
@@ -0,0 +1,566 @@
+"""PCNT Module for BadgeBot"""
+#
+# Drivers for the ESP32-S3 PCNT (pulse counter) peripheral, driven directly
+# through its registers: a rising-edge Counter and a 4x quadrature Encoder.
+# Used for wheel odometry (see odometry.py) and by the sensor test.
+#
+# Public interface:
+#   Counter(unit, src, filter_ns)                    – count rising edges on a GPIO
+#   Encoder(unit, phase_a, phase_b, filter_ns, ...)  – quadrature position
+#     value(value=None) – read (and with value(0) reset) the count/position
+#     deinit()          – release the PCNT unit
+#   hs_pin_gpio(port, pin) – ESP32-S3 GPIO number of a hexpansion HS pin
+
+try:
+    from machine import mem32, disable_irq, enable_irq
+except ImportError:
+    class _Mem32Shim:
+        def __getitem__(self, _addr: int) -> int:
+            return 0
+
+        def __setitem__(self, _addr: int, _value: int) -> None:
+            return None
+
+    # Simulator fallback: keep imports working even when direct register access
+    # and IRQ controls are not exposed by the simulated machine module.
+    mem32 = _Mem32Shim()
+
+    def disable_irq() -> int:
+        """Disable interrupts and return previous state (if supported)."""
+        # No-op in simulator fallback.
+        return 0
+
+    def enable_irq(_state: int) -> None:
+        """Restore interrupts to the given state (if supported)."""
+        # No-op in simulator fallback.
+        _ = _state
+        return None
+
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    # on MicroPython; replicate that so module-level const() calls work.
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+
+#------------------------------------------------------------------
+# ESP32S3 PCNT (Pulse Counter) hardware register definitions and bit masks
+# Supports all 4 PCNT units (0-3) on the ESP32-S3.
+#-------------------------------------------------------------------
+
+_SYSTEM_BASE      = const(0x600C0000)
+_GPIO_BASE        = const(0x60004000)
+_PCNT_BASE        = const(0x60017000)
+
+_PCNT_NUM_UNITS   = 4   # ESP32-S3 has 4 PCNT units
+
+_PCNT_CLK_BIT     = const(1 << 10)  # SYSTEM_PCNT_CLK_EN / SYSTEM_PCNT_RST (bit 10)
+
+# System/Clock registers
+_CLK_EN0_REG      = const(_SYSTEM_BASE + 0x0018)
+_RST_EN0_REG      = const(_SYSTEM_BASE + 0x0020)
+
+# GPIO Matrix Base
+_GPIO_FUNC_IN_SEL_CFG_BASE = const(_GPIO_BASE + 0x0154)
+_SIG_IN_SEL_BIT   = const(1 << 6) # Enable routing via GPIO Matrix
+
+# PCNT register offsets (per-unit, relative to _PCNT_BASE)
+#   CONF0: _PCNT_BASE + unit * 0x0C
+#   CONF1: _PCNT_BASE + unit * 0x0C + 0x04
+#   CONF2: _PCNT_BASE + unit * 0x0C + 0x08
+#   CNT:   _PCNT_BASE + 0x30 + unit * 4
+#   STATUS:_PCNT_BASE + 0x50 + unit * 4
+_PCNT_CTRL_REG    = const(_PCNT_BASE + 0x0060)
+
+# _PCNT_CTRL_REG bits — per-unit reset and pause at (unit * 2) and (unit * 2 + 1)
+_PCNT_CTRL_CLK_EN = const(1 << 16)  # Register clock gate — must be 1 for register access
+
+# CONF0 bit layout (same layout for all units)
+_CONF0_FILTER_THRES_M  = const(0x3FF)   # bits [9:0]
+_CONF0_FILTER_EN       = const(1 << 10)
+
+# GPIO signal index base for PCNT: Unit N, CH0 pulse = 33 + N*4, CH0 ctrl = 35 + N*4
+_PCNT_SIG_BASE    = 33
+
+# APB clock frequency for filter calculation (Hz)
+_APB_CLK_HZ       = const(80_000_000)
+
+# Badge hexpansion HS pin to ESP32-S3 GPIO number mapping
+# HexpansionConfig(port).pin[i] is Pin(gpio) where gpio = _HS_PIN_TO_GPIO[port][i]
+_HS_PIN_TO_GPIO = {
+    1: (39, 40, 41, 42),
+    2: (35, 36, 37, 38),
+    3: (34, 33, 47, 48),
+    4: (11, 14, 13, 12),
+    5: (18, 16, 15, 17),
+    6: ( 3,  4,  5,  6),
+}
+
+# Reverse lookup: GPIO number -> (port, pin_index) for diagnostics
+_GPIO_TO_HS = {}
+for _port, _gpios in _HS_PIN_TO_GPIO.items():
+    for _idx, _gpio in enumerate(_gpios):
+        _GPIO_TO_HS[_gpio] = (_port, _idx)
+
+
+def hs_pin_gpio(port: int, pin: int) -> int | None:
+    """Return the ESP32-S3 GPIO number of HS pin *pin* (0-3) on hexpansion *port* (1-6)."""
+    gpios = _HS_PIN_TO_GPIO.get(port)
+    if gpios is None or not 0 <= pin < len(gpios):
+        return None
+    return gpios[pin]
+
+
+_PCNT_UNIT_STRIDE = const(0x0C)
+_PCNT_CONF1_OFFSET = const(0x04)
+_PCNT_CONF2_OFFSET = const(0x08)
+_PCNT_CNT_OFFSET = const(0x30)
+
+_CONF0_CH0_NEG_MODE_S = const(16)
+_CONF0_CH0_POS_MODE_S = const(18)
+_CONF0_CH0_HCTRL_MODE_S = const(20)
+_CONF0_CH0_LCTRL_MODE_S = const(22)
+_CONF0_CH1_NEG_MODE_S = const(24)
+_CONF0_CH1_POS_MODE_S = const(26)
+_CONF0_CH1_HCTRL_MODE_S = const(28)
+_CONF0_CH1_LCTRL_MODE_S = const(30)
+
+_PCNT_COUNT_DISABLE = const(0)
+_PCNT_COUNT_INCREMENT = const(1)
+_PCNT_COUNT_DECREMENT = const(2)
+
+_PCNT_CTRL_KEEP = const(0)
+_PCNT_CTRL_REVERSE = const(1)
+_PCNT_CTRL_HOLD = const(2)
+
+_PCNT_GPIO_CONST_HIGH = const(0x38)
+_PCNT_COUNTER_MASK = const(0xFFFF)
+_PCNT_COUNTER_SIGN_BIT = const(0x8000)
+_PCNT_COUNTER_MODULO = const(0x10000)
+_PCNT_COUNTER_MAX = const(0x7FFF)
+_PCNT_DEFAULT_MAX = const(0x7FFF)
+
+
+def _pcnt_conf0_addr(unit: int) -> int:
+    return _PCNT_BASE + unit * _PCNT_UNIT_STRIDE
+
+
+def _pcnt_conf1_addr(unit: int) -> int:
+    return _pcnt_conf0_addr(unit) + _PCNT_CONF1_OFFSET
+
+
+def _pcnt_conf2_addr(unit: int) -> int:
+    return _pcnt_conf0_addr(unit) + _PCNT_CONF2_OFFSET
+
+
+def _pcnt_cnt_addr(unit: int) -> int:
+    return _PCNT_BASE + _PCNT_CNT_OFFSET + unit * 4
+
+
+def _pcnt_rst_bit(unit: int) -> int:
+    return 1 << (unit * 2)
+
+
+def _pcnt_signal_index(unit: int, channel: int, control: bool = False) -> int:
+    return _PCNT_SIG_BASE + unit * 4 + channel + (2 if control else 0)
+
+
+def _pcnt_gpio_label(gpio: int) -> str:
+    hs_pin = _GPIO_TO_HS.get(gpio)
+    if hs_pin is None:
+        return f"GPIO {gpio}"
+    return f"GPIO {gpio} (port {hs_pin[0]} HS pin {hs_pin[1]})"
+
+
+def _pcnt_filter_bits(filter_ns: int | None) -> int:
+    if filter_ns is None or filter_ns <= 0:
+        return 0
+    filter_val = (_APB_CLK_HZ * filter_ns) // 1_000_000_000
+    if filter_val > 1023:
+        filter_val = 1023
+    return (filter_val & _CONF0_FILTER_THRES_M) | _CONF0_FILTER_EN
+
+
+def _pcnt_enable_peripheral() -> None:
+    mem32[_CLK_EN0_REG] |= _PCNT_CLK_BIT
+    mem32[_RST_EN0_REG] &= ~_PCNT_CLK_BIT
+
+
+def _pcnt_disable_peripheral() -> None:
+    mem32[_CLK_EN0_REG] &= ~_PCNT_CLK_BIT
+    mem32[_RST_EN0_REG] |= _PCNT_CLK_BIT
+
+
+def _pcnt_route_input(signal_index: int, gpio: int | None) -> None:
+    route = _SIG_IN_SEL_BIT | (_PCNT_GPIO_CONST_HIGH if gpio is None else gpio)
+    mem32[_GPIO_FUNC_IN_SEL_CFG_BASE + (signal_index * 4)] = route
+
+
+def _pcnt_read_count_signed(unit: int) -> int:
+    raw = mem32[_pcnt_cnt_addr(unit)] & _PCNT_COUNTER_MASK
+    if raw & _PCNT_COUNTER_SIGN_BIT:
+        return raw - _PCNT_COUNTER_MODULO
+    return raw
+
+
+def _pcnt_reset_counter(unit: int) -> None:
+    rst_bit = _pcnt_rst_bit(unit)
+    irq_state = disable_irq()
+    mem32[_PCNT_CTRL_REG] |= rst_bit
+    mem32[_PCNT_CTRL_REG] &= ~rst_bit
+    enable_irq(irq_state)
+
+
+def _pcnt_unit_in_use(unit: int, logging: bool = False) -> bool:
+    """Return True when *unit* appears to be configured and active."""
+    clk_on = (mem32[_CLK_EN0_REG] & _PCNT_CLK_BIT) != 0
+    if not clk_on:
+        if logging:
+            print(f"PCNT: unit {unit} - peripheral clock off, unit free")
+        return False
+
+    ctrl = mem32[_PCNT_CTRL_REG]
+    if not ctrl & _PCNT_CTRL_CLK_EN:
+        if logging:
+            print(f"PCNT: unit {unit} - register clock gate off, unit free")
+        return False
+
+    rst_bit = _pcnt_rst_bit(unit)
+    if ctrl & rst_bit:
+        if logging:
+            print(f"PCNT: unit {unit} - held in reset, unit free")
+        return False
+
+    conf0 = mem32[_pcnt_conf0_addr(unit)]
+    if conf0 in (0, 0x3C10):
+        if logging:
+            print(f"PCNT: unit {unit} - CONF0=0x{conf0:08X} (unconfigured), unit free")
+        return False
+
+    if logging:
+        cnt = mem32[_pcnt_cnt_addr(unit)] & _PCNT_COUNTER_MASK
+        pulse_sig = _pcnt_signal_index(unit, 0)
+        gpio_route = mem32[_GPIO_FUNC_IN_SEL_CFG_BASE + pulse_sig * 4]
+        routed_gpio = gpio_route & 0x3F
+        print(f"PCNT: unit {unit} - IN USE: CONF0=0x{conf0:08X}, count={cnt}, routed to GPIO {routed_gpio}")
+    return True
+
+
+def _pcnt_allocate_unit(unit: int | None, logging: bool = False) -> int | None:
+    if unit is not None:
+        if unit < 0 or unit >= _PCNT_NUM_UNITS:
+            if logging:
+                print(f"PCNT: unit {unit} out of range (0-{_PCNT_NUM_UNITS - 1})")
+            return None
+        if _pcnt_unit_in_use(unit, logging):
+            if logging:
+                print(f"PCNT: requested unit {unit} is already in use")
+            return None
+        if logging:
+            print(f"PCNT: using requested unit {unit}")
+        return unit
+
+    for candidate in range(_PCNT_NUM_UNITS):
+        if not _pcnt_unit_in_use(candidate, logging):
+            if logging:
+                print(f"PCNT: auto-selected unit {candidate}")
+            return candidate
+
+    if logging:
+        print("PCNT: all units in use, no free unit available")
+    return None
+
+
+def _pcnt_disable_peripheral_if_unused(logging: bool = False) -> None:
+    if any(_pcnt_unit_in_use(unit) for unit in range(_PCNT_NUM_UNITS)):
+        return
+    _pcnt_disable_peripheral()
+    if logging:
+        print("PCNT: all units released, peripheral clock disabled")
+
+
+class _PCNTUnitBase:
+    """Shared low-level PCNT unit allocation and teardown helpers."""
+    __slots__ = ("unit", "_configured", "logging")
+
+    def __init__(self, unit: int | None, logging: bool = False):
+        self.logging = logging
+        self.unit = _pcnt_allocate_unit(unit, logging)
+        self._configured = False
+
+    def _log(self, message: str) -> None:
+        if self.logging:
+            print(message)
+
+    def _begin_configuration(self) -> tuple[int, int]:
+        unit = self.unit
+        if unit is None:
+            raise ValueError("PCNT unit not available")
+
+        _pcnt_enable_peripheral()
+
+        ctrl = mem32[_PCNT_CTRL_REG]
+        ctrl |= _PCNT_CTRL_CLK_EN | _pcnt_rst_bit(unit)
+        mem32[_PCNT_CTRL_REG] = ctrl
+
+        mem32[_pcnt_conf0_addr(unit)] = 0
+        mem32[_pcnt_conf1_addr(unit)] = 0
+        mem32[_pcnt_conf2_addr(unit)] = 0
+        return _pcnt_conf0_addr(unit), _pcnt_cnt_addr(unit)
+
+    def _finish_configuration(self, conf0_addr: int, cnt_addr: int) -> None:
+        unit = self.unit
+        if unit is None:
+            raise ValueError("PCNT unit not available")
+
+        ctrl = mem32[_PCNT_CTRL_REG]
+        ctrl &= ~_pcnt_rst_bit(unit)
+        mem32[_PCNT_CTRL_REG] = ctrl
+        _pcnt_reset_counter(unit)
+        self._configured = True
+
+        self._log(
+            f"PCNT U{unit}: configured OK, CONF0=0x{mem32[conf0_addr]:08X}, "
+            f"CTRL=0x{mem32[_PCNT_CTRL_REG]:08X}, CNT={mem32[cnt_addr] & _PCNT_COUNTER_MASK}"
+        )
+
+    def deinit(self):
+        """Release the PCNT unit and make it available again."""
+        if not self._configured or self.unit is None:
+            return
+
+        unit = self.unit
+        mem32[_PCNT_CTRL_REG] |= _pcnt_rst_bit(unit)
+        mem32[_pcnt_conf0_addr(unit)] = 0
+        mem32[_pcnt_conf1_addr(unit)] = 0
+        mem32[_pcnt_conf2_addr(unit)] = 0
+        self._configured = False
+
+        self._log(f"PCNT U{unit}: released")
+        _pcnt_disable_peripheral_if_unused(self.logging)
+
+
+class Counter(_PCNTUnitBase):
+    """Wrapper around ESP32-S3 PCNT hardware for counting rising edges."""
+    __slots__ = ("pin",)
+
+    def __init__(self, unit: int | None, src: int, filter_ns: int = 0, logging: bool = False):
+        self.pin = src
+        super().__init__(unit, logging)
+        if self.unit is None:
+            return
+        if not self.init(src, filter_ns):
+            self._log(f"PCNT: failed to configure unit {self.unit}")
+            self.unit = None
+
+    def __str__(self):
+        if self.unit is None:
+            return "Counter(not configured)"
+        return f"Counter(unit={self.unit}, GPIO={self.pin}, count={self.value()})"
+
+    __repr__ = __str__
+
+    def init(self, src: int, filter_ns: int | None = None) -> bool:
+        """Configure the unit to count rising edges on *src*."""
+        unit = self.unit
+        if unit is None:
+            return False
+
+        self.pin = src
+        conf0_addr, cnt_addr = self._begin_configuration()
+        pulse_sig = _pcnt_signal_index(unit, 0)
+        ctrl_sig = _pcnt_signal_index(unit, 0, control=True)
+        aux_pulse_sig = _pcnt_signal_index(unit, 1)
+        aux_ctrl_sig = _pcnt_signal_index(unit, 1, control=True)
+
+        self._log(f"PCNT U{unit}: counter on {_pcnt_gpio_label(src)}, filter_ns={filter_ns}ns")
+
+        try:
+            _pcnt_route_input(pulse_sig, src)
+            _pcnt_route_input(ctrl_sig, None)
+            _pcnt_route_input(aux_pulse_sig, None)
+            _pcnt_route_input(aux_ctrl_sig, None)
+
+            config = _pcnt_filter_bits(filter_ns)
+            config |= _PCNT_COUNT_INCREMENT << _CONF0_CH0_POS_MODE_S
+            mem32[conf0_addr] = config
+
+            self._finish_configuration(conf0_addr, cnt_addr)
+        except Exception as exc:          # pylint: disable=broad-exception-caught
+            self._log(f"PCNT U{unit}: error configuring counter: {exc}")
+            self._configured = False
+            return False
+
+        if self.logging:
+            print(f"PCNT U{unit}: configured - CONF0=0x{mem32[conf0_addr]:08X}, CTRL=0x{mem32[_PCNT_CTRL_REG]:08X}, CNT={mem32[cnt_addr] & 0xFFFF}")
+        return True
+
+    def value(self, value: int | None = None) -> int:
+        """Return the current count, optionally read-and-reset on ``value(0)``."""
+        if not self._configured or self.unit is None:
+            return 0
+
+        count = mem32[_pcnt_cnt_addr(self.unit)] & _PCNT_COUNTER_MASK
+        if value == 0:
+            _pcnt_reset_counter(self.unit)
+        return count
+
+
+class Encoder(_PCNTUnitBase):
+    """4x quadrature encoder wrapper built on a single ESP32-S3 PCNT unit."""
+    __slots__ = ("phase_a", "phase_b", "_position", "_cycles", "_last_raw", "_range_min", "_range_max", "_range_enabled")
+
+    def __init__(
+        self,
+        unit: int | None,
+        phase_a: int,
+        phase_b: int,
+        filter_ns: int = 0,
+        max_count: int | None = None,
+        min_count: int = 0,
+        logging: bool = False,
+    ):
+        self.phase_a = phase_a
+        self.phase_b = phase_b
+        self._position = 0
+        self._cycles = 0
+        self._last_raw = 0
+        self._range_min = 0
+        self._range_max = 0
+        self._range_enabled = False
+        super().__init__(unit, logging)
+        if self.unit is None:
+            return
+        if not self.init(phase_a, phase_b, filter_ns=filter_ns, max_count=max_count, min_count=min_count):
+            self._log(f"PCNT: failed to configure encoder on unit {self.unit}")
+            self.unit = None
+
+    def __str__(self):
+        if self.unit is None:
+            return "Encoder(not configured)"
+        return (
+            f"Encoder(unit={self.unit}, phase_a={self.phase_a}, phase_b={self.phase_b}, position={self.value()}, cycles={self._cycles})"
+        )
+
+    __repr__ = __str__
+
+    def init(
+        self,
+        phase_a: int,
+        phase_b: int,
+        filter_ns: int = 0,
+        max_count: int | None = None,
+        min_count: int = 0,
+    ) -> bool:
+        """Configure the unit for 4x quadrature decoding on *phase_a* and *phase_b*."""
+        unit = self.unit
+        if unit is None:
+            return False
+        if phase_a == phase_b:
+            self._log("PCNT: encoder phase_a and phase_b must use different GPIOs")
+            return False
+
+        range_enabled = max_count is not None and not (max_count == 0 and min_count == 0)
+        range_max = 0 if max_count is None else max_count
+        range_min = 0 if max_count is None else min_count
+        if range_enabled and range_max < range_min:
+            self._log(f"PCNT U{unit}: invalid encoder range min={range_min}, max={range_max}")
+            return False
+
+        self.phase_a = phase_a
+        self.phase_b = phase_b
+
+        conf0_addr, cnt_addr = self._begin_configuration()
+        range_desc = "hardware range"
+        if range_enabled:
+            range_desc = f"min={range_min}, max={range_max}"
+        self._log(
+            f"PCNT U{unit}: encoder on {_pcnt_gpio_label(phase_a)} and {_pcnt_gpio_label(phase_b)}, phases=4, filter_ns={filter_ns}ns, {range_desc}"
+        )
+
+        try:
+            _pcnt_route_input(_pcnt_signal_index(unit, 0), phase_a)
+            _pcnt_route_input(_pcnt_signal_index(unit, 0, control=True), phase_b)
+            _pcnt_route_input(_pcnt_signal_index(unit, 1), phase_b)
+            _pcnt_route_input(_pcnt_signal_index(unit, 1, control=True), phase_a)
+
+            config = _pcnt_filter_bits(filter_ns)
+            config |= _PCNT_COUNT_INCREMENT << _CONF0_CH0_NEG_MODE_S
+            config |= _PCNT_COUNT_DECREMENT << _CONF0_CH0_POS_MODE_S
+            config |= _PCNT_CTRL_REVERSE << _CONF0_CH0_LCTRL_MODE_S
+            config |= _PCNT_COUNT_DECREMENT << _CONF0_CH1_NEG_MODE_S
+            config |= _PCNT_COUNT_INCREMENT << _CONF0_CH1_POS_MODE_S
+            config |= _PCNT_CTRL_REVERSE << _CONF0_CH1_LCTRL_MODE_S
+            mem32[conf0_addr] = config
+
+            self._finish_configuration(conf0_addr, cnt_addr)
+        except Exception as exc:          # pylint: disable=broad-exception-caught
+            self._log(f"PCNT U{unit}: error configuring encoder: {exc}")
+            self._configured = False
+            return False
+
+        self._range_min = range_min
+        self._range_max = range_max
+        self._range_enabled = range_enabled
+        self._position = range_min if self._range_enabled else 0
+        self._cycles = 0
+        self._last_raw = _pcnt_read_count_signed(unit)
+        return True
+
+    def _update_position(self) -> None:
+        if not self._configured or self.unit is None:
+            return
+
+        raw = _pcnt_read_count_signed(self.unit)
+        delta = raw - self._last_raw
+        if delta > _PCNT_COUNTER_MAX:
+            delta -= _PCNT_COUNTER_MODULO
+        elif delta < -_PCNT_COUNTER_SIGN_BIT:
+            delta += _PCNT_COUNTER_MODULO
+        self._last_raw = raw
+
+        if delta == 0:
+            return
+
+        previous_cycles = self._cycles
+        if self._range_enabled:
+            span = (self._range_max - self._range_min) + 1
+            absolute = self._cycles * span + (self._position - self._range_min)
+            absolute += delta
+            self._cycles, offset = divmod(absolute, span)
+            self._position = self._range_min + offset
+        else:
+            self._position += delta
+
+        if self.logging:
+            wrap_note = " (wrapped)" if self._cycles != previous_cycles else ""
+            print(
+                f"PCNT U{self.unit}: encoder delta={delta}, position={self._position}, cycles={self._cycles}{wrap_note}"
+            )
+
+    def value(self, value: int | None = None) -> int:
+        """Return the current position and optionally reset it with ``value(0)``."""
+        if not self._configured or self.unit is None:
+            return 0
+
+        self._update_position()
+        position = self._position
+        if value == 0:
+            if self._range_enabled and not self._range_min <= 0 <= self._range_max:
+                raise ValueError("0 outside configured encoder range")
+            _pcnt_reset_counter(self.unit)
+            self._last_raw = _pcnt_read_count_signed(self.unit)
+            self._position = 0
+            self._cycles = 0
+            self._log(f"PCNT U{self.unit}: encoder position reset to 0, cycles=0")
+        return position
+
+    def cycles(self) -> int:
+        """Return the current logical wrap/underflow cycle count."""
+        if not self._configured or self.unit is None:
+            return 0
+
+        self._update_position()
+        return self._cycles
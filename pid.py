@@ -0,0 +1,130 @@
+# PID Module for BadgeBot
+#
+# Integer PID controller for the line follower's steering correction.
+# Everything on the update path is integer arithmetic - no floats and, for
+# the ranges used here, no values big enough to need heap-allocated ints.
+#
+# Gains are integers scaled by 1000 (as stored in the pid_kp / pid_ki /
+# pid_kd settings and produced by the autotuner), with time in ms:
+#
+#     p = kp * error / 1000
+#     i = ki * sum(error * dt_ms) / 1000
+#     d = kd * d(error)/dt_ms / 1000, low-pass filtered
+#
+# Anti-windup: the integral is clamped so the i term alone can never exceed
+# the output limit, and it stops accumulating while the output is saturated
+# in the direction the error would push it further.  The derivative is
+# taken on the error between consecutive updates and smoothed with a
+# first-order filter (time constant d_filter_ms), so sensor noise is not
+# amplified into motor jitter; it is skipped on the first update after a
+# reset, when there is no previous error.
+#
+# Public interface:
+#   PID(kp, ki, kd, limit, d_filter_ms)
+#     set_gains(kp, ki, kd, limit) – change the gains / limit and reset
+#     reset()                      – clear the integral and derivative state
+#     update(error, dt_ms)         – output for this error, clamped to ±limit
+#     p_term, i_term, d_term       – the terms of the last update (for logging)
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+_GAIN_SCALE = const(1000)           # gains are stored multiplied by this
+_DEFAULT_D_FILTER_MS = const(20)
+_MAX_DT_MS = const(1000)            # longer gaps (e.g. after a pause) are treated as this
+
+
+class PID:
+    """Fixed-point PID controller with anti-windup and a filtered derivative.
+
+    Parameters
+    ----------
+    kp, ki, kd : int
+        Proportional, integral (per ms) and derivative (ms) gains, times 1000.
+    limit : int
+        Largest output magnitude.
+    d_filter_ms : int
+        Time constant of the derivative low-pass filter (0 = unfiltered).
+    """
+    __slots__ = ("kp", "ki", "kd", "limit", "_d_filter_ms", "_i_max", "_i_acc",
+                 "_prev_error", "_primed", "p_term", "i_term", "d_term")
+
+    def __init__(self, kp: int, ki: int, kd: int, limit: int, d_filter_ms: int = _DEFAULT_D_FILTER_MS):
+        self.kp: int = 0
+        self.ki: int = 0
+        self.kd: int = 0
+        self.limit: int = 0
+        self._d_filter_ms: int = max(0, d_filter_ms)
+        self._i_max: int = 0                # integral clamp (error x ms)
+        self._i_acc: int = 0                # accumulated error x ms
+        self._prev_error: int = 0
+        self._primed: bool = False          # _prev_error holds a real reading
+        self.p_term: int = 0
+        self.i_term: int = 0
+        self.d_term: int = 0
+        self.set_gains(kp, ki, kd, limit)
+
+
+    def set_gains(self, kp: int, ki: int, kd: int, limit: int):
+        """Set the gains and output limit, and reset the controller."""
+        self.kp = int(kp)
+        self.ki = int(ki)
+        self.kd = int(kd)
+        self.limit = abs(int(limit))
+        self._i_max = (self.limit * _GAIN_SCALE) // self.ki if self.ki > 0 else 0
+        self.reset()
+
+
+    def reset(self):
+        """Clear the integral and derivative state."""
+        self._i_acc = 0
+        self._prev_error = 0
+        self._primed = False
+        self.p_term = 0
+        self.i_term = 0
+        self.d_term = 0
+
+
+    def update(self, error: int, dt_ms: int) -> int:
+        """Return the output for *error*, *dt_ms* after the previous update, clamped to ±limit."""
+        if dt_ms < 1:
+            dt_ms = 1
+        elif dt_ms > _MAX_DT_MS:
+            dt_ms = _MAX_DT_MS
+        limit = self.limit
+        p = (self.kp * error) // _GAIN_SCALE
+
+        # Derivative of the error, low-pass filtered
+        d = self.d_term
+        if self._primed and self.kd:
+            raw = (self.kd * (error - self._prev_error)) // (_GAIN_SCALE * dt_ms)
+            d += ((raw - d) * dt_ms) // (self._d_filter_ms + dt_ms)
+        self._prev_error = error
+        self._primed = True
+
+        # Integral, unless the output is already saturated in the direction the error pushes it
+        i_acc = self._i_acc
+        if self.ki:
+            out = p + (self.ki * i_acc) // _GAIN_SCALE + d
+            if not ((out >= limit and error > 0) or (out <= -limit and error < 0)):
+                i_acc += error * dt_ms
+                i_max = self._i_max
+                if i_acc > i_max:
+                    i_acc = i_max
+                elif i_acc < -i_max:
+                    i_acc = -i_max
+                self._i_acc = i_acc
+        i = (self.ki * i_acc) // _GAIN_SCALE
+
+        self.p_term = p
+        self.i_term = i
+        self.d_term = d
+        out = p + i + d
+        if out > limit:
+            return limit
+        if out < -limit:
+            return -limit
+        return out
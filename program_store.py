@@ -0,0 +1,152 @@
+# Program Store Module for BadgeBot
+#
+# Compact binary encoding of Motor Moves programs, and a small library of
+# numbered program slots kept as files in flash.
+#
+# Each byte holds one move: the top two bits are the direction and the low
+# six bits the step count less one (1-64 steps).  Longer moves continue in
+# further bytes with the same direction, which the decoder joins back up -
+# a recorded program never has two consecutive moves in the same direction,
+# so nothing is lost.  A program file is a two byte header followed by the
+# encoded moves, so loading one is a single read of a few dozen bytes and
+# the moves are only unpacked as they are needed.
+#
+# Public interface:
+#   DIR_UP, DIR_DOWN, DIR_LEFT, DIR_RIGHT – direction codes
+#   encode_program(steps)   – bytes for an iterable of (direction, count)
+#   decode_program(data)    – yields (direction, count) from encoded bytes
+#   optimise_program(steps) – (direction, count) moves with adjacent moves merged / cancelled
+#   ProgramLibrary(directory, slots)
+#     slots                 – number of program slots
+#     size(slot)            – encoded length of the program in *slot*, or -1 if empty
+#     save(slot, data) / load(slot) / delete(slot)
+
+import os
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+DIR_UP    = const(0)
+DIR_DOWN  = const(1)
+DIR_LEFT  = const(2)
+DIR_RIGHT = const(3)
+
+_COUNT_BITS = const(6)
+_COUNT_MASK = const(0x3F)
+_MAX_COUNT  = const(64)             # steps held by a single byte
+
+_FILE_HEADER = b"M\x01"             # format marker and version
+_DEFAULT_SLOTS = const(4)
+
+
+def encode_program(steps) -> bytes:
+    """Encode an iterable of (direction, count) moves, one byte per 64 steps of each move."""
+    out = bytearray()
+    for direction, count in steps:
+        code = (direction & 3) << _COUNT_BITS
+        while count > 0:
+            chunk = count if count < _MAX_COUNT else _MAX_COUNT
+            out.append(code | (chunk - 1))
+            count -= chunk
+    return bytes(out)
+
+
+def decode_program(data):
+    """Yield the (direction, count) moves encoded in *data*, joining continuation bytes."""
+    direction = -1
+    count = 0
+    for byte in data:
+        d = byte >> _COUNT_BITS
+        n = (byte & _COUNT_MASK) + 1
+        if d == direction:
+            count += n
+            continue
+        if count:
+            yield direction, count
+        direction = d
+        count = n
+    if count:
+        yield direction, count
+
+
+def optimise_program(steps) -> list:
+    """Return the (direction, count) moves in *steps* normalised for running.
+
+    Consecutive moves in the same direction are merged into one longer move
+    (one ramp up and down instead of several), and adjacent LEFT/RIGHT turns
+    cancel each other, leaving only the difference - which may in turn let
+    the moves either side of them merge.  Drives are never cancelled and
+    moves are never reordered, as either would change the path driven.
+    """
+    program = []
+    for direction, count in steps:
+        if program:
+            last, last_count = program[-1]
+            if last == direction:
+                program[-1] = (direction, last_count + count)
+                continue
+            if last >= DIR_LEFT and direction >= DIR_LEFT:
+                # opposite turns (turns the same way were merged above)
+                net = last_count - count
+                if net > 0:
+                    program[-1] = (last, net)
+                elif net < 0:
+                    program[-1] = (direction, -net)
+                else:
+                    program.pop()
+                continue
+        program.append((direction, count))
+    return program
+
+
+class ProgramLibrary:
+    """Numbered program slots stored as files in *directory*.
+
+    Parameters
+    ----------
+    directory : str
+        Directory the program files are kept in (e.g. the app's own directory).
+    slots : int
+        Number of program slots.
+    """
+    __slots__ = ("_directory", "slots")
+
+    def __init__(self, directory: str, slots: int = _DEFAULT_SLOTS):
+        self._directory: str = directory.rstrip("/")
+        self.slots: int = slots
+
+    def _path(self, slot: int) -> str:
+        return f"{self._directory}/program{slot}.bin"
+
+    def size(self, slot: int) -> int:
+        """Encoded length of the program in *slot*, or -1 if the slot is empty."""
+        try:
+            return os.stat(self._path(slot))[6] - len(_FILE_HEADER)
+        except OSError:
+            return -1
+
+    def save(self, slot: int, data: bytes):
+        """Store encoded program *data* in *slot*, replacing anything already there."""
+        with open(self._path(slot), "wb") as f:
+            f.write(_FILE_HEADER + data)
+
+    def load(self, slot: int) -> bytes | None:
+        """The encoded program in *slot*, or None if the slot is empty or not a program."""
+        try:
+            with open(self._path(slot), "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if data[:len(_FILE_HEADER)] != _FILE_HEADER:
+            return None
+        return data[len(_FILE_HEADER):]
+
+    def delete(self, slot: int):
+        """Empty *slot*."""
+        try:
+            os.remove(self._path(slot))
+        except OSError:
+            pass
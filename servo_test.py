@@ -162,7 +162,7 @@ class ServoTestMgr:
                     if self.servo_centre[self.servo_selected] > (_SERVO_DEFAULT_CENTRE + _SERVO_MAX_TRIM):
                         self.servo_centre[self.servo_selected] = _SERVO_DEFAULT_CENTRE + _SERVO_MAX_TRIM
                     if len(app.hexdrive_apps) > 0:
-                        if not app.hexdrive_apps[0].set_servocentre(self.servo_centre[self.servo_selected], self.servo_selected):
+                        if not app.hexdrive.set_servocentre(self.servo_centre[self.servo_selected], self.servo_selected):
                             print("H:Failed to set servo centre")
                 elif self.servo_mode[self.servo_selected] == ServoMode.SCANNING:
                     if self.servo_rate[self.servo_selected] < 0:
@@ -197,7 +197,7 @@ class ServoTestMgr:
                     if self.servo_centre[self.servo_selected] < (_SERVO_DEFAULT_CENTRE - _SERVO_MAX_TRIM):
                         self.servo_centre[self.servo_selected] = _SERVO_DEFAULT_CENTRE - _SERVO_MAX_TRIM
                     if len(app.hexdrive_apps) > 0:
-                        if not app.hexdrive_apps[0].set_servocentre(self.servo_centre[self.servo_selected], self.servo_selected):
+                        if not app.hexdrive.set_servocentre(self.servo_centre[self.servo_selected], self.servo_selected):
                             print("H:Failed to set servo centre")
                 elif self.servo_mode[self.servo_selected] == ServoMode.SCANNING:
                     if self.servo_rate[self.servo_selected] < 0:
@@ -238,8 +238,8 @@ class ServoTestMgr:
             elif app.button_states.get(BUTTON_TYPES["CANCEL"]):
                 app.button_states.clear()
                 if len(app.hexdrive_apps) > 0:
-                    app.hexdrive_apps[0].set_power(False)
-                    app.hexdrive_apps[0].set_servoposition()
+                    app.hexdrive.set_power(False)
+                    app.hexdrive.set_servoposition()
                 app.return_to_menu()
                 return True
             elif app.button_states.get(BUTTON_TYPES["CONFIRM"]):
@@ -247,7 +247,7 @@ class ServoTestMgr:
                 self.servo_mode[self.servo_selected].inc()
                 if self.servo_mode[self.servo_selected] == ServoMode.OFF:
                     if len(app.hexdrive_apps) > 0:
-                        app.hexdrive_apps[0].set_servoposition(self.servo_selected, None)
+                        app.hexdrive.set_servoposition(self.servo_selected, None)
                 else:
                     if self.servo[self.servo_selected] is None:
                         self.servo[self.servo_selected] = 0
@@ -260,8 +260,8 @@ class ServoTestMgr:
             self._time_since_last_input += delta
             if self._time_since_last_input > self.timeout_period:
                 if len(app.hexdrive_apps) > 0:
-                    app.hexdrive_apps[0].set_power(False)
-                    app.hexdrive_apps[0].set_servoposition()
+                    app.hexdrive.set_power(False)
+                    app.hexdrive.set_servoposition()
                 app.return_to_menu()
                 app.notification = Notification("  Servo:\n Timeout")
 
@@ -287,7 +287,7 @@ class ServoTestMgr:
                 _refresh = True
             servo_value = self.servo[i]
             if _refresh and len(app.hexdrive_apps) > 0 and self.servo_mode[i] != ServoMode.OFF and servo_value is not None:
-                app.hexdrive_apps[0].set_servoposition(i, servo_value)
+                app.hexdrive.set_servoposition(i, servo_value)
 
         return True
 
@@ -305,10 +305,10 @@ class ServoTestMgr:
         """Reset servo tester state."""
         app = self._app
         if len(app.hexdrive_apps) > 0:
-            if app.hexdrive_apps[0].initialise() and app.hexdrive_apps[0].set_power(True):
+            if app.hexdrive.initialise() and app.hexdrive.set_power(True):
                 for i in range(self.available_servo_count):
-                    app.hexdrive_apps[0].set_freq(1000 // self.period, channel=i)
-                    app.hexdrive_apps[0].set_servocentre(self.servo_centre[i], i)
+                    app.hexdrive.set_freq(1000 // self.period, channel=i)
+                    app.hexdrive.set_servocentre(self.servo_centre[i], i)
                     self.servo_range[i] = self.range
                     servo_value = self.servo[i]
                     if servo_value is not None:
@@ -317,7 +317,7 @@ class ServoTestMgr:
                         elif servo_value < -self.servo_range[i]:
                             servo_value = -self.servo_range[i]
                         self.servo[i] = servo_value
-                        if not app.hexdrive_apps[0].set_servoposition(i, servo_value):
+                        if not app.hexdrive.set_servoposition(i, servo_value):
                             if self._logging:
                                 print("H:Failed to set servo position")
                 self.servo_selected = 0
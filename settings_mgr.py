@@ -8,6 +8,9 @@
 #   __init__(app)   – wire up to BadgeBotApp
 #   update(delta)   – per-tick state machine update
 #   draw(ctx)       – render settings editing UI
+#   bind_settings(container)         – give every registered setting its name and key
+#   load_settings(container)         – read every registered setting in one pass
+#   commit_settings(container, save) – write only the changed settings, then save once
 
 import settings as platform_settings
 from events.input import BUTTON_TYPES
@@ -17,7 +20,13 @@ from .app import SETTINGS_NAME_PREFIX
 
 MENU_ENTRY_NAME = "Settings"
 
+_KEY_PREFIX = SETTINGS_NAME_PREFIX + "."
+
+
 class MySetting:
+    # ~30 settings are registered, so keep the per-instance footprint down
+    __slots__ = ("_container", "d", "v", "_min", "_max", "_labels", "name", "key", "_stored")
+
     def __init__(self, container, default, minimum, maximum, labels=None):
         self._container = container
         self.d = default
@@ -25,15 +34,23 @@ class MySetting:
         self._min = minimum
         self._max = maximum
         self._labels = labels
+        self.name: str | None = None    # key within the container, assigned by bind_settings()
+        self.key: str | None = None     # full platform key, assigned by bind_settings()
+        self._stored = default          # value last read from / written to platform storage
+
+    @property
+    def dirty(self) -> bool:
+        """Whether the value has changed since it was last loaded or committed."""
+        return self.v != self._stored
 
     def __str__(self):
         return str(self.v)
 
     def _index(self):
-        for k, v in self._container.items():
-            if v == self:
-                return k
-        return None
+        if self.name is None:
+            # registered since the last bind - bind the whole container in one pass
+            bind_settings(self._container)
+        return self.name
 
     def label(self, index: int | None = None):
         if index is not None:
@@ -102,16 +119,53 @@ class MySetting:
 
     def persist(self):
         """Persist the setting value to platform storage.  If the value is equal to the default, the setting will be removed from storage to save space."""
-        index = self._index()
-        if index is None:
+        if self.key is None and self._index() is None:
             return
-        key = f"{SETTINGS_NAME_PREFIX}.{index}"
+        key = self.key
         try:
             platform_settings.set(key, self.v)
+            self._stored = self.v
         except Exception as e:          # pylint: disable=broad-except
             print(f"H:Failed to persist setting {key}: {e}")
 
 
+def bind_settings(container: dict):
+    """Record each setting's name and platform key so that later lookups and
+    persists don't need to search the container."""
+    for name, setting in container.items():
+        if setting.name != name:
+            setting.name = name
+            setting.key = _KEY_PREFIX + name
+
+
+def load_settings(container: dict):
+    """Read every setting in *container* from platform storage in one pass, using
+    only the platform's public get().  Settings not present in storage take their
+    default value."""
+    bind_settings(container)
+    get = platform_settings.get
+    for setting in container.values():
+        value = get(setting.key, setting.d)
+        setting.v = value
+        setting._stored = value             # pylint: disable=protected-access
+
+
+def commit_settings(container: dict, save: bool = True) -> int:
+    """Write only the settings in *container* whose value has changed, then (optionally)
+    save platform storage once.  Returns the number of settings written."""
+    written = 0
+    for setting in container.values():
+        if setting.dirty:
+            setting.persist()
+            written += 1
+    if save and written:
+        try:
+            platform_settings.save()
+        except Exception as e:          # pylint: disable=broad-except
+            print(f"H:Failed to save settings: {e}")
+    return written
+
+
 class SettingsMgr:
     """Manages the Settings editing UI.
 
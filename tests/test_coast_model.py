@@ -0,0 +1,46 @@
+"""Tests for the learned turn coast model (coast_model.py).
+
+No hardware or simulator required.
+"""
+import os
+import importlib
+
+# Import coast_model directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("coast_model", os.path.join(_repo_root, "coast_model.py"))
+coast_model = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(coast_model)
+
+CoastModel = coast_model.CoastModel
+
+
+def _robot(rate_dps):
+    """A robot that coasts for 80 ms plus 1° after the power is cut."""
+    return 80 * rate_dps / 1000 + 1.0
+
+
+def test_untrained_model_predicts_nothing():
+    model = CoastModel()
+    assert model.predict(300) == 0.0
+
+
+def test_learns_coast_time_and_offset_within_a_few_turns():
+    model = CoastModel()
+    for rate in (300, 150, 420, 250, 380, 200, 330, 180):
+        model.update(rate, _robot(rate))
+    assert model.turns == 8
+    assert abs(model.coast_ms - 80) < 5
+    assert abs(model.offset_deg - 1.0) < 0.5
+    assert abs(model.predict(-350) - _robot(350)) < 0.5
+
+
+def test_parameters_are_bounded_and_reset_restarts():
+    model = CoastModel(40, 0.5)
+    assert model.predict(1000) == 40.5
+    for _ in range(20):
+        model.update(500, 1000.0)
+    assert model.coast_ms <= 500 and model.offset_deg <= 10
+    model.reset(10, 0.0)
+    assert model.turns == 0
+    assert model.predict(100) == 1.0
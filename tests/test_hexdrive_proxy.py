@@ -0,0 +1,105 @@
+"""Tests for the caching HexDrive proxy (hexdrive_proxy.py).
+
+These tests use a fake HexDrive app and clock – no hardware or simulator
+required.
+"""
+import os
+import importlib
+
+# Import hexdrive_proxy directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("hexdrive_proxy", os.path.join(_repo_root, "hexdrive_proxy.py"))
+hexdrive_proxy = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(hexdrive_proxy)
+
+HexDriveProxy = hexdrive_proxy.HexDriveProxy
+
+
+class _FakeClock:
+    def __init__(self):
+        self.now = 0
+
+    def ticks_ms(self):
+        return self.now
+
+    @staticmethod
+    def ticks_diff(a, b):
+        return a - b
+
+
+class _FakeHexDrive:
+    def __init__(self):
+        self.calls = []
+
+    def set_power(self, state):
+        self.calls.append(("power", state))
+        return True
+
+    def set_freq(self, freq, channel=None):
+        self.calls.append(("freq", freq, channel))
+        return True
+
+    def set_motors(self, outputs):
+        self.calls.append(("motors", outputs))
+        return True
+
+    def set_servoposition(self, channel=None, position=None):
+        self.calls.append(("servo", channel, position))
+        return True
+
+    def initialise(self):
+        self.calls.append(("init",))
+        return True
+
+
+def _proxy():
+    clock = _FakeClock()
+    hexdrive_proxy.time = clock
+    hexdrive = _FakeHexDrive()
+    return HexDriveProxy(hexdrive, keep_alive_ms=500), hexdrive, clock
+
+
+def test_repeated_power_and_freq_are_skipped():
+    proxy, hexdrive, _ = _proxy()
+    for _ in range(3):
+        assert proxy.set_power(True)
+        assert proxy.set_freq(20000)
+    assert hexdrive.calls == [("power", True), ("freq", 20000, None)]
+    assert proxy.skipped == 4
+    proxy.set_power(False)
+    assert hexdrive.calls[-1] == ("power", False)
+
+
+def test_channel_freq_invalidates_all_channels_freq():
+    proxy, hexdrive, _ = _proxy()
+    proxy.set_freq(20000)
+    proxy.set_freq(50, channel=0)
+    proxy.set_freq(20000)
+    assert hexdrive.calls == [("freq", 20000, None), ("freq", 50, 0), ("freq", 20000, None)]
+    # and the all-channels value replaces the per-channel one
+    proxy.set_freq(50, channel=0)
+    assert hexdrive.calls[-1] == ("freq", 50, 0)
+
+
+def test_unchanged_outputs_are_refreshed_for_keep_alive():
+    proxy, hexdrive, clock = _proxy()
+    for t in range(0, 1001, 10):
+        clock.now = t
+        proxy.set_motors((100, 100))
+    sent = [c for c in hexdrive.calls if c[0] == "motors"]
+    assert len(sent) == 3       # at 0, 500 and 1000 ms
+    proxy.set_motors((50, 100))
+    assert hexdrive.calls[-1] == ("motors", (50, 100))
+
+
+def test_passthrough_and_initialise_invalidate_cache():
+    proxy, hexdrive, _ = _proxy()
+    proxy.set_power(True)
+    proxy.set_motors((0, 0))
+    proxy.set_servoposition(0, 1500)
+    proxy.set_motors((0, 0))
+    assert hexdrive.calls.count(("motors", (0, 0))) == 2
+    proxy.initialise()
+    proxy.set_power(True)
+    assert hexdrive.calls.count(("power", True)) == 2
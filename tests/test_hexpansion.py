@@ -116,7 +116,7 @@ class TestTwoMotorHexDrive:
         app = badgebot_app_with_hexpansion
         app.set_menu("main")
         items = [item for item in app.menu.menu_items]
-        for expected in ("Hexpansions", "Settings", "About", "Exit"):
+        for expected in ("Hexpansions", "Loop Timing", "Settings", "About", "Exit"):
             assert expected in items, f"Missing common menu item: {expected}"
 
 
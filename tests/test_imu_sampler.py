@@ -0,0 +1,87 @@
+"""Tests for the IMU sample FIFO (imu_sampler.py).
+
+These tests call sample() directly with fake readers – no hardware or
+simulator required.
+"""
+import os
+import importlib
+import asyncio
+import time
+
+# Import imu_sampler directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("imu_sampler", os.path.join(_repo_root, "imu_sampler.py"))
+imu_sampler = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(imu_sampler)
+
+ImuSampler = imu_sampler.ImuSampler
+
+
+class _FakeImu:
+    def __init__(self):
+        self.n = 0
+
+    def gyro_read(self):
+        self.n += 1
+        return (0.0, 0.0, float(self.n))
+
+    def acc_read(self):
+        return (0.5, -0.25, 9.8)
+
+
+def _drain(sampler):
+    out = []
+    while True:
+        i = sampler.pop()
+        if i < 0:
+            return out
+        out.append((sampler.t_us[i], sampler.gyro[i], sampler.acc_x[i], sampler.acc_y[i]))
+
+
+def test_samples_come_out_in_order_with_timestamps():
+    imu = _FakeImu()
+    s = ImuSampler(imu.gyro_read, imu.acc_read, capacity=8)
+    for t in (100, 2100, 4100):
+        s.sample(t)
+    assert s.count == 3
+    assert _drain(s) == [(100, 1.0, 0.5, -0.25), (2100, 2.0, 0.5, -0.25), (4100, 3.0, 0.5, -0.25)]
+    assert s.pop() == -1
+
+
+def test_full_fifo_drops_oldest():
+    imu = _FakeImu()
+    s = ImuSampler(imu.gyro_read, imu.acc_read, capacity=4)
+    for t in range(6):
+        s.sample(t)
+    assert s.count == 4
+    assert s.dropped == 2
+    assert [row[0] for row in _drain(s)] == [2, 3, 4, 5]
+
+
+def test_failed_reads_are_skipped():
+    def broken():
+        raise OSError("i2c")
+    s = ImuSampler(broken, None, capacity=4)
+    s.sample(0)
+    assert s.count == 0
+
+
+def test_background_task_fills_fifo_until_stopped(monkeypatch):
+    # MicroPython tick counters wrap at 2**30, so they always fit the FIFO's timestamp array
+    monkeypatch.setattr(time, "ticks_us", lambda: (time.monotonic_ns() // 1000) & 0x3FFFFFFF, raising=False)
+    monkeypatch.setattr(asyncio, "sleep_ms", lambda ms: asyncio.sleep(ms / 1000), raising=False)
+    imu = _FakeImu()
+    s = ImuSampler(imu.gyro_read, imu.acc_read, capacity=16, period_ms=1)
+
+    async def run():
+        s.start(read_accel=False)
+        assert s.running
+        await asyncio.sleep(0.02)
+        s.stop()
+
+    asyncio.run(run())
+    assert not s.running
+    rows = _drain(s)
+    assert len(rows) >= 2
+    assert all(row[2] == 0.0 for row in rows)
@@ -0,0 +1,255 @@
+"""Tests for the headless differential-drive simulator (dev/kinematic_sim.py).
+
+These tests run motion code on the simulator's virtual clock – no hardware
+required.  The MotorController tests need the badge simulator and are
+skipped without it.
+"""
+import os
+import sys
+import time
+import types
+import asyncio
+import inspect
+import importlib
+
+import pytest
+
+# Import kinematic_sim directly by file path (dev/ is not a package).
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("kinematic_sim", os.path.join(_repo_root, "dev", "kinematic_sim.py"))
+kinematic_sim = importlib.util.module_from_spec(_spec)
+sys.modules["kinematic_sim"] = kinematic_sim      # needed by its dataclasses
+_spec.loader.exec_module(kinematic_sim)
+
+RobotModel = kinematic_sim.RobotModel
+Simulation = kinematic_sim.Simulation
+simulate_program = kinematic_sim.simulate_program
+program_plans = kinematic_sim.program_plans
+
+
+def test_straight_program_drives_along_x_and_comes_to_rest():
+    summary = simulate_program("U10", max_power=96, acceleration=48)
+    assert summary.x_mm > 100.0
+    assert abs(summary.y_mm) < 0.1
+    assert abs(summary.heading_deg) < 0.1
+    # the robot coasts on after the last output
+    assert summary.duration_ms > 10 * 50
+    assert simulate_program("D10", max_power=96, acceleration=48).x_mm == pytest.approx(-summary.x_mm)
+
+
+def test_turns_follow_direction_and_wheel_base():
+    left = simulate_program("L5", max_power=96, acceleration=48)
+    right = simulate_program("R5", max_power=96, acceleration=48)
+    assert left.heading_deg > 10.0
+    assert right.heading_deg == pytest.approx(-left.heading_deg)
+    assert left.distance_mm < 0.1
+    wide = simulate_program("L5", RobotModel(track_mm=160.0), max_power=96, acceleration=48)
+    assert wide.heading_deg == pytest.approx(left.heading_deg / 2)
+
+
+def test_virtual_clock_runs_concurrent_tasks_faster_than_real_time():
+    sim = Simulation()
+
+    async def ticker(period_ms):
+        start = time.ticks_ms()
+        for _ in range(10):
+            await asyncio.sleep_ms(period_ms)
+        return time.ticks_diff(time.ticks_ms(), start)
+
+    async def main():
+        sim.hexdrive.set_motors((65535, 65535))
+        elapsed = await asyncio.gather(ticker(100), ticker(50))
+        sim.hexdrive.set_motors((0, 0))
+        return elapsed
+
+    wall = time.monotonic()
+    elapsed = sim.run(main(), settle=False)
+    sim.close()
+    assert time.monotonic() - wall < 0.5
+    assert elapsed == [1000, 500]
+    assert sim.now_ms == 1000
+    assert sim.hexdrive.outputs == [(0, 65535, 65535), (1000, 0, 0)]
+    assert sim.x_mm > 0.5 * RobotModel.max_speed_mmps
+    assert getattr(time, "ticks_ms", None) != sim.ticks_ms
+
+
+def test_motor_controller_turn_on_virtual_clock():
+    pytest.importorskip("sim.run")
+    from sim.apps.BadgeBot import motor_controller
+    from sim.apps.BadgeBot.settings_mgr import MySetting
+
+    sim = Simulation()
+    sim.attach_imu(motor_controller)
+    settings = {}
+    settings['max_power'] = MySetting(settings, 96, 20, 127)
+    settings['acceleration'] = MySetting(settings, 48, 1, 127)
+    mc = motor_controller.MotorController(sim.hexdrive, settings)
+    sim.run(mc.turn(90))
+    sim.close()
+    # clockwise, and roughly the angle asked for
+    assert -150.0 < sim.heading_deg < -60.0
+    assert abs(sim.x_mm) < 0.1
+
+
+def _motor_moves_settings(**values):
+    from sim.apps.BadgeBot.settings_mgr import MySetting
+    settings = {}
+    settings['logging'] = MySetting(settings, False, False, True)
+    for name, value in values.items():
+        settings[name] = MySetting(settings, value, 0, 10000)
+    return settings
+
+
+def _instructions(program):
+    from events.input import BUTTON_TYPES
+    from sim.apps.BadgeBot.motor_moves import Instruction
+    names = {"U": "UP", "D": "DOWN", "L": "LEFT", "R": "RIGHT"}
+    return [Instruction(BUTTON_TYPES[names[move[0]]], int(move[1:] or 1)) for move in program.split()]
+
+
+def test_program_plans_match_motor_moves_power_plans():
+    pytest.importorskip("sim.run")
+    from sim.apps.BadgeBot import motor_moves
+    program = "U4 R2 D3 L1"
+    cases = (
+        (_motor_moves_settings(max_power=80, acceleration=16, drive_step_ms=70, turn_step_ms=30),
+         dict(max_power=80, acceleration=16, drive_step_ms=70, turn_step_ms=30)),
+        # the step times left at their defaults
+        (_motor_moves_settings(max_power=96, acceleration=48), dict(max_power=96, acceleration=48)),
+    )
+    for settings, kwargs in cases:
+        expected = []
+        for instr in _instructions(program):
+            instr.make_power_plan(settings)
+            expected.append(list(instr.power_plan))
+        assert [list(plan) for plan in program_plans(program, **kwargs)] == expected
+    # and the defaults the copy was written against
+    defaults = inspect.signature(program_plans).parameters
+    assert defaults['drive_step_ms'].default == motor_moves._DEFAULT_USER_DRIVE_MS    # pylint: disable=protected-access
+    assert defaults['turn_step_ms'].default == motor_moves._DEFAULT_USER_TURN_MS      # pylint: disable=protected-access
+
+
+def test_motor_moves_program_runs_through_motor_moves_mgr():
+    pytest.importorskip("sim.run")
+    from sim.apps.BadgeBot import motor_moves
+    settings = dict(max_power=96, acceleration=24, drive_step_ms=50, turn_step_ms=20)
+    sim = Simulation()
+    summary = sim.run_motor_moves("U3 L2 D1", **settings)
+    sim.close()
+    # the manager's own plans, sent once per background tick, ending stopped with the power off
+    steps = []
+    for instr in _instructions("U3 L2 D1"):
+        instr.make_power_plan(_motor_moves_settings(**settings))
+        for output, _ in instr.power_plan:
+            if not steps or steps[-1] != output:
+                steps.append(output)
+    outputs = [(left, right) for _, left, right in sim.hexdrive.outputs]
+    assert [b for a, b in zip([None] + outputs, outputs) if a != b] == steps
+    assert all(b - a == motor_moves._TICK_MS for (a, _, _), (b, _, _) in zip(sim.hexdrive.outputs, sim.hexdrive.outputs[1:]))  # pylint: disable=protected-access
+    assert not sim.hexdrive.power
+    # the standalone player, used without the badge simulator, gets to much the same place
+    standalone = Simulation().play_plans(program_plans("U3 L2 D1", **settings))
+    assert summary.x_mm == pytest.approx(standalone.x_mm, abs=5.0)
+    assert summary.heading_deg == pytest.approx(standalone.heading_deg, abs=5.0)
+
+
+def _run_program(program, acceleration=48, logging=False, drive_mode=None):
+    """Run *program* ((direction, steps) moves, 10 mm or 10 degrees or 10 ms a step)
+    through MotorController.run_instructions and return the simulation."""
+    pytest.importorskip("sim.run")
+    from events.input import BUTTON_TYPES
+    from sim.apps.BadgeBot import motor_controller
+    from sim.apps.BadgeBot.motor_moves import Instruction
+    from sim.apps.BadgeBot.settings_mgr import MySetting
+
+    sim = Simulation()
+    sim.attach_imu(motor_controller)
+    settings = {}
+    settings['max_power'] = MySetting(settings, 96, 20, 127)
+    settings['acceleration'] = MySetting(settings, acceleration, 1, 127)
+    settings['drive_step_ms'] = MySetting(settings, 10, 10, 10000)
+    settings['turn_step_ms'] = MySetting(settings, 10, 10, 10000)
+    if drive_mode is not None:
+        settings['drive_mode'] = MySetting(settings, drive_mode, 0, 1)
+    mc = motor_controller.MotorController(sim.hexdrive, settings, logging=logging)
+    sim.run(mc.run_instructions([Instruction(BUTTON_TYPES[d], n) for d, n in program]))
+    sim.close()
+    return sim
+
+
+def _stops(sim):
+    """Number of times the outputs came to a stop."""
+    outputs = [(left, right) for _, left, right in sim.hexdrive.outputs]
+    return sum(1 for a, b in zip(outputs, outputs[1:]) if a != (0, 0) and b == (0, 0))
+
+
+def _position_at(sim, t_ms):
+    return next((x, y, heading) for t, x, y, heading in sim.path if t >= t_ms)
+
+
+def test_run_instructions_straight_drive():
+    sim = _run_program([("UP", 30)])
+    assert 270.0 < sim.x_mm < 330.0
+    assert abs(sim.y_mm) < 0.1
+    assert _stops(sim) == 1
+
+
+def test_run_instructions_reversal_stops_before_driving_back():
+    sim = _run_program([("UP", 30), ("DOWN", 10)])
+    # the drive back does not count the forward drive slowing down as its own progress
+    assert _stops(sim) == 2
+    assert 170.0 < sim.x_mm < 230.0
+    outputs = sim.hexdrive.outputs
+    assert not any(a[1] > 0 and b[1] < 0 for a, b in zip(outputs, outputs[1:]))
+
+
+def test_run_instructions_drive_hands_over_to_turn_at_speed():
+    sim = _run_program([("UP", 30), ("RIGHT", 9)], acceleration=4)
+    assert _stops(sim) == 1
+    outputs = sim.hexdrive.outputs
+    turn = next(i for i, (_, left, right) in enumerate(outputs) if left != right)
+    peak = max(left for _, left, _ in outputs[:turn])
+    cruise = next(i for i, (_, left, _) in enumerate(outputs) if left == peak)
+    # no taper before the handover: the drive only slows as the turn ramps the wheels apart
+    assert min(left for _, left, _ in outputs[cruise:turn]) > peak // 2
+    x_mm, _, heading = _position_at(sim, outputs[turn][0])
+    assert x_mm > 285.0
+    assert abs(heading) < 1.0
+    assert sim.heading_deg < -60.0
+
+
+def test_run_instructions_turn_then_accelerometer_drive_starts_from_rest():
+    sim = _run_program([("RIGHT", 9), ("UP", 20)])
+    assert _stops(sim) == 2
+    # the drive's own acceleration was measured, so it ends near its target rather than running on
+    assert 170.0 < sim.distance_mm < 230.0
+
+
+def test_run_instructions_prints_one_trace_for_a_blended_move(capsys):
+    _run_program([("UP", 30), ("RIGHT", 9)], logging=True)
+    lines = [line.split(" ", 1)[1] for line in capsys.readouterr().out.splitlines() if line.startswith("[MC-TRACE]")]
+    assert sum(1 for line in lines if line.startswith("t_ms,")) == 1
+    rows = [line.split(",") for line in lines if line[0].isdigit()]
+    # the drive and the turn it handed over to, in one trace
+    assert any(row[1] == row[2] != "0" for row in rows)
+    assert any(int(row[1]) > 0 > int(row[2]) for row in rows)
+
+
+def test_run_instructions_timed_segments_hand_over_at_speed():
+    sim = _run_program([("UP", 20), ("UP", 20)], acceleration=4, drive_mode=0)
+    levels = [left for _, left, right in sim.hexdrive.outputs if left == right]
+    assert len(levels) == len(sim.hexdrive.outputs)
+    # the second segment ramps on from where the first left off: one rise, one fall, one stop
+    peak = levels.index(max(levels))
+    assert levels[:peak + 1] == sorted(levels[:peak + 1])
+    assert levels[peak:] == sorted(levels[peak:], reverse=True)
+    assert _stops(sim) == 1
+    back = _run_program([("DOWN", 20), ("DOWN", 20)], acceleration=4, drive_mode=0)
+    assert [(-left, -right) for _, left, right in back.hexdrive.outputs] == \
+        [(left, right) for _, left, right in sim.hexdrive.outputs]
+
+
+def test_run_instructions_timed_turn_stops_before_driving():
+    sim = _run_program([("UP", 20), ("RIGHT", 20)], drive_mode=0)
+    # the turn reverses the right wheel, so the drive stops first
+    assert _stops(sim) == 2
@@ -0,0 +1,148 @@
+"""Tests for the line sensor timing kernel (line_kernel.py).
+
+These tests use fake pins and a fake microsecond clock – no hardware or
+simulator required.
+"""
+import os
+import time
+import importlib
+
+# Import line_kernel directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("line_kernel", os.path.join(_repo_root, "line_kernel.py"))
+line_kernel = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(line_kernel)
+
+LineKernel = line_kernel.LineKernel
+
+
+class _FakePin:
+    def __init__(self):
+        self.level = 0
+        self.mode = None
+
+    def init(self, mode, pull=None):       # pylint: disable=unused-argument
+        self.mode = mode
+
+    def on(self):
+        self.level = 1
+
+    def off(self):
+        self.level = 0
+
+    def value(self):
+        return self.level
+
+
+class _FakeClock:
+    def __init__(self):
+        self.us = 1000
+
+    def ticks_us(self):
+        return self.us
+
+
+def _make_kernel(monkeypatch, num=2, timeout_us=5000):
+    clock = _FakeClock()
+    monkeypatch.setattr(time, "ticks_us", clock.ticks_us, raising=False)
+    monkeypatch.setattr(time, "ticks_diff", lambda a, b: a - b, raising=False)
+    ctrl = [_FakePin() for _ in range(num)]
+    sig = [_FakePin() for _ in range(num)]
+    return LineKernel(ctrl, sig, timeout_us), ctrl, sig, clock
+
+
+def test_reading_is_completed_every_other_step(monkeypatch):
+    kernel, ctrl, sig, clock = _make_kernel(monkeypatch)
+    handlers = [kernel.handler(i) for i in range(2)]
+    assert not kernel.step()                # charge
+    assert all(p.level == 1 for p in ctrl) and all(p.level == 1 for p in sig)
+    clock.us += 5000
+    assert not kernel.step()                # release
+    assert all(p.mode == line_kernel._PIN_IN for p in sig)   # pylint: disable=protected-access
+    clock.us += 300
+    handlers[1](sig[1])
+    clock.us += 500
+    handlers[0](sig[0])
+    assert ctrl[0].level == 0 and ctrl[1].level == 0
+    clock.us += 4200
+    assert kernel.step()                    # collect, and charge for the next reading
+    assert list(kernel.values) == [800, 300]
+    assert list(kernel.counts) == [1, 1]
+    assert ctrl[0].level == 1
+
+
+def test_slow_sensor_waits_then_times_out_keeping_previous_value(monkeypatch):
+    kernel, ctrl, _, clock = _make_kernel(monkeypatch)
+    kernel.values[1] = 1234
+    kernel.step()
+    kernel.step()                           # released at t=1000
+    clock.us += 400
+    kernel.capture(0)
+    clock.us += 2000
+    assert not kernel.step()                # sensor 1 may still be discharging
+    clock.us += 3000
+    assert kernel.step()                    # timed out
+    assert list(kernel.values) == [400, 1234]
+    assert list(kernel.counts) == [1, 0]
+    # an edge arriving after the timeout (or while charging) is ignored
+    kernel.capture(1)
+    assert kernel.values[1] == 1234
+    assert ctrl[1].level == 1
+
+
+def test_restart_abandons_reading_in_progress(monkeypatch):
+    kernel, _, _, clock = _make_kernel(monkeypatch)
+    kernel.step()
+    kernel.step()
+    kernel.restart()
+    clock.us += 100
+    kernel.capture(0)
+    assert list(kernel.counts) == [0, 0]
+    assert not kernel.step()                # charges again
+
+
+def test_capture_delayed_past_a_step_is_discarded_as_late(monkeypatch):
+    kernel, ctrl, sig, clock = _make_kernel(monkeypatch)
+    kernel.values[0] = 1234
+    kernel.step()
+    kernel.step()                           # released at t=1000
+    sig[1].level = 1                        # sensor 1 still discharging
+    clock.us += 300
+    sig[0].level = 0                        # sensor 0 has discharged but its IRQ has not run yet
+    clock.us += 1000
+    assert not kernel.step()                # waits for sensor 1, dropping sensor 0's reading
+    assert ctrl[0].level == 0
+    kernel.capture(0)                       # the late IRQ is ignored
+    assert kernel.values[0] == 1234
+    sig[1].level = 0
+    kernel.capture(1)
+    assert kernel.step()
+    assert list(kernel.values) == [1234, 1300]
+    assert list(kernel.counts) == [0, 1]
+    assert list(kernel.late) == [1, 0]
+
+
+def test_blocking_read_polls_the_pins_on_release(monkeypatch):
+    kernel, ctrl, sig, clock = _make_kernel(monkeypatch)
+    kernel.blocking = True
+    kernel.values[1] = 1234
+
+    def ticks_us():
+        # each read advances the clock: released at t=1100, sensor 0 discharges at
+        # t=1700 and sensor 1 never does
+        clock.us += 100
+        if clock.us >= 1700:
+            sig[0].level = 0
+        return clock.us
+    assert not kernel.step()                # charge
+    sig[1].level = 1
+    kernel._ticks_us = ticks_us             # pylint: disable=protected-access
+    assert kernel.step()                    # release, poll until sensor 1 times out
+    assert kernel.values[0] == 600
+    assert kernel.values[1] == 1234
+    assert list(kernel.counts) == [1, 0]
+    assert ctrl[0].level == 0 and ctrl[1].level == 0
+    kernel.capture(0)                       # IRQs raised while polling are ignored
+    assert list(kernel.counts) == [1, 0]
+    assert not kernel.step()                # charges again
@@ -0,0 +1,164 @@
+"""Tests for the background loop scheduler (loop_timing.py).
+
+These tests drive the scheduler with a virtual clock (no hardware required).
+"""
+import os
+import importlib
+
+# Import loop_timing directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("loop_timing", os.path.join(_repo_root, "loop_timing.py"))
+loop_timing = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(loop_timing)
+
+LoopScheduler   = loop_timing.LoopScheduler
+POLICY_SKIP     = loop_timing.POLICY_SKIP
+POLICY_CATCH_UP = loop_timing.POLICY_CATCH_UP
+
+
+def _run(scheduler, work_ms, ticks, state=0, start=1000):
+    """Run *ticks* iterations where tick i takes work_ms[i] ms; returns (start times, deltas)."""
+    now = start
+    scheduler.start(now)
+    starts = []
+    deltas = []
+    for i in range(ticks):
+        deltas.append(scheduler.begin_tick(now, state))
+        starts.append(now)
+        now += work_ms[i] if i < len(work_ms) else 1
+        now += scheduler.end_tick(now)
+    return starts, deltas
+
+
+def test_ticks_stay_on_grid_without_drift():
+    s = LoopScheduler(10)
+    starts, deltas = _run(s, [3] * 50, 50)
+    assert starts == [1000 + 10 * i for i in range(50)]
+    assert all(d == 10 for d in deltas)
+    stats = s.stats(0)
+    assert stats.ticks == 50
+    assert stats.overruns == 0
+    assert stats.jitter_max == 0
+
+
+def test_late_wakeup_is_absorbed_by_next_sleep():
+    s = LoopScheduler(10)
+    s.start(0)
+    s.begin_tick(0, 0)
+    sleep = s.end_tick(2)
+    assert sleep == 8
+    # woke up 3 ms late
+    assert s.begin_tick(13, 0) == 10
+    # next deadline is still at 20, not 23
+    assert s.end_tick(15) == 5
+    assert s.stats(0).jitter_max == 3
+
+
+def test_skip_policy_drops_whole_missed_periods():
+    s = LoopScheduler(10, POLICY_SKIP)
+    starts, deltas = _run(s, [1, 35, 1, 1], 4)
+    # tick 1 overran by 2.6 periods: next tick runs immediately, two whole ticks are skipped
+    assert starts[:3] == [1000, 1010, 1045]
+    assert deltas[2] == 30
+    assert starts[3] == 1050
+    stats = s.stats(0)
+    assert stats.overruns == 1
+    assert stats.skipped == 2
+
+
+def test_catch_up_policy_replays_missed_ticks():
+    s = LoopScheduler(10, POLICY_CATCH_UP, max_catch_up=3)
+    starts, deltas = _run(s, [1, 35, 1, 1, 1, 1], 6)
+    assert starts[:5] == [1000, 1010, 1045, 1046, 1047]
+    assert deltas == [10] * 6
+    assert s.stats(0).skipped == 0
+
+
+def test_counters_are_kept_per_state():
+    s = LoopScheduler(10)
+    s.start(0)
+    s.begin_tick(0, 1)
+    s.end_tick(1)
+    s.begin_tick(10, 2)
+    s.end_tick(11)
+    assert s.stats(1).ticks == 1
+    assert s.stats(2).ticks == 1
+    assert s.stats(3) is None
+    s.reset_stats()
+    assert s.stats(1) is None
+
+
+def test_period_change_reanchors_grid():
+    s = LoopScheduler(100)
+    s.start(0)
+    s.begin_tick(0, 0)
+    assert s.end_tick(5, 10) == 10
+    assert s.period_ms == 10
+    assert s.begin_tick(15, 0) == 15
+
+
+# ---- Hot-path timing histograms ----------------------------------------------
+
+TimingHistogram = loop_timing.TimingHistogram
+LoopProfiler    = loop_timing.LoopProfiler
+
+
+def test_histogram_buckets_and_summary():
+    h = TimingHistogram()
+    for us in (100, 499, 500, 1500, 60000):
+        h.add(us)
+    assert list(h.counts) == [2, 1, 1, 0, 0, 0, 0, 1]
+    assert h.count == 5
+    assert h.max_us == 60000
+    assert h.avg_us == (100 + 499 + 500 + 1500 + 60000) // 5
+    assert h.percentile_bucket(50) == 1
+    assert h.percentile_bucket(95) == loop_timing.NUM_BUCKETS - 1
+    h.reset()
+    assert h.count == 0 and sum(h.counts) == 0
+
+
+def test_profiler_keeps_sections_per_state():
+    p = LoopProfiler()
+    p.record(7, loop_timing.SECTION_BACKGROUND, 800)
+    p.record(7, loop_timing.SECTION_DRAW, 30000)
+    p.record(0, loop_timing.SECTION_UPDATE, 200)
+    assert p.states() == [0, 7]
+    assert p.histogram(7, loop_timing.SECTION_BACKGROUND).count == 1
+    assert p.histogram(7, loop_timing.SECTION_UPDATE).count == 0
+    assert p.histogram(3, loop_timing.SECTION_DRAW) is None
+    lines = list(p.telemetry_lines(("Menu",)))
+    assert lines[0].startswith("T:Menu:upd n=1")
+    assert lines[1].startswith("T:7:bg n=1")
+    assert len(lines) == 3
+    p.reset()
+    assert p.states() == []
+
+
+# ---- Display frame-rate governor ---------------------------------------------
+
+FrameGovernor = loop_timing.FrameGovernor
+
+
+def test_governor_coalesces_requests_within_cap():
+    g = FrameGovernor({1: 100})
+    assert g.should_draw(0, 1)
+    g.frame_drawn(0, 1)
+    assert not g.should_draw(40, 1)
+    assert not g.should_draw(99, 1)
+    assert g.should_draw(100, 1)
+    assert g.rate(1).coalesced == 2
+    # uncapped states always draw
+    assert g.should_draw(101, 2)
+
+
+def test_governor_measures_achieved_rate():
+    g = FrameGovernor()
+    for t in range(0, 1001, 50):
+        g.frame_drawn(t, 3)
+    rate = g.rate(3)
+    assert rate.frames == 21
+    assert rate.fps == 21
+    assert g.rate(4) is None
+    g.reset()
+    assert g.states() == []
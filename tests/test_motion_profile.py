@@ -0,0 +1,100 @@
+"""Tests for the precomputed motion profiles (motion_profile.py).
+
+These tests are pure logic – no hardware or simulator required.
+"""
+import os
+import importlib
+
+# Import motion_profile directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("motion_profile", os.path.join(_repo_root, "motion_profile.py"))
+motion_profile = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(motion_profile)
+
+MotionProfile     = motion_profile.MotionProfile
+PROFILE_TRAPEZOID = motion_profile.PROFILE_TRAPEZOID
+PROFILE_SCURVE    = motion_profile.PROFILE_SCURVE
+PowerPlan         = motion_profile.PowerPlan
+
+
+def _levels(profile, tick_ms=10):
+    return [profile.level(t) for t in range(0, profile.total_ms + tick_ms, tick_ms)]
+
+
+def test_trapezoid_matches_slew_rate_ramp():
+    p = MotionProfile(1000, 100, 300)
+    levels = _levels(p)
+    # ramp up at 300/tick, cruise until 100 ms, then ramp down at 300/tick
+    assert levels[:4] == [300, 600, 900, 1000]
+    assert levels[4:10] == [1000] * 6
+    assert levels[10:14] == [700, 400, 100, 0]
+    assert p.down_ms == 100
+    assert p.total_ms == 140
+    assert levels[-1] == 0
+
+
+def test_short_move_becomes_triangular():
+    p = MotionProfile(1000, 20, 300)
+    assert p.peak == 600
+    assert _levels(p) == [300, 600, 300, 0, 0]
+
+
+def test_scurve_respects_acceleration_and_is_smooth():
+    accel = 200
+    p = MotionProfile(2000, 500, accel, PROFILE_SCURVE)
+    levels = [0] + _levels(p)
+    steps = [b - a for a, b in zip(levels, levels[1:])]
+    assert max(abs(s) for s in steps) <= accel
+    # starts and ends gently compared with the trapezoid's constant step
+    assert steps[0] < accel // 2
+    assert levels[-1] == 0
+    assert max(levels) == 2000
+
+
+def test_zero_duration_or_start_level():
+    assert MotionProfile(1000, 0, 300).total_ms == 0
+    p = MotionProfile(1000, 30, 300, start=600)
+    assert _levels(p)[:3] == [900, 1000, 1000]
+
+
+def _expanded_plan(signs, d, a, m, tick_ms=10):
+    """The list of steps Motor Moves instructions used to be expanded into."""
+    def power(p):
+        return (signs[0] * p, signs[1] * p)
+    curr_power = 0
+    ramp_up = []
+    for _ in range((d // (2 * tick_ms)) - 1):
+        curr_power += a
+        if curr_power >= m:
+            curr_power = m
+            break
+        ramp_up.append((power(curr_power), tick_ms))
+    steps = list(ramp_up)
+    if d - 2 * len(ramp_up) * tick_ms > 0:
+        steps.append((power(curr_power), d - 2 * len(ramp_up) * tick_ms))
+    steps.extend(reversed(ramp_up))
+    steps.append(((0, 0), tick_ms))
+    return steps
+
+
+def test_power_plan_matches_expanded_steps():
+    for signs in ((1, 1), (-1, 1)):
+        for d in (10, 20, 40, 50, 100, 200, 1000):
+            for a in (512, 3072, 12288):
+                for m in (5120, 10240, 49152):
+                    plan = PowerPlan(signs, d, a, m)
+                    expected = _expanded_plan(signs, d, a, m)
+                    assert list(plan) == expected, (signs, d, a, m)
+                    assert len(plan) == len(expected)
+                    assert plan.total_ms == sum(ms for _, ms in expected)
+
+
+def test_power_plan_steps_are_generated_on_demand():
+    # a long, slow move: the ramp takes half the move less one tick
+    plan = PowerPlan((1, -1), 10000, 1, 49152)
+    assert len(plan) == 1000
+    assert plan.peak == 499
+    steps = iter(plan)
+    assert next(steps) == ((1, -1), 10)
+    assert next(steps) == ((2, -2), 10)
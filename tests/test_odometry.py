@@ -0,0 +1,116 @@
+"""Tests for the wheel-encoder odometry (odometry.py).
+
+These tests use fake encoders – no hardware or simulator required.
+"""
+import os
+import importlib
+
+# Import odometry directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("odometry", os.path.join(_repo_root, "odometry.py"))
+odometry = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(odometry)
+
+WheelOdometry = odometry.WheelOdometry
+
+
+class _FakeEncoder:
+    def __init__(self, count=0):
+        self.count = count
+        self.released = False
+
+    def value(self):
+        return self.count
+
+    def deinit(self):
+        self.released = True
+
+
+def test_straight_move_is_mean_of_wheels_with_reversed_encoder():
+    left, right = _FakeEncoder(100), _FakeEncoder(-50)
+    odo = WheelOdometry(left, right, counts_per_10mm=40, track_mm=80, right_reversed=True)
+    left.count += 400       # 100 mm forwards
+    right.count -= 400      # encoder wired the other way round
+    odo.update(1000)
+    assert odo.left_mm == 100.0
+    assert odo.right_mm == 100.0
+    assert odo.distance_mm == 100.0
+    assert odo.heading_deg == 0.0
+
+
+def test_on_the_spot_turn_heading():
+    left, right = _FakeEncoder(), _FakeEncoder()
+    odo = WheelOdometry(left, right, counts_per_10mm=10, track_mm=100)
+    # a quarter turn: each wheel travels a quarter of the circle of diameter 100 mm
+    arc_counts = round(3.14159265 * 100 / 4)
+    left.count += arc_counts
+    right.count -= arc_counts
+    odo.update(500)
+    assert abs(odo.heading_deg - 90.0) < 1.0
+    assert abs(odo.distance_mm) < 1e-9
+    assert odo.rate_dps > 0
+
+
+def test_straight_move_is_not_counted_as_rotation():
+    left, right = _FakeEncoder(), _FakeEncoder()
+    odo = WheelOdometry(left, right, counts_per_10mm=10, track_mm=100, right_reversed=True)
+    for _ in range(10):
+        left.count += 10
+        right.count -= 10   # encoder wired the other way round
+        odo.update(10)
+    assert odo.distance_mm == 100.0
+    assert odo.heading_deg == 0.0
+    assert odo.rate_dps == 0.0
+    for _ in range(10):
+        left.count -= 10
+        right.count += 10
+        odo.update(10)
+    assert odo.distance_mm == 0.0
+
+
+def test_coast_through_a_reversal_follows_the_encoder_counts():
+    left, right = _FakeEncoder(), _FakeEncoder()
+    odo = WheelOdometry(left, right, counts_per_10mm=10, track_mm=100)
+    # driven forwards, then reversed while still coasting forwards (with count noise),
+    # then stopped and moving backwards, including a reversal within one update
+    for step in (20, 20, 20, 5, 3, 4, 2, 1):
+        left.count += step
+        right.count += step
+        odo.update(10)
+    assert odo.distance_mm == 75.0
+    for step in (0, -2, -5):
+        left.count += step
+        right.count += step
+        odo.update(10)
+    assert odo.distance_mm == 68.0
+    left.count += 3         # forwards 3, then back 5, between two updates
+    left.count -= 5
+    right.count -= 2
+    odo.update(10)
+    assert odo.distance_mm == 66.0
+    assert odo.heading_deg == 0.0
+
+
+def test_velocity_is_filtered_and_predicts_stop():
+    left, right = _FakeEncoder(), _FakeEncoder()
+    odo = WheelOdometry(left, right, counts_per_10mm=10, track_mm=100)
+    for _ in range(20):
+        left.count += 10    # 10 mm per 10 ms = 1000 mm/s
+        right.count += 10
+        odo.update(10)
+    assert abs(odo.velocity_mmps - 1000.0) < 1.0
+    assert abs(odo.stop_distance_mm(200) - (odo.distance_mm + 100.0)) < 0.1
+
+
+def test_reset_and_deinit():
+    left, right = _FakeEncoder(5), _FakeEncoder(7)
+    odo = WheelOdometry(left, right, counts_per_10mm=10, track_mm=100)
+    left.count = 50
+    odo.update(10)
+    odo.reset()
+    assert odo.distance_mm == 0.0
+    odo.update(10)
+    assert odo.distance_mm == 0.0
+    odo.deinit()
+    assert left.released and right.released
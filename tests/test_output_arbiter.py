@@ -0,0 +1,68 @@
+"""Tests for the motor output arbiter (output_arbiter.py).
+
+These tests drive the arbiter directly – no hardware or simulator required.
+"""
+import os
+import importlib
+
+# Import output_arbiter directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("output_arbiter", os.path.join(_repo_root, "output_arbiter.py"))
+output_arbiter = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(output_arbiter)
+
+OutputArbiter = output_arbiter.OutputArbiter
+SAFETY = output_arbiter.SOURCE_SAFETY
+BLE = output_arbiter.SOURCE_BLE
+MANAGER = output_arbiter.SOURCE_MANAGER
+CONTROLLER = output_arbiter.SOURCE_CONTROLLER
+
+
+def test_highest_priority_wins_and_conflicts_are_counted():
+    arb = OutputArbiter()
+    arb.submit(CONTROLLER, (100, 100), hold=True)
+    arb.submit(MANAGER, (200, 200))
+    arb.submit(BLE, (300, -300))
+    assert arb.resolve() == (300, -300)
+    assert arb.owner_name == "ble"
+    assert arb.conflicts == 2
+    assert arb.overridden[MANAGER] == 1 and arb.overridden[CONTROLLER] == 1
+    arb.submit(SAFETY, (0, 0))
+    assert arb.resolve() == (0, 0)
+    assert arb.owner == SAFETY
+    # agreeing sources are not a conflict
+    arb.submit(MANAGER, (100, 100))
+    assert arb.resolve() == (100, 100)
+    assert arb.conflicts == 3
+
+
+def test_single_tick_requests_expire_but_held_ones_persist():
+    arb = OutputArbiter()
+    arb.submit(CONTROLLER, (50, 50), hold=True)
+    arb.submit(MANAGER, (10, 10))
+    assert arb.resolve() == (10, 10)
+    assert arb.resolve() == (50, 50)
+    assert arb.resolve() == (50, 50)
+    assert arb.owner == CONTROLLER
+
+
+def test_stop_once_when_owner_goes_away():
+    arb = OutputArbiter()
+    arb.submit(BLE, (500, 500))
+    assert arb.resolve() == (500, 500)
+    assert arb.resolve() == (0, 0)
+    assert arb.owner is None
+    assert arb.resolve() is None
+    arb.submit(CONTROLLER, (20, 20), hold=True)
+    arb.resolve()
+    arb.release(CONTROLLER)
+    assert arb.resolve() == (0, 0)
+
+
+def test_manager_going_quiet_leaves_motors_alone():
+    arb = OutputArbiter()
+    arb.submit(MANAGER, (40, 40))
+    assert arb.resolve() == (40, 40)
+    assert arb.resolve() is None
+    assert "ticks=2" in arb.report()
@@ -0,0 +1,73 @@
+"""Tests for the fixed-point PID controller (pid.py).
+
+These tests are pure arithmetic – no hardware or simulator required.
+"""
+import os
+import importlib
+
+# Import pid directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("pid", os.path.join(_repo_root, "pid.py"))
+pid = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(pid)
+
+PID = pid.PID
+
+
+def test_proportional_only_matches_gain_and_clamps():
+    ctrl = PID(kp=20000, ki=0, kd=0, limit=50000)
+    assert ctrl.update(100, 10) == 2000
+    assert ctrl.update(-100, 10) == -2000
+    assert ctrl.update(1000, 10) == 20000
+    ctrl.set_gains(80000, 0, 0, 50000)
+    assert ctrl.update(1000, 10) == 50000
+    assert ctrl.update(-1000, 10) == -50000
+
+
+def test_integral_uses_time_and_stops_winding_up_when_saturated():
+    ctrl = PID(kp=0, ki=1000, kd=0, limit=10000)
+    # 1 output unit per error-ms
+    assert ctrl.update(10, 10) == 100
+    assert ctrl.update(10, 20) == 300
+    # saturate: the integral is clamped at the limit, not beyond it
+    for _ in range(100):
+        out = ctrl.update(1000, 10)
+    assert out == 10000
+    assert ctrl.i_term == 10000
+    # so it recovers as soon as the error reverses
+    assert ctrl.update(-1000, 1) < 10000
+    ctrl.reset()
+    assert ctrl.update(0, 10) == 0
+
+
+def test_no_integral_windup_while_proportional_saturates_output():
+    ctrl = PID(kp=20000, ki=1000, kd=0, limit=10000)
+    for _ in range(50):
+        assert ctrl.update(1000, 10) == 10000
+    # p alone saturates the output, so the integral never started accumulating
+    assert ctrl.i_term == 0
+
+
+def test_derivative_is_filtered_and_skipped_after_reset():
+    ctrl = PID(kp=0, ki=0, kd=10000, limit=100000, d_filter_ms=10)
+    assert ctrl.update(500, 10) == 0            # no previous error yet
+    step = ctrl.update(1000, 10)                # raw derivative 10000 * 500 / 1000 / 10 = 500
+    assert 0 < step < 500                       # low-pass filtered
+    settled = ctrl.update(1500, 10)
+    assert step < settled <= 500
+    # and decays once the error stops changing
+    for _ in range(20):
+        out = ctrl.update(1500, 10)
+    assert abs(out) <= 1
+    unfiltered = PID(kp=0, ki=0, kd=10000, limit=100000, d_filter_ms=0)
+    unfiltered.update(500, 10)
+    assert unfiltered.update(1000, 10) == 500
+
+
+def test_everything_stays_integer():
+    ctrl = PID(kp=12345, ki=321, kd=4567, limit=65535)
+    for error, dt in ((100, 10), (-250, 9), (900, 11), (-1000, 10), (0, 12)):
+        out = ctrl.update(error, dt)
+        assert isinstance(out, int)
+        assert all(isinstance(t, int) for t in (ctrl.p_term, ctrl.i_term, ctrl.d_term))
@@ -0,0 +1,70 @@
+"""Tests for the Motor Moves program encoding and library (program_store.py).
+
+No hardware or simulator required.
+"""
+import os
+import importlib
+
+# Import program_store directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("program_store", os.path.join(_repo_root, "program_store.py"))
+program_store = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(program_store)
+
+UP, DOWN, LEFT, RIGHT = program_store.DIR_UP, program_store.DIR_DOWN, program_store.DIR_LEFT, program_store.DIR_RIGHT
+
+
+def test_one_byte_per_move():
+    steps = [(UP, 3), (LEFT, 1), (DOWN, 64), (RIGHT, 2)]
+    data = program_store.encode_program(steps)
+    assert data == bytes([0x02, 0x80, 0x7F, 0xC1])
+    assert list(program_store.decode_program(data)) == steps
+
+
+def test_long_moves_continue_into_further_bytes():
+    steps = [(UP, 150), (RIGHT, 1)]
+    data = program_store.encode_program(steps)
+    assert len(data) == 4
+    assert list(program_store.decode_program(data)) == steps
+    assert list(program_store.decode_program(b"")) == []
+
+
+def test_optimise_merges_consecutive_moves():
+    optimise = program_store.optimise_program
+    assert optimise([(UP, 2), (UP, 3), (LEFT, 1), (LEFT, 1), (DOWN, 4)]) == [(UP, 5), (LEFT, 2), (DOWN, 4)]
+    # drives are never cancelled
+    assert optimise([(UP, 2), (DOWN, 2)]) == [(UP, 2), (DOWN, 2)]
+    assert not optimise([])
+
+
+def test_optimise_cancels_opposite_turns_leaving_the_difference():
+    optimise = program_store.optimise_program
+    assert optimise([(LEFT, 3), (RIGHT, 1)]) == [(LEFT, 2)]
+    assert optimise([(LEFT, 1), (RIGHT, 3)]) == [(RIGHT, 2)]
+    assert optimise([(RIGHT, 2), (LEFT, 2)]) == []
+
+
+def test_optimise_cancelled_turns_let_the_moves_either_side_merge():
+    optimise = program_store.optimise_program
+    assert optimise([(UP, 2), (LEFT, 1), (RIGHT, 1), (UP, 3)]) == [(UP, 5)]
+    assert optimise([(UP, 1), (LEFT, 2), (RIGHT, 2), (DOWN, 1), (RIGHT, 1), (LEFT, 1)]) == [(UP, 1), (DOWN, 1)]
+    assert optimise([(LEFT, 2), (RIGHT, 1), (LEFT, 1)]) == [(LEFT, 2)]
+    # the input is left as it was
+    steps = [(UP, 1), (UP, 1)]
+    optimise(steps)
+    assert steps == [(UP, 1), (UP, 1)]
+
+
+def test_library_slots(tmp_path):
+    library = program_store.ProgramLibrary(str(tmp_path), slots=3)
+    assert [library.size(slot) for slot in range(3)] == [-1, -1, -1]
+    data = program_store.encode_program([(UP, 2), (LEFT, 5)])
+    library.save(1, data)
+    assert library.size(1) == 2
+    assert library.load(1) == data
+    assert library.load(0) is None
+    (tmp_path / "program2.bin").write_bytes(b"junk")
+    assert library.load(2) is None
+    library.delete(1)
+    assert library.size(1) == -1
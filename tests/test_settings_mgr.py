@@ -0,0 +1,108 @@
+"""Tests for bulk settings load and batched commit (settings_mgr.py).
+
+Platform storage is replaced by an in-memory store so the number of reads,
+writes and saves can be checked.
+"""
+
+import sys
+
+sys.path.append("../../../")
+
+import sim.run as _sim_run     # noqa: F401 – side effect: configures sys.path & fakes
+
+
+class _FakeStore:
+    """In-memory stand-in for the platform settings module's public API."""
+    def __init__(self, values=None):
+        self.values = dict(values or {})
+        self.gets = []
+        self.sets = []
+        self.saves = 0
+
+    def get(self, key, default=None):
+        self.gets.append(key)
+        return self.values.get(key, default)
+
+    def set(self, key, value):
+        self.sets.append((key, value))
+        self.values[key] = value
+
+    def save(self):
+        self.saves += 1
+
+
+def _container(mgr):
+    s = {}
+    s['max_power'] = mgr.MySetting(s, 96, 20, 127)
+    s['acceleration'] = mgr.MySetting(s, 48, 1, 127)
+    s['logging'] = mgr.MySetting(s, False, False, True)
+    return s
+
+
+def test_load_settings_reads_each_key_once_with_defaults(monkeypatch):
+    from sim.apps.BadgeBot import settings_mgr
+    prefix = settings_mgr._KEY_PREFIX       # pylint: disable=protected-access
+    store = _FakeStore({prefix + "max_power": 110})
+    monkeypatch.setattr(settings_mgr, "platform_settings", store)
+    s = _container(settings_mgr)
+    settings_mgr.load_settings(s)
+    assert s['max_power'].v == 110
+    assert s['acceleration'].v == 48
+    assert sorted(store.gets) == sorted(prefix + name for name in s)
+    assert not any(setting.dirty for setting in s.values())
+
+
+def test_commit_settings_writes_only_dirty_settings_and_saves_once(monkeypatch):
+    from sim.apps.BadgeBot import settings_mgr
+    prefix = settings_mgr._KEY_PREFIX       # pylint: disable=protected-access
+    store = _FakeStore()
+    monkeypatch.setattr(settings_mgr, "platform_settings", store)
+    s = _container(settings_mgr)
+    settings_mgr.load_settings(s)
+    assert settings_mgr.commit_settings(s) == 0
+    assert store.saves == 0
+
+    s['max_power'].v = 100
+    s['acceleration'].v = 50
+    assert s['max_power'].dirty
+    assert settings_mgr.commit_settings(s) == 2
+    assert sorted(store.sets) == [(prefix + "acceleration", 50), (prefix + "max_power", 100)]
+    assert store.saves == 1
+    assert not s['max_power'].dirty
+
+    # nothing changed since: no writes and no save
+    assert settings_mgr.commit_settings(s) == 0
+    assert store.saves == 1
+
+    # save=False writes without saving, for callers batching several commits
+    s['logging'].v = True
+    assert settings_mgr.commit_settings(s, save=False) == 1
+    assert store.saves == 1
+
+
+def test_bind_settings_assigns_names_and_keys(monkeypatch):
+    from sim.apps.BadgeBot import settings_mgr
+    prefix = settings_mgr._KEY_PREFIX       # pylint: disable=protected-access
+    monkeypatch.setattr(settings_mgr, "platform_settings", _FakeStore())
+    s = _container(settings_mgr)
+    assert all(setting.name is None and setting.key is None for setting in s.values())
+    settings_mgr.bind_settings(s)
+    for name, setting in s.items():
+        assert setting.name == name
+        assert setting.key == prefix + name
+
+
+def test_persist_resolves_name_and_key_lazily(monkeypatch):
+    from sim.apps.BadgeBot import settings_mgr
+    prefix = settings_mgr._KEY_PREFIX       # pylint: disable=protected-access
+    store = _FakeStore()
+    monkeypatch.setattr(settings_mgr, "platform_settings", store)
+    s = _container(settings_mgr)
+    settings_mgr.bind_settings(s)
+    # registered after the bind: resolved (with the rest of the container) on first persist
+    s['late'] = settings_mgr.MySetting(s, 5, 0, 10)
+    s['late'].v = 7
+    s['late'].persist()
+    assert s['late'].name == "late"
+    assert store.sets == [(prefix + "late", 7)]
+    assert not s['late'].dirty
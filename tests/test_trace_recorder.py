@@ -0,0 +1,59 @@
+"""Tests for the control loop trace recorder (trace_recorder.py).
+
+No hardware or simulator required.
+"""
+import os
+import importlib
+
+# Import trace_recorder directly by file path to avoid the __init__.py package import
+# which pulls in badge-platform-specific modules.
+_repo_root = os.path.join(os.path.dirname(__file__), "..")
+_spec = importlib.util.spec_from_file_location("trace_recorder", os.path.join(_repo_root, "trace_recorder.py"))
+trace_recorder = importlib.util.module_from_spec(_spec)
+_spec.loader.exec_module(trace_recorder)
+
+TraceRecorder = trace_recorder.TraceRecorder
+
+
+def _fill(trace, n):
+    for t in range(n):
+        trace.record(t * 10, t, -t, 1.5, 2.0, 0.25, t / 1000.0)
+
+
+def test_records_come_back_oldest_first():
+    trace = TraceRecorder(capacity=8)
+    _fill(trace, 3)
+    assert trace.count == 3
+    assert trace.row(0) == (0, 0, 0, 1.5, 2.0, 0.25, 0.0)
+    t_ms, left, right, _, _, _, distance_mm = trace.row(2)
+    assert (t_ms, left, right) == (20, 2, -2)
+    assert abs(distance_mm - 2.0) < 1e-4
+
+
+def test_full_buffer_overwrites_oldest():
+    trace = TraceRecorder(capacity=4)
+    _fill(trace, 6)
+    assert trace.count == 4
+    assert trace.dropped == 2
+    assert [trace.row(n)[0] for n in range(4)] == [20, 30, 40, 50]
+    trace.clear()
+    assert trace.count == 0 and trace.dropped == 0
+
+
+def test_dump_prints_header_and_rows(capsys):
+    trace = TraceRecorder(capacity=4)
+    _fill(trace, 2)
+    trace.dump("[T]")
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[0] == "[T] " + ",".join(trace_recorder.FIELDS)
+    assert lines[2] == "[T] 10,1,-1,1.5,2.00,0.250,1.00"
+
+
+def test_save_and_load_round_trip(tmp_path):
+    trace = TraceRecorder(capacity=4)
+    _fill(trace, 5)
+    path = str(tmp_path / "trace.bin")
+    trace.save(path)
+    loaded = TraceRecorder.load(path)
+    assert loaded.count == 4
+    assert [loaded.row(n) for n in range(4)] == [trace.row(n) for n in range(4)]
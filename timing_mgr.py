@@ -0,0 +1,182 @@
+# Loop Timing Diagnostics Module for BadgeBot
+#
+# Displays the per-state hot-path timing histograms gathered by the app's
+# LoopProfiler, together with the background loop scheduler counters and the
+# achieved display frame rate, and streams a summary over BLE while the page
+# is open.
+#
+# Public interface (called by the main app):
+#   __init__(app)   – wire up to BadgeBotApp
+#   start()         – enter the timing page from the menu
+#   update(delta)   – per-tick button handling and BLE streaming
+#   draw(ctx)       – render histograms for the selected state
+
+from events.input import BUTTON_TYPES
+from app_components.tokens import label_font_size, button_labels
+from app_components.notification import Notification
+
+from .loop_timing import SECTION_NAMES, BUCKET_LABELS
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+_REFRESH_PERIOD_MS   = const(1000)  # how often the page is redrawn with fresh figures
+_TELEMETRY_PERIOD_MS = const(2000)  # how often a summary is streamed over BLE
+
+
+class TimingMgr:
+    """Shows loop timing histograms for each app state.
+
+    Parameters
+    ----------
+    app : BadgeBotApp
+        Reference to the main application instance.
+    state_names : tuple
+        Short display name for each app state, indexed by state number.
+    """
+
+    def __init__(self, app, state_names: tuple = (), logging: bool = False):
+        self._app = app
+        self._logging: bool = logging
+        self._state_names: tuple = state_names
+        self._selected: int = 0                 # index into the list of states with recorded timings
+        self._since_refresh: int = 0
+        self._since_telemetry: int = 0
+        if self._logging:
+            print("TimingMgr initialised")
+
+
+    # ------------------------------------------------------------------
+
+    @property
+    def logging(self) -> bool:
+        """Whether to print debug logs to the console."""
+        return self._logging
+
+    @logging.setter
+    def logging(self, value: bool):
+        self._logging = value
+
+
+    def _state_name(self, state: int) -> str:
+        return self._state_names[state] if state < len(self._state_names) else str(state)
+
+
+    # ------------------------------------------------------------------
+    # Entry point from menu
+    # ------------------------------------------------------------------
+
+    def start(self) -> bool:
+        """Enter the timing page from the main menu."""
+        app = self._app
+        app.set_menu(None)
+        app.button_states.clear()
+        app.refresh = True
+        self._selected = 0
+        self._since_refresh = 0
+        self._since_telemetry = 0
+        if self._logging:
+            print("Entered Loop Timing")
+        return True
+
+
+    # ------------------------------------------------------------------
+    # Per-tick update
+    # ------------------------------------------------------------------
+
+    def update(self, delta: int) -> bool:
+        """Handle Loop Timing UI.  Returns True if this module handled the state."""
+        app = self._app
+        num_states = len(app.loop_profiler.states())
+
+        if app.button_states.get(BUTTON_TYPES["UP"]):
+            app.button_states.clear()
+            if num_states:
+                self._selected = (self._selected - 1) % num_states
+            app.refresh = True
+        elif app.button_states.get(BUTTON_TYPES["DOWN"]):
+            app.button_states.clear()
+            if num_states:
+                self._selected = (self._selected + 1) % num_states
+            app.refresh = True
+        elif app.button_states.get(BUTTON_TYPES["CONFIRM"]):
+            app.button_states.clear()
+            app.loop_profiler.reset()
+            app.loop_scheduler.reset_stats()
+            app.frame_governor.reset()
+            self._selected = 0
+            app.notification = Notification("  Timings  Cleared")
+            app.refresh = True
+        elif app.button_states.get(BUTTON_TYPES["CANCEL"]):
+            app.button_states.clear()
+            app.return_to_menu()
+            return True
+
+        self._since_refresh += delta
+        if self._since_refresh >= _REFRESH_PERIOD_MS:
+            self._since_refresh = 0
+            app.refresh = True
+
+        self._since_telemetry += delta
+        if self._since_telemetry >= _TELEMETRY_PERIOD_MS:
+            self._since_telemetry = 0
+            self._send_telemetry()
+        return True
+
+
+    def _send_telemetry(self):
+        """Stream one line per recorded (state, section) histogram, plus the loop counters, over BLE."""
+        ble = self._app.ble_controller
+        if ble is None or not ble.is_connected():
+            return
+        for line in self._app.loop_profiler.telemetry_lines(self._state_names):
+            ble.send_telemetry(line)
+        scheduler = self._app.loop_scheduler
+        for state in scheduler.states():
+            ble.send_telemetry(f"L:{self._state_name(state)} {scheduler.stats(state)}")
+        governor = self._app.frame_governor
+        for state in governor.states():
+            ble.send_telemetry(f"F:{self._state_name(state)} {governor.rate(state)}")
+
+
+    # ------------------------------------------------------------------
+    # Drawing
+    # ------------------------------------------------------------------
+
+    def draw(self, ctx):
+        """Render the histograms for the selected state."""
+        app = self._app
+        profiler = app.loop_profiler
+        states = profiler.states()
+        lines = []
+        colours = []
+        if not states:
+            lines.append("No timings")
+            colours.append((1, 1, 0))
+        else:
+            state = states[self._selected % len(states)]
+            lines.append(f"{self._state_name(state)} ({self._selected % len(states) + 1}/{len(states)})")
+            colours.append((1, 1, 0))
+            for section, name in enumerate(SECTION_NAMES):
+                hist = profiler.histogram(state, section)
+                if hist is None or hist.count == 0:
+                    continue
+                lines.append(f"{name} n={hist.count}")
+                colours.append((0, 1, 1))
+                lines.append(f"avg {hist.avg_us // 1000}.{(hist.avg_us // 100) % 10} max {hist.max_us // 1000}ms")
+                colours.append((1, 1, 1))
+                lines.append(f"p50 {BUCKET_LABELS[hist.percentile_bucket(50)]} p95 {BUCKET_LABELS[hist.percentile_bucket(95)]}")
+                colours.append((1, 1, 1))
+            loop_stats = app.loop_scheduler.stats(state)
+            if loop_stats is not None:
+                lines.append(f"ovr {loop_stats.overruns} skp {loop_stats.skipped}")
+                colours.append((0, 1, 0))
+            frame_rate = app.frame_governor.rate(state)
+            if frame_rate is not None:
+                lines.append(f"{frame_rate.fps}fps coal {frame_rate.coalesced}")
+                colours.append((0, 1, 0))
+        app.draw_message(ctx, lines, colours, label_font_size)
+        button_labels(ctx, up_label="\u25B2", down_label="\u25BC", confirm_label="Clear", cancel_label="Back")
@@ -0,0 +1,137 @@
+# Trace Recorder Module for BadgeBot
+#
+# Binary ring-buffer recorder for the control loops.  Printing diagnostics
+# from inside a 10 ms loop (and having BleLogStream forward every line over
+# BLE) changes the very timing being looked at, so instead each tick appends
+# one fixed-size record to preallocated arrays - no formatting and no heap
+# allocation - and the trace is printed or written to flash once the move
+# has finished.
+#
+# Each record holds the time since the start of the command, both motor
+# outputs, the gyro rate and integrated heading, and the forward
+# acceleration and distance.  When the buffer is full the oldest records are
+# overwritten, so the end of a long move is always kept.
+#
+# Saved traces are a small header followed by the raw arrays, and can be
+# read back on a PC with TraceRecorder.load().
+#
+# Public interface:
+#   TraceRecorder(capacity)
+#     clear()                   – forget all records
+#     record(t_ms, left, right, gyro_dps, heading_deg, accel_mps2, distance_m)
+#     count, dropped            – records held / overwritten
+#     row(n)                    – the n'th oldest record as a tuple
+#     dump(tag)                 – print the records as CSV lines
+#     save(path) / load(path)   – write / read the trace in binary form
+
+import struct
+from array import array
+
+try:
+    from micropython import const
+except ImportError:
+    # CPython / simulator fallback – const() is just an identity function
+    const = lambda x: x         #pylint: disable=unnecessary-lambda-assignment
+
+_DEFAULT_CAPACITY = const(256)      # records; 2.5 s of 10 ms ticks
+_FILE_MAGIC = b"BBTR"
+_FILE_VERSION = const(1)
+_FILE_HEADER = "<4sBHHH"            # magic, version, capacity, head, count
+
+FIELDS = ("t_ms", "left", "right", "gyro_dps", "heading_deg", "accel_mps2", "distance_mm")
+
+
+class TraceRecorder:
+    """Fixed-size ring buffer of control loop records.
+
+    Parameters
+    ----------
+    capacity : int
+        Number of records held before the oldest are overwritten.
+    """
+    __slots__ = ("_capacity", "_head", "count", "dropped",
+                 "t_ms", "left", "right", "gyro_dps", "heading_deg", "accel_mps2", "distance_m")
+
+    def __init__(self, capacity: int = _DEFAULT_CAPACITY):
+        self._capacity: int = max(1, capacity)
+        self._head: int = 0                 # index of the oldest record
+        self.count: int = 0
+        self.dropped: int = 0
+        self.t_ms = array("i", [0] * self._capacity)
+        self.left = array("i", [0] * self._capacity)
+        self.right = array("i", [0] * self._capacity)
+        self.gyro_dps = array("f", [0.0] * self._capacity)
+        self.heading_deg = array("f", [0.0] * self._capacity)
+        self.accel_mps2 = array("f", [0.0] * self._capacity)
+        self.distance_m = array("f", [0.0] * self._capacity)
+
+
+    def clear(self):
+        """Forget all records."""
+        self._head = 0
+        self.count = 0
+        self.dropped = 0
+
+
+    def record(self, t_ms: int, left: int, right: int, gyro_dps: float, heading_deg: float,
+               accel_mps2: float, distance_m: float):
+        """Append one record, overwriting the oldest if the buffer is full."""
+        capacity = self._capacity
+        if self.count == capacity:
+            i = self._head
+            self._head = (i + 1) % capacity
+            self.dropped += 1
+        else:
+            i = (self._head + self.count) % capacity
+            self.count += 1
+        self.t_ms[i] = t_ms
+        self.left[i] = left
+        self.right[i] = right
+        self.gyro_dps[i] = gyro_dps
+        self.heading_deg[i] = heading_deg
+        self.accel_mps2[i] = accel_mps2
+        self.distance_m[i] = distance_m
+
+
+    def row(self, n: int) -> tuple:
+        """The *n*'th oldest record, in ``FIELDS`` order (distance in mm)."""
+        i = (self._head + n) % self._capacity
+        return (self.t_ms[i], self.left[i], self.right[i], self.gyro_dps[i], self.heading_deg[i],
+                self.accel_mps2[i], self.distance_m[i] * 1000)
+
+
+    def dump(self, tag: str = "[TRACE]"):
+        """Print the records, oldest first, as CSV lines prefixed with *tag*."""
+        print("%s %s" % (tag, ",".join(FIELDS)))
+        if self.dropped:
+            print("%s (%d earlier records overwritten)" % (tag, self.dropped))
+        for n in range(self.count):
+            print("%s %d,%d,%d,%.1f,%.2f,%.3f,%.2f" % ((tag,) + self.row(n)))
+
+
+    def _arrays(self) -> tuple:
+        return (self.t_ms, self.left, self.right, self.gyro_dps, self.heading_deg, self.accel_mps2, self.distance_m)
+
+
+    def save(self, path: str):
+        """Write the trace to *path* as a header followed by the raw record arrays."""
+        with open(path, "wb") as f:
+            f.write(struct.pack(_FILE_HEADER, _FILE_MAGIC, _FILE_VERSION, self._capacity, self._head, self.count))
+            for values in self._arrays():
+                f.write(values)
+
+
+    @classmethod
+    def load(cls, path: str) -> "TraceRecorder":
+        """Read a trace written by ``save``."""
+        with open(path, "rb") as f:
+            header = f.read(struct.calcsize(_FILE_HEADER))
+            magic, version, capacity, head, count = struct.unpack(_FILE_HEADER, header)
+            if magic != _FILE_MAGIC or version != _FILE_VERSION:
+                raise ValueError("not a BadgeBot trace file")
+            trace = cls(capacity)
+            for values in trace._arrays():
+                f.readinto(values)
+        trace._head = head
+        trace.count = count
+        return trace
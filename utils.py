@@ -1,54 +1,91 @@
 #utils.py
+from array import array
 from math import pi
 
 from display import hexagon
 
 
+# Glyph layouts for roundtext, keyed by (text, font size, radius, top).  The logo screen redraws the same
+# two messages every frame, so text_width() is only called when a new message/size is first drawn.
+_roundtext_cache = {}
+_ROUNDTEXT_CACHE_MAX = 8
+
+
+def _roundtext_layout(ctx, t, r, top):
+    """Return (radius, rotations, half widths) for drawing t around a circle: rotations[i] is the rotation
+    to apply before drawing glyph i (relative to the previous glyph)."""
+    key = (t, ctx.font_size, r, top)
+    layout = _roundtext_cache.get(key)
+    if layout is None:
+        h = ctx.font_size
+        r=(h-r) if top else r-h/2
+        half_widths = array("f", (ctx.text_width(c)/2 for c in t))
+        rotations = array("f", half_widths)
+        # first glyph: rotate back to the start of the text; then half of the previous glyph and half of this one
+        previous = -sum(half_widths)
+        for i, half_width in enumerate(half_widths):
+            rotations[i] = -(previous + half_width)/r
+            previous = half_width
+        if len(_roundtext_cache) >= _ROUNDTEXT_CACHE_MAX:
+            _roundtext_cache.clear()
+        layout = (r, rotations, half_widths)
+        _roundtext_cache[key] = layout
+    return layout
+
+
 def roundtext(ctx, t, r, top=False):
     """Draw text t along a circular path with radius r.  If top is True, text is drawn above the center point, otherwise below."""
+    r, rotations, half_widths = _roundtext_layout(ctx, t, r, top)
     ctx.save()
-    h = ctx.font_size
-    r=(h-r) if top else r-h/2
-    w=sum(map(ctx.text_width, t))
-    ctx.rotate(w/2/r)
-    for c in t:
-        w=ctx.text_width(c)
-        ctx.rotate(-w/2/r)
-        ctx.move_to(-w/2, r)
+    for i, c in enumerate(t):
+        ctx.rotate(rotations[i])
+        ctx.move_to(-half_widths[i], r)
         ctx.text(c)
-        ctx.move_to(0,0)
-        ctx.rotate(-w/2/r)
     ctx.restore()
 
 
+# Static logo geometry (only the rotation changes between frames)
+_LOGO_COLOURS = ((0, 0, 0), (1, 1, 1), (1.0, 0.84, 0))         # 0:black, 1:white, 2:yellow
+_LOGO_HEXAGONS = ((150, 1), (120, 0), (114, 2))
+_LOGO_CHIP = ((50, 0), (45, 2))     # , (40, 0)] # Outer, Inner, Solid (replaced by QR code)
+
+
+def _logo_pin_rects():
+    """Pin rectangles around the chip - one rectangle does pins on opposite sides in one go."""
+    outer = _LOGO_CHIP[0][0]
+    pin_width = outer // 6
+    rects = []
+    for j in range(5):
+        rects.append((-outer-pin_width, (1.75-j)*2*pin_width, 2*(outer+pin_width), pin_width))
+        rects.append(((1.75-j)*2*pin_width, -outer-pin_width, pin_width, 2*(outer+pin_width)))
+    return tuple(rects)
+
+_LOGO_PINS = _logo_pin_rects()
+
+
 def draw_logo_animated(ctx, rpm, animation_counter=0, messages=None, qr_code=None):
     """Draw the badge logo, with an animation based on the given RPM and animation counter.  Messages is an optional list of up to 2 strings to display below the logo.  QR code is an optional list of integers representing a QR code to display in the center of the logo."""
-    # 0:black, 1:white, 2:yellow
-    colours = [(0, 0, 0), (1, 1, 1), (1.0, 0.84, 0)]
+    colours = _LOGO_COLOURS
 
     #Hexagon
-    rs = [(150, 1), (120, 0), (114, 2)]
-    for r,c in rs:
+    for r,c in _LOGO_HEXAGONS:
         ctx.rgba(*colours[c], 1)
         hexagon(ctx, 0, 0, r)
-    
+
     ctx.save()
     ctx.rotate(rpm * animation_counter * pi / 30000.0)
-    # Chip
-    rs = [(50, 0), (45, 2)] # , (40, 0)] # Outer, Inner, Solid (replaced by QR code)
-    # pins - one rectangle does pins on opposite sides in one go
-    pin_width = rs[0][0] // 6
+    # Chip pins - all in one path with a single fill
     ctx.rgba(0, 0, 0, 1)
-    for j in range(5):
-        ctx.rectangle(-rs[0][0]-pin_width, (1.75-j)*2*pin_width, 2*(rs[0][0]+pin_width), pin_width).fill()
-        ctx.rectangle((1.75-j)*2*pin_width, -rs[0][0]-pin_width, pin_width, 2*(rs[0][0]+pin_width)).fill()
-    #Chip Body    
-    for r,c in rs:
+    for x, y, w, h in _LOGO_PINS:
+        ctx.rectangle(x, y, w, h)
+    ctx.fill()
+    #Chip Body
+    for r,c in _LOGO_CHIP:
         ctx.rgba(*colours[c], 1)
         ctx.round_rectangle(-r, -r, 2*r, 2*r, r//10).fill()
-    #QR Code        
+    #QR Code
     if qr_code is not None:
-        draw_QRCode(ctx, qr_code, 2*rs[1][0], colours[2])
+        draw_QRCode(ctx, qr_code, 2*_LOGO_CHIP[1][0], colours[2])
     ctx.restore()
 
     if messages is not None:
@@ -61,6 +98,53 @@ def draw_logo_animated(ctx, rpm, animation_counter=0, messages=None, qr_code=Non
 
 
 # QR code data
+# Merged rectangles for the most recently drawn QR code, as (qr_code, pixel_size, rects) where rects is a flat
+# array of x, y, w, h.  The QR code is redrawn on every frame of the animated logo, so this saves rebuilding it.
+_qr_cache = None
+
+
+def _qr_rects(qr_code, pixel_size: int):
+    """Return the dark modules of qr_code merged into rectangles: horizontal runs within each row, then
+    identical runs in consecutive rows merged vertically.  Cached per QR code and pixel size."""
+    global _qr_cache        # pylint: disable=global-statement
+    cache = _qr_cache
+    if cache is not None and cache[0] is qr_code and cache[1] == pixel_size:
+        return cache[2]
+
+    qr_size = len(qr_code)
+    offset = -(pixel_size*qr_size//2)
+    rects = []          # [col, row, run length, row count]
+    open_runs = {}      # (col, run length) -> index into rects of the run in the previous row
+    for row in range(qr_size):
+        bits = qr_code[row]
+        runs = {}
+        col = 0
+        while col < qr_size:
+            # LSBit is on the left
+            if bits & (1 << col):
+                start = col
+                while col < qr_size and bits & (1 << col):
+                    col += 1
+                run = (start, col - start)
+                index = open_runs.get(run)
+                if index is not None:
+                    rects[index][3] += 1
+                else:
+                    index = len(rects)
+                    rects.append([start, row, col - start, 1])
+                runs[run] = index
+            else:
+                col += 1
+        open_runs = runs
+
+    flat = array("h")
+    for col, row, length, count in rects:
+        # +1 on the width (as before) avoids hairline seams between adjacent runs
+        flat.extend((col*pixel_size + offset, row*pixel_size + offset, length*pixel_size + 1, count*pixel_size))
+    _qr_cache = (qr_code, pixel_size, flat)
+    return flat
+
+
 def draw_QRCode(ctx, qr_code, size=240, colour=(1,1,1)):        # pylint: disable=unused-argument
     """Draw a QR code on the given canvas context.  qr_code is a list of integers, where each integer represents a row of the QR code, and the bits in the integer represent the pixels (LSBit is leftmost pixel).  Size is the total size of the area to draw within (including a border), and colour is the colour to use for the pixels (currently only black or white are supported)."""
     qr_size = len( qr_code )
@@ -71,19 +155,12 @@ def draw_QRCode(ctx, qr_code, size=240, colour=(1,1,1)):        # pylint: disabl
     #   Size of each QR code pixel on the canvas (enforce space for a border)
     pixel_size = int((size-8)//qr_size)
 
-    #   Calculate the offset to start drawing the QR code (centre it within the available space)
-    offset = -(pixel_size*qr_size//2)
-
-    #   Loop through the array
+    #   All the merged rectangles are added to one path and filled together
+    rects = _qr_rects(qr_code, pixel_size)
     ctx.rgba(0,0,0,1)
-    for row in range(qr_size):
-        y = (row * pixel_size) + offset
-        for col in range(qr_size):
-            # check if the bit representing the col pixel is set
-            # LSBit is on the left
-            if qr_code[row] & (1 << col):
-                x = (col * pixel_size) + offset
-                ctx.rectangle(x, y, pixel_size+1, pixel_size).fill()  
+    for i in range(0, len(rects), 4):
+        ctx.rectangle(rects[i], rects[i+1], rects[i+2], rects[i+3])
+    ctx.fill()
 
 
 def parse_version(version):